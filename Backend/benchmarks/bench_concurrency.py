@@ -0,0 +1,78 @@
+"""Health-check latency of a running server (``uvicorn main:app``) while PDFs are being processed"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def upload(client, endpoint, data, index):
+    # PDF readers ignore bytes after %%EOF, so this only changes the hash
+    payload = data + f"\n% bench upload {index}\n".encode()
+    files = {"file": (f"bench-{index}.pdf", payload, "application/pdf")}
+    form = {"specificArea": "overview", "no": "3", "difficulty": "easy"} if endpoint.startswith("/quiz") else None
+    start = time.perf_counter()
+    response = await client.post(endpoint, files=files, data=form)
+    return response.status_code, time.perf_counter() - start
+
+
+async def poll_health(client, stop, interval, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def main(args):
+    with open(args.pdf, "rb") as f:
+        data = f.read()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        # Baseline health latency on an idle server
+        idle = []
+        for _ in range(20):
+            start = time.perf_counter()
+            await client.get("/")
+            idle.append(time.perf_counter() - start)
+
+        loaded = []
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, args.interval, loaded))
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            upload(client, args.endpoint, data, i) for i in range(args.uploads)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await poller
+
+    statuses = [status for status, _ in results]
+    durations = [duration for _, duration in results]
+    print(f"uploads: {args.uploads} to {args.endpoint} in {elapsed:.2f}s, statuses {sorted(set(statuses))}")
+    print(f"upload latency: median {statistics.median(durations):.2f}s, max {max(durations):.2f}s")
+    for label, values in (("idle", idle), ("under load", loaded)):
+        print(
+            f"health {label}: n={len(values)} "
+            f"p50={percentile(values, 50) * 1000:.1f}ms "
+            f"p95={percentile(values, 95) * 1000:.1f}ms "
+            f"max={max(values) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--pdf", required=True)
+    parser.add_argument("--uploads", type=int, default=10)
+    parser.add_argument("--endpoint", default="/quiz/pdf", choices=["/quiz/pdf", "/summary/pdf"])
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between health checks")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""Aggregate embedding throughput of concurrent callers with and without cross-request micro-batching"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_pdf import random_png, random_text  # noqa: E402
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def make_inputs(encoder, count, seed):
+    rng = random.Random(seed)
+    if encoder == "clip_image":
+        import io
+        from PIL import Image
+
+        pool = [Image.open(io.BytesIO(random_png(rng, 224))).convert("RGB") for _ in range(16)]
+        return [pool[i % len(pool)] for i in range(count)]
+    return [random_text(rng, 500) for _ in range(count)]
+
+
+def run(call, inputs, callers, calls, items):
+    """Run ``callers`` threads making ``calls`` calls each. Returns (seconds, latencies)"""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(callers + 1)
+
+    def caller(index):
+        rng = random.Random(index)
+        own = []
+        barrier.wait()
+        for _ in range(calls):
+            start = rng.randrange(max(1, len(inputs) - items))
+            began = time.perf_counter()
+            call(inputs[start:start + items])
+            own.append(time.perf_counter() - began)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - began, latencies
+
+
+def histogram_stats(histogram, name):
+    """(mean, observations) of a labelled Prometheus histogram"""
+    total = count = 0.0
+    for metric in histogram.collect():
+        for sample in metric.samples:
+            if sample.labels.get("encoder") != name:
+                continue
+            if sample.name.endswith("_sum"):
+                total = sample.value
+            elif sample.name.endswith("_count"):
+                count = sample.value
+    return (total / count if count else 0.0), int(count)
+
+
+def main(args):
+    from controllers.quizController import _clip_images, _clip_texts
+    from utils.embedding_service import MicroBatcher, _encode_text
+    from utils.metrics import EMBED_FILL_RATIO, EMBED_QUEUE_WAIT
+    from utils.models import models
+
+    encode = {"text": _encode_text, "clip_text": _clip_texts, "clip_image": _clip_images}[args.encoder]
+    models.get("clip" if args.encoder.startswith("clip") else "text_embeddings")
+    inputs = make_inputs(args.encoder, max(256, args.items * 4), args.seed)
+    encode(inputs[:args.max_batch])  # warm up kernels
+
+    name = f"bench_{args.encoder}"
+    batcher = MicroBatcher(
+        name, encode, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000, enabled=True
+    )
+    modes = {"direct": encode, "batched": batcher.embed}
+
+    chunks = args.callers * args.calls * args.items
+    print(f"{args.encoder}: {args.callers} callers x {args.calls} calls x {args.items} items = {chunks} chunks")
+    rates = {}
+    for mode, call in modes.items():
+        seconds, latencies = run(call, inputs, args.callers, args.calls, args.items)
+        rates[mode] = chunks / seconds
+        print(
+            f"  {mode:<8} {rates[mode]:8.1f} chunks/s  call p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+            f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms"
+        )
+
+    fill, passes = histogram_stats(EMBED_FILL_RATIO, name)
+    wait, _ = histogram_stats(EMBED_QUEUE_WAIT, name)
+    print(f"  batched: {passes} forward passes, mean fill ratio {fill:.2f}, mean queue wait {wait * 1000:.1f} ms")
+    print(f"  speed-up {rates['batched'] / rates['direct']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--encoder", choices=["text", "clip_text", "clip_image"], default="text")
+    parser.add_argument("--callers", type=int, default=16, help="threads standing in for concurrent requests")
+    parser.add_argument("--calls", type=int, default=20, help="embedding calls per caller")
+    parser.add_argument("--items", type=int, default=4, help="chunks or images per call")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
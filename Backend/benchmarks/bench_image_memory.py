@@ -0,0 +1,115 @@
+"""Peak RSS of image-heavy PDF processing with images held inline or spilled to the blob store"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ("quiz", "summary")
+MODES = ("inline", "spilled")
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def quiz(path, inline):
+    from controllers.quizController import build_document_index, related_parts, embed_texts
+    from utils.embedding_service import text_batcher
+
+    retriever, image_refs = build_document_index(path)
+    # The old per-request dict of every image's bytes
+    held = {image_id: ref.load() for image_id, ref in image_refs.items()} if inline else {}
+    query = "enzyme catalyst equilibrium"
+    parts = related_parts(retriever, image_refs, query, text_batcher.embed([query])[0], embed_texts([query])[0])
+    sent = [part for part in parts if isinstance(part, dict)]
+    return len(image_refs), sum(len(image["data"]) for image in held.values()), len(sent)
+
+
+def summary(path, inline):
+    from controllers.summarizeController import MultimodalSummarizeChain, prepare_summary_documents
+
+    _, documents = prepare_summary_documents(path)
+    images = [doc for doc in documents if doc.metadata.get("type") == "image"]
+    # The old image bytes in every image document's metadata
+    held = [doc.metadata["image_ref"].load() for doc in images] if inline else []
+    chain = MultimodalSummarizeChain(chain_type="map_reduce")
+    sent = 0
+    for group in chain._map_groups(documents):
+        _, _, image_parts = chain._stuff_parts(group)
+        sent = max(sent, len(image_parts))
+    return len(images), sum(len(image["data"]) for image in held), sent
+
+
+def child(scenario, mode, path):
+    from utils.models import models
+
+    models.get("text_embeddings")
+    if scenario == "quiz":
+        models.get("clip")
+
+    # Models load before the baseline, so only document processing is measured
+    baseline = peak_rss_mb()
+    images, held_bytes, sent = (quiz if scenario == "quiz" else summary)(path, mode == "inline")
+    print(json.dumps({
+        "rss_mb": peak_rss_mb() - baseline,
+        "images": images,
+        "held_mb": held_bytes / 1024 ** 2,
+        "sent": sent,
+    }))
+
+
+def run(args):
+    from benchmarks.synthetic_pdf import make_pdf
+
+    with tempfile.TemporaryDirectory(prefix="quizgen-bench-") as scratch:
+        path = os.path.join(scratch, "images.pdf")
+        pages = math.ceil(args.images / args.images_per_page)
+        make_pdf(
+            path, pages, args.chars_per_page, args.images_per_page,
+            image_size=args.image_size, unique_images=args.images, seed=args.seed,
+        )
+        print(f"{pages} pages, {args.images} images of {args.image_size}px, {os.path.getsize(path) / 1024 ** 2:.1f} MB")
+
+        env = dict(os.environ)
+        env.update(
+            IMAGE_BLOB_DIR=os.path.join(scratch, "images"),
+            PDF_CACHE_DIR=os.path.join(scratch, "pdf"),
+            LLM_CACHE_ENABLED="false",
+            MODEL_WARMUP="false",
+        )
+        print(f"{'scenario':<10}{'mode':<9}{'images':>8}{'held MB':>10}{'sent':>6}{'peak RSS MB':>13}")
+        for scenario in args.scenarios:
+            for mode in MODES:
+                # A fresh interpreter per run, since peak RSS only ever grows
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", scenario, mode, path],
+                    check=True, capture_output=True, text=True, env=env,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{scenario:<10}{mode:<9}{result['images']:>8}{result['held_mb']:>10.1f}"
+                    f"{result['sent']:>6}{result['rss_mb']:>13.1f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--images", type=int, default=300)
+    parser.add_argument("--images-per-page", type=int, default=3)
+    parser.add_argument("--image-size", type=int, default=384)
+    parser.add_argument("--chars-per-page", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", nargs=3, metavar=("SCENARIO", "MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+    else:
+        run(args)
@@ -0,0 +1,78 @@
+"""Items per second and cosine agreement with fp32 torch for each CLIP and MiniLM inference backend"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_pdf import random_png, random_text  # noqa: E402
+from utils.inference import MIN_COSINE_AGREEMENT  # noqa: E402
+
+
+def timed(fn, items):
+    fn(items[:8])  # warm-up, which also covers the one-off onnx export
+    start = time.perf_counter()
+    result = fn(items)
+    return result, len(items) / (time.perf_counter() - start)
+
+
+def encoder(name, backend):
+    """Batch embedding function for one encoder on one backend"""
+    import numpy as np
+    from controllers.quizController import embed_images, embed_texts
+    from utils.models import _load_clip, _load_text_embeddings
+
+    if name == "minilm":
+        model = _load_text_embeddings(backend)
+        return lambda items: np.asarray(model.embed_documents(items))
+    clip = _load_clip(backend)
+    if name == "clip-text":
+        return lambda items: embed_texts(items, clip=clip)
+    return lambda items: embed_images(items, clip=clip)
+
+
+def run(backends, chunks, images, chars, min_cosine):
+    """Print the comparison table; returns the (encoder, backend) pairs below ``min_cosine``"""
+    from PIL import Image
+    from utils.inference import check_backend, cosine_agreement
+
+    rng = random.Random(0)
+    texts = [random_text(rng, chars) for _ in range(chunks)]
+    pictures = [Image.open(io.BytesIO(random_png(rng, 224))).convert("RGB") for _ in range(images)]
+
+    inputs = {"minilm": texts, "clip-text": texts, "clip-image": pictures}
+
+    baselines = {}
+    failures = []
+    print(f"{'encoder':<12}{'backend':<9}{'items/s':>10}{'mean cos':>10}{'min cos':>10}")
+    for name in inputs:
+        for backend in ["torch"] + [b for b in backends if b != "torch"]:
+            embed = encoder(name, check_backend(backend))
+            embeddings, rate = timed(embed, inputs[name])
+            if backend == "torch":
+                baselines[name] = embeddings
+            mean_cos, min_cos = cosine_agreement(baselines[name], embeddings)
+            print(f"{name:<12}{backend:<9}{rate:>10.1f}{mean_cos:>10.4f}{min_cos:>10.4f}")
+            if min_cos < min_cosine:
+                failures.append((name, backend))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--chars", type=int, default=500, help="characters per text chunk")
+    parser.add_argument(
+        "--min-cosine", type=float, default=MIN_COSINE_AGREEMENT,
+        help="lowest cosine similarity to the fp32 embeddings before the run fails",
+    )
+    args = parser.parse_args()
+    failures = run(args.backends, args.chunks, args.images, args.chars, args.min_cosine)
+    if failures:
+        pairs = ", ".join(f"{name}/{backend}" for name, backend in failures)
+        sys.exit(f"Cosine similarity to fp32 below {args.min_cosine}: {pairs}")
@@ -0,0 +1,84 @@
+"""Throughput, tail latency and failovers of concurrent LLM calls through the gateway"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def configure_environment(args):
+    """Gateway settings are read from the environment when it is imported"""
+    os.environ["GEMINI_MAX_CONCURRENCY"] = str(args.gemini_slots)
+    os.environ["GROQ_MAX_CONCURRENCY"] = str(args.groq_slots)
+    os.environ["LLM_FAILOVER_WAIT"] = str(args.failover_wait)
+    os.environ["LLM_HEDGE_ENABLED"] = "true" if args.hedge else "false"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    if args.base_url:
+        os.environ["GROQ_BASE_URL"] = args.base_url
+        os.environ["GEMINI_BASE_URL"] = args.base_url
+        os.environ.setdefault("GROQ_API_KEY", "mock")
+        os.environ.setdefault("GOOGLE_API_KEY", "mock")
+    else:
+        from benchmarks import stubs
+
+        stubs.install(groq=args.groq_latency, gemini=args.gemini_latency)
+
+
+async def main(args):
+    configure_environment(args)
+
+    from utils.llm_gateway import gateway, generate_with_failover, groq_llm
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    errors = {}
+
+    async def one(index):
+        prompt = f"Summarize the following text. Call {index}.\n\n" + "lorem ipsum " * 200
+
+        async def fallback():
+            return (await groq_llm.ainvoke(prompt)).content
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await generate_with_failover(prompt, fallback)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(args.calls)])
+    wall = time.perf_counter() - start
+
+    if latencies:
+        print(
+            f"{len(latencies)} calls  p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  "
+            f"p95 {percentile(latencies, 0.95) * 1000:8.1f} ms  p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  "
+            f"{len(latencies) / wall:.2f} calls/s"
+        )
+    print(f"errors: {errors or 'none'}")
+    print(json.dumps(gateway.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32, help="calls in flight from the caller side")
+    parser.add_argument("--gemini-slots", type=int, default=8)
+    parser.add_argument("--groq-slots", type=int, default=8)
+    parser.add_argument("--failover-wait", type=float, default=2, help="seconds to wait for Gemini before Groq")
+    parser.add_argument("--hedge", action="store_true", help="enable hedged requests")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="seconds per stubbed Groq call")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="seconds per stubbed Gemini call")
+    parser.add_argument("--base-url", help="talk to a mock server instead of the in-process stubs")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,294 @@
+"""End-to-end latency, throughput and peak RSS of the quiz and summary endpoints with stubbed remotes"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_pdf import make_pdf  # noqa: E402
+
+SCENARIOS = ("quiz_pdf", "quiz_youtube", "summary_pdf", "summary_youtube")
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_latencies(values):
+    return {f"p{pct}": percentile(values, pct) for pct in PERCENTILES}
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs: fall back to the lifetime peak (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Peak RSS while the sampler is running"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class StageRecorder:
+    """Tee for ``quizgen_stage_seconds`` that keeps the raw observations"""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def labels(self, name):
+        recorder = self
+
+        class Child:
+            def observe(self, seconds):
+                with recorder._lock:
+                    recorder.samples.setdefault(name, []).append(seconds)
+                recorder.histogram.labels(name).observe(seconds)
+
+        return Child()
+
+    def take(self):
+        with self._lock:
+            samples, self.samples = self.samples, {}
+        return samples
+
+
+def configure_environment(args):
+    """Point every cache at a scratch directory before the app reads its config"""
+    scratch = tempfile.mkdtemp(prefix="quizgen-bench-")
+    os.environ["PDF_CACHE_DIR"] = os.path.join(scratch, "pdf")
+    os.environ["TRANSCRIPT_CACHE_DB"] = os.path.join(scratch, "transcripts.sqlite3")
+    os.environ["YOUTUBE_INDEX_DIR"] = os.path.join(scratch, "youtube-index")
+    os.environ["JOB_DB"] = os.path.join(scratch, "jobs.sqlite3")
+    os.environ["JOB_UPLOAD_DIR"] = os.path.join(scratch, "job-uploads")
+    os.environ["LLM_CACHE_DB"] = os.path.join(scratch, "llm-responses.sqlite3")
+    os.environ["LIBRARY_DIR"] = os.path.join(scratch, "library")
+    os.environ["IMAGE_BLOB_DIR"] = os.path.join(scratch, "images")
+    os.environ["LLM_CACHE_ENABLED"] = "true" if args.llm_cache else "false"
+    os.environ["MODEL_WARMUP"] = "false"
+    return scratch
+
+
+def request_factory(scenario, pdf_data, args):
+    """``make(index)`` returning the (path, httpx kwargs) of one request"""
+    form = {"specificArea": args.topic, "no": str(args.questions), "difficulty": "medium"}
+
+    def pdf_file(index):
+        # PDF readers ignore bytes after %%EOF, so this only changes the hash
+        suffix = b"" if args.repeat_inputs else f"\n% bench {scenario} {index}\n".encode()
+        return {"file": (f"bench-{index}.pdf", pdf_data + suffix, "application/pdf")}
+
+    def video_url(index):
+        video_id = "benchvideo" if args.repeat_inputs else f"bench{scenario[:1]}{index:06d}"
+        return f"https://www.youtube.com/watch?v={video_id}"
+
+    if scenario == "quiz_pdf":
+        return lambda index: ("/quiz/pdf", {"files": pdf_file(index), "data": form})
+    if scenario == "summary_pdf":
+        return lambda index: ("/summary/pdf", {"files": pdf_file(index)})
+    if scenario == "quiz_youtube":
+        return lambda index: ("/quiz/youtube", {"json": {
+            "url": video_url(index), "specificArea": args.topic, "no": args.questions, "difficulty": "medium",
+        }})
+    return lambda index: ("/summary/youtube", {"json": {"url": video_url(index)}})
+
+
+async def run_scenario(client, make_request, count, concurrency, offset=0):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = {}
+
+    async def one(index):
+        path, kwargs = make_request(offset + index)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, **kwargs)
+            elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            latencies.append(elapsed)
+        else:
+            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(count)])
+    return latencies, errors, time.perf_counter() - start
+
+
+async def main(args):
+    configure_environment(args)
+
+    from benchmarks import stubs
+
+    # Parsing, embedding, retrieval and prompt building still run for real, with locally cached models
+    stubs.install(
+        groq=args.groq_latency,
+        gemini=args.gemini_latency,
+        youtube=args.youtube_latency,
+        transcript_chars=args.transcript_chars,
+    )
+
+    import httpx
+    from utils import metrics
+
+    recorder = StageRecorder(metrics.STAGE_SECONDS)
+    metrics.STAGE_SECONDS = recorder
+
+    # Requests go through the app in-process; importing main builds its clients from the stubs
+    from main import app
+    from utils.models import models
+
+    # Load models up front so the first scenario does not pay for it
+    models.warm_up()
+
+    pdf_path = os.path.join(tempfile.mkdtemp(prefix="quizgen-bench-pdf-"), "bench.pdf")
+    make_pdf(pdf_path, args.pages, args.chars_per_page, args.images_per_page, seed=args.seed)
+    with open(pdf_path, "rb") as f:
+        pdf_data = f.read()
+
+    results = {
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for scenario in args.scenarios:
+            make_request = request_factory(scenario, pdf_data, args)
+            if args.warmup:
+                await run_scenario(client, make_request, args.warmup, args.concurrency, offset=args.requests)
+            recorder.take()
+
+            with RssSampler() as rss:
+                latencies, errors, wall = await run_scenario(client, make_request, args.requests, args.concurrency)
+            stages = recorder.take()
+
+            results["scenarios"][scenario] = {
+                "requests": args.requests,
+                "errors": errors,
+                "latency": summarize_latencies(latencies),
+                "throughput": len(latencies) / wall if wall else 0.0,
+                "peak_rss_mb": rss.peak / 1024 ** 2,
+                "stages": {
+                    name: {"count": len(values), **summarize_latencies(values)}
+                    for name, values in sorted(stages.items())
+                },
+            }
+            report(scenario, results["scenarios"][scenario])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+def report(scenario, result):
+    latency = result["latency"]
+    errors = ", ".join(f"{code}: {count}" for code, count in result["errors"].items()) or "none"
+    print(f"\n{scenario}")
+    print(
+        f"  requests  p50 {latency['p50'] * 1000:8.1f} ms  p95 {latency['p95'] * 1000:8.1f} ms  "
+        f"p99 {latency['p99'] * 1000:8.1f} ms  {result['throughput']:.2f} req/s  "
+        f"peak RSS {result['peak_rss_mb']:.0f} MB  errors {errors}"
+    )
+    for name, stage in result["stages"].items():
+        print(
+            f"  {name:<20} p50 {stage['p50'] * 1000:8.1f} ms  p95 {stage['p95'] * 1000:8.1f} ms  "
+            f"p99 {stage['p99'] * 1000:8.1f} ms  n={stage['count']}"
+        )
+
+
+def compare(baseline, current, tolerance):
+    """Percentiles that got slower than ``(1 + tolerance)`` times the baseline"""
+    regressions = []
+    for scenario, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        pairs = [("requests", base["latency"], result["latency"])]
+        pairs += [
+            (name, base["stages"][name], stage)
+            for name, stage in result["stages"].items()
+            if name in base["stages"]
+        ]
+        for name, before, after in pairs:
+            for pct in PERCENTILES:
+                key = f"p{pct}"
+                if before[key] > 0 and after[key] > before[key] * (1 + tolerance):
+                    regressions.append(
+                        f"{scenario} {name} {key}: {before[key] * 1000:.1f} ms -> {after[key] * 1000:.1f} ms"
+                    )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=20, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests per scenario")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--chars-per-page", type=int, default=2000)
+    parser.add_argument("--images-per-page", type=int, default=1)
+    parser.add_argument("--transcript-chars", type=int, default=20000)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--topic", default="enzyme catalyst equilibrium")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="seconds per stubbed Groq call")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="seconds per stubbed Gemini call")
+    parser.add_argument("--youtube-latency", type=float, default=0.3, help="seconds per stubbed transcript fetch")
+    parser.add_argument("--repeat-inputs", action="store_true", help="reuse one PDF and video to measure cache hits")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON, e.g. a new baseline")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 on any percentile slower by more than --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,50 @@
+"""Throughput of page-sharded PDF indexing as page and worker counts grow"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_pdf import make_pdf  # noqa: E402
+
+
+def run(pages_list, workers_list, images_per_page):
+    from controllers import quizController
+    from utils import pdf_extract
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in pages_list:
+            path = make_pdf(os.path.join(tmp, f"bench-{pages}.pdf"), pages, images_per_page=images_per_page)
+            for workers in workers_list:
+                os.environ["PDF_WORKERS"] = str(workers)
+                # Re-read the setting and drop any pool sized for another count
+                importlib.reload(sys.modules["utils.config"])
+                if pdf_extract._shard_pool is not None:
+                    pdf_extract._shard_pool.shutdown()
+                importlib.reload(pdf_extract)
+                importlib.reload(quizController)
+
+                # Warm-up loads the model in this process and in shard workers
+                quizController.build_document_index(path)
+                start = time.perf_counter()
+                quizController.build_document_index(path)
+                elapsed = time.perf_counter() - start
+                rows.append((pages, workers, elapsed, pages / elapsed))
+
+    print(f"{'pages':>6}{'workers':>9}{'seconds':>10}{'pages/s':>10}")
+    for pages, workers, elapsed, rate in rows:
+        print(f"{pages:>6}{workers:>9}{elapsed:>10.2f}{rate:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # Documents shorter than PDF_SHARD_MIN_PAGES are never sharded
+    parser.add_argument("--pages", type=int, nargs="+", default=[25, 100, 400])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--images-per-page", type=int, default=1)
+    args = parser.parse_args()
+    run(args.pages, args.workers, args.images_per_page)
@@ -0,0 +1,87 @@
+"""Offline recall@k and latency of the PDF quiz retrievers (clip, dense, bm25, hybrid, hybrid+rerank)"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def sample_queries(text_docs, count, words, seed):
+    rng = random.Random(seed)
+    queries = []
+    for doc in rng.sample(text_docs, min(count, len(text_docs))):
+        tokens = doc.page_content.split()
+        start = rng.randrange(max(1, len(tokens) - words))
+        queries.append({"query": " ".join(tokens[start:start + words]), "page": doc.metadata["page"]})
+    return queries
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(pdf, queries_path, count, words, ks, seed):
+    from langchain_community.vectorstores import FAISS
+    from controllers.quizController import build_document_index, embed_texts
+    from utils.hybrid_search import rerank_enabled
+    from utils.models import models
+
+    retriever, _ = build_document_index(pdf)
+    text_model = models.get("text_embeddings")
+    chunks = [doc.page_content for doc in retriever.text_docs]
+    clip_store = FAISS.from_embeddings(
+        text_embeddings=list(zip(chunks, embed_texts(chunks))),
+        embedding=None,
+        metadatas=[doc.metadata for doc in retriever.text_docs]
+    )
+
+    if queries_path:
+        with open(queries_path) as f:
+            queries = [json.loads(line) for line in f if line.strip()]
+    else:
+        # A window of words from a random chunk, labelled with that chunk's page
+        queries = sample_queries(retriever.text_docs, count, words, seed)
+
+    depth = max(ks)
+    modes = {
+        "clip": lambda q: clip_store.similarity_search_by_vector(embed_texts([q])[0], k=depth),
+        "dense": lambda q: retriever.text_store.similarity_search_by_vector(text_model.embed_query(q), k=depth),
+        "bm25": lambda q: [retriever.text_docs[i] for i, _ in retriever.bm25.search(q, depth)],
+        "hybrid": lambda q: retriever.search(q, text_model.embed_query(q), k=depth, use_reranker=False),
+    }
+    if rerank_enabled():
+        modes["hybrid+rerank"] = lambda q: retriever.search(q, text_model.embed_query(q), k=depth, use_reranker=True)
+
+    print(f"{len(chunks)} chunks, {len(queries)} queries")
+    header = f"{'mode':<15}" + "".join(f"{'R@' + str(k):>8}" for k in ks) + f"{'p50 ms':>9}{'p95 ms':>9}"
+    print(header)
+    for name, search in modes.items():
+        search(queries[0]["query"])  # warm-up
+        hits = {k: 0 for k in ks}
+        latencies = []
+        for item in queries:
+            start = time.perf_counter()
+            docs = search(item["query"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            # A hit is any retrieved text chunk from the labelled page
+            pages = [doc.metadata.get("page") for doc in docs if doc.metadata.get("type") != "image"]
+            for k in ks:
+                hits[k] += item["page"] in pages[:k]
+        recalls = "".join(f"{hits[k] / len(queries):>8.3f}" for k in ks)
+        print(f"{name:<15}{recalls}{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.95):>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", required=True)
+    parser.add_argument("--queries", help="JSONL of {query, page} labels with 0-based pages")
+    parser.add_argument("--count", type=int, default=200, help="sampled queries without --queries")
+    parser.add_argument("--words", type=int, default=8, help="words per sampled query")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.pdf, args.queries, args.count, args.words, args.k, args.seed)
@@ -0,0 +1,71 @@
+"""Import time and peak RSS of the FastAPI app, optionally compared against another git revision"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, resource, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_kb / 1024}))
+"""
+
+
+def measure(backend_dir, runs):
+    samples = []
+    env = dict(os.environ, MODEL_WARMUP="false")
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=backend_dir,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "seconds": statistics.median(s["seconds"] for s in samples),
+        "rss_mb": statistics.median(s["rss_mb"] for s in samples),
+    }
+
+
+def measure_revision(revision, runs):
+    repo_root = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stdout.strip()
+    with tempfile.TemporaryDirectory() as worktree:
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, revision], cwd=repo_root, check=True, capture_output=True)
+        try:
+            backend_dir = os.path.join(worktree, os.path.relpath(BACKEND_DIR, repo_root))
+            return measure(backend_dir, runs)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=repo_root, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--compare", metavar="REV", help="git revision to measure as the baseline")
+    args = parser.parse_args()
+
+    rows = []
+    if args.compare:
+        rows.append((args.compare, measure_revision(args.compare, args.runs)))
+    rows.append(("working tree", measure(BACKEND_DIR, args.runs)))
+
+    print(f"{'revision':<16}{'import s':>10}{'RSS MB':>10}")
+    for label, result in rows:
+        print(f"{label:<16}{result['seconds']:>10.2f}{result['rss_mb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
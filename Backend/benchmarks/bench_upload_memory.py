@@ -0,0 +1,84 @@
+"""Peak RSS of buffered and streamed upload ingestion as upload size grows"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MB = 1024 ** 2
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_random_file(path, size_mb):
+    with open(path, "wb") as out:
+        for _ in range(size_mb):
+            out.write(os.urandom(MB))
+
+
+async def ingest(mode, source):
+    from starlette.datastructures import UploadFile
+    from utils.pdf_cache import content_hash
+    from utils.uploads import save_upload
+
+    with open(source, "rb") as handle:
+        upload = UploadFile(file=handle, size=os.path.getsize(source), filename="bench.pdf")
+        if mode == "buffered":
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                contents = await upload.read()
+                tmp.write(contents)
+            content_hash(contents)
+            path = tmp.name
+        else:
+            path, _ = await save_upload(upload, max_bytes=sys.maxsize)
+    os.remove(path)
+
+
+def child(mode, source):
+    # Imports are loaded before the baseline so only ingestion is measured
+    import starlette.datastructures  # noqa: F401
+    import utils.uploads  # noqa: F401
+
+    baseline = peak_rss_mb()
+    asyncio.run(ingest(mode, source))
+    print(f"{peak_rss_mb() - baseline:.1f}")
+
+
+def run(sizes):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in sizes:
+            source = os.path.join(tmp, f"upload-{size_mb}.bin")
+            write_random_file(source, size_mb)
+            row = [size_mb]
+            for mode in ("buffered", "streamed"):
+                # A fresh interpreter per run, since peak RSS only ever grows
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, source],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                row.append(float(output.strip().splitlines()[-1]))
+            rows.append(row)
+            os.remove(source)
+
+    print(f"{'upload MB':>10}{'buffered MB':>13}{'streamed MB':>13}")
+    for size_mb, buffered, streamed in rows:
+        print(f"{size_mb:>10}{buffered:>13.1f}{streamed:>13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+    else:
+        run(args.sizes)
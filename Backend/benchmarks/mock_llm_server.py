@@ -0,0 +1,146 @@
+"""Local mock of the Groq and Gemini HTTP APIs, answering like ``benchmarks/stubs.py``, for gateway tests"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, StreamingResponse  # noqa: E402
+from benchmarks.stubs import respond, _pieces  # noqa: E402
+
+SETTINGS = {"groq_latency": 0.5, "gemini_latency": 1.0, "error_rate": 0.0, "jitter": 0.0}
+COUNTS = {"groq": 0, "gemini": 0, "rejected": 0}
+
+app = FastAPI()
+
+
+async def delay(provider):
+    COUNTS[provider] += 1
+    await asyncio.sleep(SETTINGS[f"{provider}_latency"] + random.uniform(0, SETTINGS["jitter"]))
+    if random.random() < SETTINGS["error_rate"]:
+        COUNTS["rejected"] += 1
+        return JSONResponse(status_code=429, content={"error": {"message": "Rate limit reached", "code": 429}})
+    return None
+
+
+def sse(payloads):
+    async def events():
+        for payload in payloads:
+            yield f"data: {json.dumps(payload)}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/openai/v1/chat/completions")
+async def groq_chat(request: Request):
+    body = await request.json()
+    rejected = await delay("groq")
+    if rejected is not None:
+        return rejected
+
+    prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+    text = respond(prompt)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    base = {"id": completion_id, "created": int(time.time()), "model": body.get("model", "mock")}
+    usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+    if body.get("stream"):
+        chunks = [
+            {**base, "object": "chat.completion.chunk",
+             "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            for piece in _pieces(text)
+        ]
+        chunks.append({**base, "object": "chat.completion.chunk",
+                       "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                       "x_groq": {"usage": usage}})
+
+        async def events():
+            for chunk in chunks:
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return {
+        **base,
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+def gemini_payload(text, prompt, finished=True):
+    payload = {"candidates": [{
+        "content": {"role": "model", "parts": [{"text": text}]},
+        "index": 0,
+        **({"finishReason": "STOP"} if finished else {}),
+    }]}
+    if finished:
+        payload["usageMetadata"] = {
+            "promptTokenCount": len(prompt) // 4,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": (len(prompt) + len(text)) // 4,
+        }
+    return payload
+
+
+def gemini_prompt(body):
+    return "\n".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def gemini_generate(model: str, request: Request):
+    body = await request.json()
+    rejected = await delay("gemini")
+    if rejected is not None:
+        return rejected
+    prompt = gemini_prompt(body)
+    return gemini_payload(respond(prompt), prompt)
+
+
+@app.post("/v1beta/models/{model}:streamGenerateContent")
+async def gemini_stream(model: str, request: Request):
+    body = await request.json()
+    rejected = await delay("gemini")
+    if rejected is not None:
+        return rejected
+    prompt = gemini_prompt(body)
+    pieces = _pieces(respond(prompt))
+    payloads = [gemini_payload(piece, prompt, finished=i == len(pieces) - 1) for i, piece in enumerate(pieces)]
+    if request.query_params.get("alt") == "sse":
+        return sse(payloads)
+    # Without alt=sse the REST API streams one JSON array
+    return JSONResponse(payloads)
+
+
+@app.get("/stats")
+async def stats():
+    return COUNTS
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # Point the app here with GROQ_BASE_URL and GEMINI_BASE_URL
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--groq-latency", type=float, default=0.5)
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    args = parser.parse_args()
+    SETTINGS.update(
+        groq_latency=args.groq_latency, gemini_latency=args.gemini_latency,
+        error_rate=args.error_rate, jitter=args.jitter,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
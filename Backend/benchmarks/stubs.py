@@ -0,0 +1,166 @@
+"""Deterministic local stand-ins for Groq, Gemini and YouTube; ``install`` them before importing the app"""
+import asyncio
+import json
+import random
+import re
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Optional
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.pydantic_v1 import Field
+from benchmarks.synthetic_pdf import random_text
+
+# Seconds per call and per streamed chunk, set by ``install``
+LATENCY = {"groq": 0.5, "gemini": 1.0, "youtube": 0.3, "stream_chunk": 0.01}
+TRANSCRIPT_CHARS = 20000
+SUMMARY_WORDS = 200
+STREAM_CHUNKS = 20
+
+
+def _prompt_text(contents):
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_prompt_text(part) for part in contents)
+    return getattr(contents, "content", "") if not isinstance(contents, dict) else ""
+
+
+def respond(prompt):
+    """Quiz JSON for quiz prompts, a fixed-length summary for everything else"""
+    rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+    count = re.search(r"Number of Questions:\s*(\d+)", prompt)
+    if count is None:
+        return random_text(rng, SUMMARY_WORDS * 8)
+
+    difficulty = re.search(r"Difficulty:\s*(\w+)", prompt)
+    return json.dumps([
+        {
+            "id": i + 1,
+            "question": random_text(rng, 60).capitalize() + "?",
+            "options": [random_text(rng, 15) for _ in range(4)],
+            "correct": rng.randrange(4),
+            "difficulty": difficulty.group(1) if difficulty else "medium",
+        }
+        for i in range(int(count.group(1)))
+    ])
+
+
+def _pieces(text):
+    size = max(1, len(text) // STREAM_CHUNKS)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _usage(prompt, text):
+    return {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}
+
+
+class StubChatGroq(BaseChatModel):
+    """Chat model with ChatGroq's constructor that answers after a fixed delay"""
+
+    model_name: str = Field(default="stub-groq", alias="model")
+    api_key: Optional[str] = None
+
+    class Config:
+        allow_population_by_field_name = True
+
+    @property
+    def _llm_type(self):
+        return "stub-groq"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name}
+
+    def _result(self, messages):
+        prompt = _prompt_text(messages)
+        text = respond(prompt)
+        usage = _usage(prompt, text)
+        message = AIMessage(content=text, response_metadata={"token_usage": usage, "model_name": self.model_name})
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"token_usage": usage, "model_name": self.model_name},
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(LATENCY["groq"])
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(LATENCY["groq"])
+        return self._result(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(LATENCY["groq"])
+        for piece in _pieces(respond(_prompt_text(messages))):
+            await asyncio.sleep(LATENCY["stream_chunk"])
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+class _GeminiResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4
+        )
+
+
+class _GeminiStream:
+    def __init__(self, text, prompt):
+        self._text = text
+        self.usage_metadata = _GeminiResponse(text, prompt).usage_metadata
+
+    async def __aiter__(self):
+        for piece in _pieces(self._text):
+            await asyncio.sleep(LATENCY["stream_chunk"])
+            yield SimpleNamespace(text=piece)
+
+
+class StubGenerativeModel:
+    """Stand-in for genai.GenerativeModel; image parts only add to the prompt size"""
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        await asyncio.sleep(LATENCY["gemini"])
+        prompt = _prompt_text(contents)
+        text = respond(prompt)
+        if stream:
+            return _GeminiStream(text, prompt)
+        return _GeminiResponse(text, prompt)
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(LATENCY["gemini"])
+        prompt = _prompt_text(contents)
+        return _GeminiResponse(respond(prompt), prompt)
+
+
+def stub_youtube_content(url):
+    """A synthetic transcript, the same for the same URL"""
+    time.sleep(LATENCY["youtube"])
+    rng = random.Random(zlib.crc32(url.encode("utf-8")))
+    return [Document(page_content=random_text(rng, TRANSCRIPT_CHARS), metadata={"source": url})]
+
+
+def install(groq=None, gemini=None, youtube=None, stream_chunk=None, transcript_chars=None, summary_words=None):
+    """Replace the remote services with the stubs; call before importing ``main``"""
+    global TRANSCRIPT_CHARS, SUMMARY_WORDS
+    import google.generativeai as genai
+    import langchain_groq
+    import utils.helpers
+
+    for name, value in (("groq", groq), ("gemini", gemini), ("youtube", youtube), ("stream_chunk", stream_chunk)):
+        if value is not None:
+            LATENCY[name] = value
+    if transcript_chars is not None:
+        TRANSCRIPT_CHARS = transcript_chars
+    if summary_words is not None:
+        SUMMARY_WORDS = summary_words
+
+    langchain_groq.ChatGroq = StubChatGroq
+    genai.GenerativeModel = StubGenerativeModel
+    utils.helpers.get_youtube_content = stub_youtube_content
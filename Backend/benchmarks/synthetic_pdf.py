@@ -0,0 +1,63 @@
+"""Synthetic PDFs of configurable size for benchmarks."""
+import io
+import random
+import fitz  # PyMuPDF
+from PIL import Image
+
+WORDS = (
+    "photosynthesis mitochondria enzyme catalyst equilibrium gradient neuron synapse "
+    "algorithm recursion matrix vector derivative integral theorem proof entropy "
+    "momentum velocity circuit voltage resistance capacitor protein membrane genome"
+).split()
+
+
+def random_text(rng, chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def random_png(rng, size):
+    image = Image.new("RGB", (size, size))
+    image.putdata([
+        (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        for _ in range(size * size)
+    ])
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def make_pdf(path, pages, chars_per_page=2000, images_per_page=1, image_size=256, unique_images=8, seed=0):
+    """Write a PDF of text and images drawn from ``unique_images`` pictures, so image xrefs repeat across pages"""
+    rng = random.Random(seed)
+    pool = [random_png(rng, image_size) for _ in range(max(1, unique_images))]
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        text_box = fitz.Rect(36, 36, page.rect.width - 36, page.rect.height / 2)
+        page.insert_textbox(text_box, random_text(rng, chars_per_page), fontsize=7)
+        for i in range(images_per_page):
+            top = page.rect.height / 2 + i * 60
+            page.insert_image(fitz.Rect(36, top, 96, top + 60), stream=pool[(page_num + i) % len(pool)])
+    doc.save(path)
+    doc.close()
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--chars-per-page", type=int, default=2000)
+    parser.add_argument("--images-per-page", type=int, default=1)
+    parser.add_argument("--image-size", type=int, default=256)
+    parser.add_argument("--unique-images", type=int, default=8)
+    args = parser.parse_args()
+    make_pdf(args.path, args.pages, args.chars_per_page, args.images_per_page, args.image_size, args.unique_images)
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from controllers.quizController import get_related_docs, generate_pdf_quiz
+from controllers.summarizeController import load_summary_documents, summarize_documents
+from schemas.quizScehma import QuizResponse
+from utils.config import CPU_POOL_KIND, JOB_HEARTBEAT_INTERVAL, JOB_STALE_AFTER
+from utils.executor import run_cpu, run_io
+from utils.job_store import OWNER, create_job_store
+
+# Stages reported by each job kind, in order
+JOB_STAGES = {
+    "quiz_pdf": ["parse", "embed", "retrieve", "generate"],
+    "summary_pdf": ["parse", "generate"],
+}
+
+job_store = create_job_store()
+
+# Keep references to running tasks so they are not garbage collected
+_tasks = set()
+# Makes the duplicate check and the insert of a submission one step
+_submit_lock = asyncio.Lock()
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def _progress_queue():
+    """Queue that worker processes can send stages through to this process"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = multiprocessing.Manager()
+        return _manager.Queue()
+
+
+class JobProgress:
+    """Picklable progress callback; with a ``queue``, worker processes send stages back to the server"""
+
+    def __init__(self, job_id, queue=None):
+        self.job_id = job_id
+        self.queue = queue
+
+    def __call__(self, stage):
+        if self.queue is not None:
+            self.queue.put(stage)
+        else:
+            job_store.update(self.job_id, stage=stage)
+
+    async def report(self, stage):
+        """Record a stage from the event loop"""
+        await run_io(job_store.update, self.job_id, stage=stage)
+
+    async def forward(self):
+        """Copy stages from the queue into the job store until None arrives"""
+        while True:
+            stage = await asyncio.to_thread(self.queue.get)
+            if stage is None:
+                return
+            await self.report(stage)
+
+
+async def _quiz_pdf_worker(path, pdf_hash, params, progress):
+    context_parts = await run_cpu(get_related_docs, path, params["specificArea"], pdf_hash, progress)
+    await progress.report("generate")
+    quiz = await generate_pdf_quiz(context_parts, params["specificArea"], params["no"], params["difficulty"])
+    return QuizResponse(quiz=quiz).model_dump()
+
+
+async def _summary_pdf_worker(path, pdf_hash, params, progress):
+    has_images, documents = await run_cpu(load_summary_documents, path, pdf_hash, progress)
+    await progress.report("generate")
+    return {"summary": await summarize_documents(has_images, documents)}
+
+
+_WORKERS = {
+    "quiz_pdf": _quiz_pdf_worker,
+    "summary_pdf": _summary_pdf_worker,
+}
+
+
+def dedup_key(kind, pdf_hash, params):
+    """Jobs with the same kind, document and parameters produce the same result"""
+    payload = json.dumps([kind, pdf_hash, params], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def submit_job(kind, upload_path, pdf_hash, params):
+    """Queue a job that takes over ``upload_path``, or reuse an identical active one. Returns (job, deduplicated)"""
+    key = dedup_key(kind, pdf_hash, params)
+    async with _submit_lock:
+        existing = await run_io(job_store.find_active, key)
+        if existing is not None:
+            _remove(upload_path)
+            return existing, True
+        job = _new_job(kind, key)
+        await run_io(job_store.create, job)
+
+    task = asyncio.create_task(_run_job(job["job_id"], kind, upload_path, pdf_hash, params))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job, False
+
+
+def _new_job(kind, key):
+    now = time.time()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "dedup_key": key,
+        "status": "queued",
+        "stage": None,
+        "error": None,
+        "result": None,
+        "created_at": now,
+        "updated_at": now,
+        "owner": OWNER,
+        "heartbeat_at": now,
+    }
+
+
+async def _run_job(job_id, kind, upload_path, pdf_hash, params):
+    progress = JobProgress(job_id)
+    forwarder = None
+    try:
+        if CPU_POOL_KIND == "process":
+            progress.queue = await run_io(_progress_queue)
+            forwarder = asyncio.create_task(progress.forward())
+        await run_io(job_store.update, job_id, status="running")
+        result = await _WORKERS[kind](upload_path, pdf_hash, params, progress)
+        outcome = {"status": "succeeded", "result": result}
+    except Exception as e:
+        outcome = {"status": "failed", "error": str(getattr(e, "detail", e))}
+    finally:
+        # Stages still queued are recorded before the final status
+        if forwarder is not None:
+            progress.queue.put(None)
+            await forwarder
+        _remove(upload_path)
+    await run_io(job_store.update, job_id, **outcome)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except Exception:
+        pass
+
+
+def job_status(job):
+    """Build the public status view of a job record"""
+    stages = JOB_STAGES[job["kind"]]
+    if job["status"] == "succeeded":
+        progress = 1.0
+    elif job["stage"] in stages:
+        progress = stages.index(job["stage"]) / len(stages)
+    else:
+        progress = 0.0
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "stages": stages,
+        "progress": progress,
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+async def watch_jobs():
+    """Heartbeat this process's jobs and fail jobs whose owner stopped heartbeating"""
+    while True:
+        try:
+            await run_io(job_store.heartbeat, OWNER)
+            await run_io(job_store.fail_stale, "Interrupted by server restart", time.time() - JOB_STALE_AFTER)
+        except Exception as e:
+            print(f"Error refreshing job heartbeats: {e}")
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+
+
+def start_job_watcher():
+    task = asyncio.create_task(watch_jobs())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
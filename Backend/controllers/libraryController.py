@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from controllers.quizController import extract_document, embed_texts, format_context, generate_pdf_quiz
+from controllers.summarizeController import summary_documents_from_records, summarize_documents
+from utils.config import QUIZ_CONTEXT_TOKENS
+from utils.context_packer import pack, document_tokens
+from utils.document_library import get_library
+from utils.executor import run_cpu, run_io
+from utils.helpers import get_youtube_content, extract_video_id
+from utils.embedding_service import text_batcher
+from utils.pdf_extract import extract_pdf_records
+
+# (user id, content hash) -> task of an ingest in progress, so concurrent
+# uploads of the same PDF share one ingest
+_ingesting = {}
+
+
+def extract_library_pdf(path):
+    """Parse a PDF once for both its index and its summary input"""
+    records = extract_pdf_records(path)
+    return extract_document(path, records=records), summary_documents_from_records(records)
+
+
+async def ingest_pdf(user_id, path, pdf_hash, title=None):
+    """Parse, embed and store a PDF in the user's library, once per content hash"""
+    key = (user_id, pdf_hash)
+    task = _ingesting.get(key)
+    if task is None:
+        # The ingest keeps its own link to the upload, since the request
+        # that started it may finish (and delete its file) first
+        own_path = f"{path}.ingest"
+        try:
+            os.link(path, own_path)
+        except OSError:
+            shutil.copyfile(path, own_path)
+        task = asyncio.ensure_future(_ingest_pdf(user_id, own_path, pdf_hash, title))
+        _ingesting[key] = task
+        task.add_done_callback(lambda _: _ingesting.pop(key, None))
+    # Shielded so one caller disconnecting does not cancel the others' ingest
+    return await asyncio.shield(task)
+
+
+async def _ingest_pdf(user_id, path, pdf_hash, title):
+    try:
+        library = await run_io(get_library, user_id)
+        existing = await run_io(library.find_document, pdf_hash)
+        if existing is not None:
+            return existing
+
+        # Parsing may run in worker processes; library writes take the library's file lock
+        extracted, summary = await run_cpu(extract_library_pdf, path)
+        return await run_io(library.add_document, "pdf", title, None, pdf_hash, *extracted, summary=summary)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def ingest_youtube(user_id, url, title=None):
+    """Fetch, embed and store a video transcript in the user's library, once per video"""
+    library = get_library(user_id)
+    source_key = "youtube:" + (extract_video_id(url) or hashlib.sha256(url.encode()).hexdigest())
+    existing = library.find_document(source_key)
+    if existing is not None:
+        return existing
+
+    documents = get_youtube_content(url)
+    # Same chunking as the per-request video index
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800,
+        chunk_overlap=100
+    )
+    chunks = text_splitter.split_documents(documents)
+    for chunk in chunks:
+        chunk.metadata["type"] = "text"
+    embeddings = text_batcher.embed([chunk.page_content for chunk in chunks])
+    return library.add_document(
+        "youtube", title or url, url, source_key,
+        chunks, embeddings,
+        summary=(False, documents),
+    )
+
+
+def missing_documents(user_id, doc_ids):
+    library = get_library(user_id)
+    return [doc_id for doc_id in doc_ids if library.get_document(doc_id) is None]
+
+
+def query_embeddings(query, with_images):
+    text_embedding = text_batcher.embed([query])[0]
+    # Images are matched against the CLIP text embedding of the query
+    image_embedding = embed_texts([query])[0] if with_images else None
+    return text_embedding, image_embedding
+
+
+def library_context(library, doc_ids, query, text_embedding, image_embedding=None):
+    """Context parts for a query across several library documents"""
+    candidates = library.search(doc_ids, query, text_embedding, image_embedding)
+    results = pack(candidates, QUIZ_CONTEXT_TOKENS, size=document_tokens)
+    return format_context(query, results, library.image)
+
+
+async def library_quiz(user_id, doc_ids, area, no, difficulty):
+    """Generate a quiz from stored documents: retrieval plus generation only"""
+    library = await run_io(get_library, user_id)
+    documents = await run_io(lambda: [library.get_document(doc_id) for doc_id in doc_ids])
+    with_images = any(document["images"] for document in documents)
+    text_embedding, image_embedding = await run_cpu(query_embeddings, area, with_images)
+    context_parts = await run_io(library_context, library, doc_ids, area, text_embedding, image_embedding)
+    return await generate_pdf_quiz(context_parts, area, no, difficulty)
+
+
+async def library_summary(user_id, doc_id):
+    """Summarize a stored document from its saved summary input"""
+    library = await run_io(get_library, user_id)
+    has_images, documents = await run_io(library.summary_documents, doc_id)
+    return await summarize_documents(has_images, documents)
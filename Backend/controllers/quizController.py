@@ -1,27 +1,28 @@
-import fitz  # PyMuPDF
 from langchain_core.documents import Document
-from transformers import CLIPProcessor, CLIPModel
 from PIL import Image
-import torch
 import numpy as np
-from langchain.chat_models import init_chat_model
-from langchain.prompts import PromptTemplate
-from langchain.schema.messages import HumanMessage
-from sklearn.metrics.pairwise import cosine_similarity
 import os
-import base64
-import io
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
+from utils.config import EMBED_BATCH_SIZE, QUIZ_CONTEXT_TOKENS, RETRIEVAL_CANDIDATES
+from utils.context_packer import pack, document_tokens
+from utils.pdf_cache import pdf_cache
+from utils.pdf_extract import extract_records, map_page_shards, page_count, ShardMerger, TextRecord, MIME_TYPES, EXTENSIONS
+from utils.image_preprocess import ImageStats
+from utils.hybrid_search import HybridRetriever
+from utils.quiz_parser import complete_quiz
+from utils.models import models
+from utils.llm_gateway import groq_llm, generate_with_failover, stream_with_failover, groq_stream
+from utils.metrics import stage, record_document, record_cache, record_images
+from utils.embedding_service import MicroBatcher, text_batcher
+from utils.blob_store import ImageRef
 
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32").to(device).eval()
-clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-
 ### Embedding functions
 def embed_image(image_data):
     """Embed image using CLIP"""
+    import torch
+    clip_model, clip_processor, device = models.get("clip")
+
     if isinstance(image_data, str):  # If path
         image = Image.open(image_data).convert("RGB")
     else:  # If PIL Image
@@ -36,6 +37,9 @@ def embed_image(image_data):
     
 def embed_text(text):
     """Embed text using CLIP."""
+    import torch
+    clip_model, clip_processor, device = models.get("clip")
+
     inputs = clip_processor(
         text=text, 
         return_tensors="pt", 
@@ -48,111 +52,347 @@ def embed_text(text):
         # Normalize embeddings
         features = features / features.norm(dim=-1, keepdim=True)
         return features.squeeze().numpy()
-    
 
 
-def get_related_docs(path,query):
-    doc=fitz.open(path)
-    # Storage for all documents and embeddings
-    all_docs = []
-    all_embeddings = []
-    image_data_store = {}  # Store actual image data for LLM
+def embed_images(images, batch_size=EMBED_BATCH_SIZE, clip=None):
+    """Embed PIL images with CLIP in padded batches, merged across requests unless ``clip`` is given"""
+    if clip is None:
+        return clip_image_batcher.embed(images)
+    return _clip_images(images, batch_size, clip)
 
-    # Text splitter
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
 
-    for i,page in enumerate(doc):
-        ## process text
-        text=page.get_text()
-        if text.strip():
-            ##create temporary document for splitting
-            temp_doc = Document(page_content=text, metadata={"page": i, "type": "text"})
-            text_chunks = splitter.split_documents([temp_doc])
+def _clip_images(images, batch_size=EMBED_BATCH_SIZE, clip=None):
+    import torch
+    clip_model, clip_processor, device = clip or models.get("clip")
 
-            #Embed each chunk using CLIP
-            for chunk in text_chunks:
-                embedding = embed_text(chunk.page_content)
-                all_embeddings.append(embedding)
-                all_docs.append(chunk)
+    batches = []
+    for start in range(0, len(images), batch_size):
+        inputs = clip_processor(images=images[start:start + batch_size], return_tensors="pt").to(device)
+        with torch.no_grad():
+            features = clip_model.get_image_features(**inputs)
+            # Normalize embeddings to unit vector
+            features = features / features.norm(dim=-1, keepdim=True)
+            batches.append(features.cpu().numpy())
+    if not batches:
+        return np.empty((0, clip_model.config.projection_dim), dtype=np.float32)
+    return np.concatenate(batches).astype(np.float32)
 
+def embed_texts(texts, batch_size=EMBED_BATCH_SIZE, clip=None):
+    """Embed texts with CLIP in padded batches, merged across requests unless ``clip`` is given"""
+    if clip is None:
+        return clip_text_batcher.embed(texts)
+    return _clip_texts(texts, batch_size, clip)
 
 
-        ## process images
-        ##Three Important Actions:
+def _clip_texts(texts, batch_size=EMBED_BATCH_SIZE, clip=None):
+    import torch
+    clip_model, clip_processor, device = clip or models.get("clip")
 
-        ##Extract and convert PDF images to a usable format (PIL Image)
-        ##Store the image bytes for later multimodal use (Gemini inline_data)
-        ##Create CLIP embedding for retrieval
+    batches = []
+    for start in range(0, len(texts), batch_size):
+        inputs = clip_processor(
+            text=texts[start:start + batch_size],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=77  # CLIP's max token length
+        ).to(device)
+        with torch.no_grad():
+            features = clip_model.get_text_features(**inputs)
+            # Normalize embeddings
+            features = features / features.norm(dim=-1, keepdim=True)
+            batches.append(features.cpu().numpy())
+    if not batches:
+        return np.empty((0, clip_model.config.projection_dim), dtype=np.float32)
+    return np.concatenate(batches).astype(np.float32)
 
-        for img_index, img in enumerate(page.get_images(full=True)):
-            try:
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
 
-                pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+# CLIP forward passes shared across concurrent requests
+clip_image_batcher = MicroBatcher("clip_image", _clip_images)
+clip_text_batcher = MicroBatcher("clip_text", _clip_texts)
+
+
+def embed_chunks(texts):
+    """Embed text chunks with the sentence-transformer text model"""
+    return text_batcher.embed(texts)
+
+
+# Name of the cached hybrid index artefact inside a PDF cache entry
+HYBRID_INDEX = "hybrid_index"
+
+
+def _report(progress, stage):
+    if progress is not None:
+        progress(stage)
+
 
-                image_id = f"page_{i}_img_{img_index}"
+def index_pages(path, start, stop):
+    """Extract and embed a page range; picklable results for shard workers, which cannot report progress"""
+    with stage("pdf_parse"):
+        records, stats = extract_records(path, start, stop)
+    return (*index_records(records), stats)
 
-                # Store PNG bytes (not base64) for Gemini inline_data
-                buffered = io.BytesIO()
-                pil_image.save(buffered, format="PNG")
-                img_bytes = buffered.getvalue()
-                image_data_store[image_id] = img_bytes
 
-                # Embed image using CLIP
-                embedding = embed_image(pil_image)
-                all_embeddings.append(embedding)
+def index_records(records):
+    """Split and embed extracted records into (text chunks, image records, text embeddings, image embeddings)"""
+    text_docs = []
+    image_records = []
 
-                image_doc = Document(
-                    page_content=f"[Image: {image_id}]",
-                    metadata={"page": i, "type": "image", "image_id": image_id}
-                )
-                all_docs.append(image_doc)
+    # Text splitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+
+    for record in records:
+        if isinstance(record, TextRecord):
+            ##create temporary document for splitting
+            temp_doc = Document(page_content=record.text, metadata={"page": record.page, "type": "text"})
+            text_docs.extend(splitter.split_documents([temp_doc]))
+        else:
+            ##Image bytes are in the blob store; CLIP decodes them a batch at a time
+            image_records.append(record)
 
+    # Embed text chunks with the text model (CLIP truncates at 77 tokens)
+    # and images with CLIP, a batch at a time
+    with stage("embed_text"):
+        text_embeddings = embed_chunks([chunk.page_content for chunk in text_docs])
+    with stage("embed_images"):
+        image_records, image_embeddings = embed_image_records(image_records)
+    return text_docs, image_records, text_embeddings, image_embeddings
+
+
+def embed_image_records(records, batch_size=EMBED_BATCH_SIZE):
+    """CLIP embeddings of spilled image records, decoded a batch at a time; undecodable images are left out"""
+    kept = []
+    batches = []
+    for start in range(0, len(records), batch_size):
+        images = []
+        for record in records[start:start + batch_size]:
+            try:
+                images.append(record.to_pil())
             except Exception as e:
-                print(f"Error processing image {img_index} on page {i}: {e}")
+                print(f"Error processing image {record.index} on page {record.page}: {e}")
                 continue
+            kept.append(record)
+        if images:
+            batches.append(embed_images(images, batch_size))
+    if not batches:
+        return kept, embed_images([])
+    return kept, np.concatenate(batches)
+
 
-    doc.close()
+def extract_document(path, progress=None, records=None):
+    """Parse and embed a PDF, or already extracted ``records``, with image ids mapped to blob store refs"""
+    _report(progress, "parse")
+    # Storage for all documents and embeddings
+    text_docs = []
+    image_docs = []
+    embeddings = []
+    image_embeddings = []
+    image_refs = {}  # Where the image bytes for the LLM are
+    merger = ShardMerger()
+
+    # Large documents are split into page ranges handled by worker processes;
+    # shard results come back in page order. Shards parse and embed in one
+    # pass, so "embed" is reported once they are all back
+    with stage("pdf_extract"):
+        if records is None:
+            shards = map_page_shards(path, index_pages)
+        else:
+            # Already preprocessed and deduplicated across the document
+            shards = [(*index_records(records), ImageStats())]
+    _report(progress, "embed")
+    for shard_text_docs, image_records, shard_text_embeddings, shard_image_embeddings, stats in shards:
+        text_docs.extend(shard_text_docs)
+        embeddings.append(shard_text_embeddings)
+        merger.add_stats(stats)
 
-    embeddings_array = np.array(all_embeddings, dtype=np.float32)
+        for record, embedding in zip(image_records, shard_image_embeddings):
+            # An image repeated across shards is kept only once
+            if not merger.keep(record):
+                continue
+            image_refs[record.image_id] = record.ref
+            image_docs.append(Document(
+                page_content=f"[Image: {record.image_id}]",
+                metadata={"page": record.page, "type": "image", "image_id": record.image_id}
+            ))
+            image_embeddings.append(embedding)
 
-    vector_store = FAISS.from_embeddings(
-        text_embeddings=[(doc.page_content, emb) for doc, emb in zip(all_docs, embeddings_array)],
-        embedding=None,
-        metadatas=[doc.metadata for doc in all_docs]
+    record_images(merger.stats)
+    text_embeddings = [shard for shard in embeddings if len(shard)]
+    text_embeddings = np.concatenate(text_embeddings) if text_embeddings else np.empty((0, 0), dtype=np.float32)
+    image_embeddings = np.stack(image_embeddings) if image_embeddings else np.empty((0, 0), dtype=np.float32)
+    record_document(
+        "pdf", pages=page_count(path), chunks=len(text_docs), images=len(image_docs), size=os.path.getsize(path)
     )
+    return text_docs, text_embeddings, image_docs, image_embeddings, image_refs
+
+
+def build_document_index(path, progress=None):
+    """Parse, embed and index a PDF. Returns (retriever, image_refs)"""
+    text_docs, text_embeddings, image_docs, image_embeddings, image_refs = extract_document(path, progress)
+    with stage("index_build"):
+        retriever = HybridRetriever.from_embeddings(text_docs, text_embeddings, image_docs, image_embeddings)
+    return retriever, image_refs
+
+
+def save_document_index(folder, retriever, image_refs):
+    """Persist the hybrid indexes, chunk metadata and images to a folder"""
+    retriever.save(folder)
+    images_dir = os.path.join(folder, "images")
+    os.makedirs(images_dir, exist_ok=True)
+    for image_id, ref in image_refs.items():
+        ref.copy_to(images_dir, image_id + EXTENSIONS[ref.mime_type])
+
 
-    query_embedding = embed_text(query)
+def load_document_index(folder):
+    """Load an index written by save_document_index; images stay on disk"""
+    retriever = HybridRetriever.load(folder)
+    image_refs = {}
+    images_dir = os.path.join(folder, "images")
+    for name in os.listdir(images_dir):
+        image_id, extension = os.path.splitext(name)
+        path = os.path.join(images_dir, name)
+        image_refs[image_id] = ImageRef(path, MIME_TYPES[extension.lstrip(".")], os.path.getsize(path))
+    return retriever, image_refs
 
-    results = vector_store.similarity_search_by_vector(
-        embedding=query_embedding,
-        k=5
+
+def get_document_index(path, content_hash=None, progress=None):
+    """Return the index for a PDF, reusing the cached copy for known content"""
+    if content_hash is None:
+        return build_document_index(path, progress)
+
+    cached = pdf_cache.get(content_hash, HYBRID_INDEX)
+    record_cache("pdf_index", cached is not None)
+    if cached:
+        try:
+            with stage("index_load"):
+                return load_document_index(cached)
+        except Exception as e:
+            print(f"Error loading cached index {content_hash}: {e}")
+
+    retriever, image_refs = build_document_index(path, progress)
+    pdf_cache.put(
+        content_hash,
+        HYBRID_INDEX,
+        lambda folder: save_document_index(folder, retriever, image_refs)
     )
+    return retriever, image_refs
+
+
+def get_related_docs(path, query, content_hash=None, progress=None):
+    """Retrieve text and image context for a query, reusing the cached index for a known ``content_hash``"""
+    return get_related_docs_batch(path, [query], content_hash, progress)[0]
+
+
+def get_related_docs_batch(path, queries, content_hash=None, progress=None):
+    """Context parts for each of several queries, indexing the PDF once and embedding the queries in one batch"""
+    retriever, image_refs = get_document_index(path, content_hash, progress)
+
+    _report(progress, "retrieve")
+    with stage("embed_query"):
+        text_embeddings = text_batcher.embed(queries)
+        # Images are matched against the CLIP text embedding of the query
+        image_embeddings = embed_texts(queries) if retriever.image_store is not None else [None] * len(queries)
+    with stage("retrieve"):
+        return [
+            related_parts(retriever, image_refs, query, text_embedding, image_embedding)
+            for query, text_embedding, image_embedding in zip(queries, text_embeddings, image_embeddings)
+        ]
 
+
+def related_parts(retriever, image_refs, query, text_embedding, image_embedding=None):
+    """Context parts (text and inline images) for one embedded query"""
+    # Over-fetch fused candidates, then keep the most relevant ones that
+    # fit the quiz context budget
+    candidates = retriever.search(query, text_embedding, image_embedding, k=RETRIEVAL_CANDIDATES)
+    results = pack(candidates, QUIZ_CONTEXT_TOKENS, size=document_tokens)
+    # Only the images that made it into the context are read back from disk
+    return format_context(query, results, lambda doc: _load_image(image_refs.get(doc.metadata.get("image_id"))))
+
+
+def _load_image(ref):
+    return ref.load() if ref is not None else None
+
+
+def format_context(query, results, image_for):
+    """Gemini context parts for retrieved documents; ``image_for(doc)`` gives an image's inline data or None"""
     parts = []
     parts.append(f"Question: {query}\n\nContext:\n")
 
-    text_docs = [doc for doc in results if doc.metadata.get("type") == "text"]
-    image_docs = [doc for doc in results if doc.metadata.get("type") == "image"]
+    text_results = [doc for doc in results if doc.metadata.get("type") == "text"]
+    image_results = [doc for doc in results if doc.metadata.get("type") == "image"]
 
-    if text_docs:
+    if text_results:
         text_context = "\n\n".join([
             f"[Page {doc.metadata['page']}]: {doc.page_content}"
-            for doc in text_docs
+            if doc.metadata.get("page") is not None else doc.page_content
+            for doc in text_results
         ])
         parts.append(f"Text excerpts:\n{text_context}\n")
 
-    for doc in image_docs:
-        image_id = doc.metadata.get("image_id")
-        if image_id and image_id in image_data_store:
+    for doc in image_results:
+        image = image_for(doc)
+        if image is not None:
             parts.append(f"\n[Image from page {doc.metadata['page']}]:\n")
             parts.append({
-                "inline_data": {
-                    "mime_type": "image/png",
-                    "data": image_data_store[image_id]  # raw bytes for Gemini
-                }
+                "inline_data": image  # raw bytes for Gemini
             })
 
-    return parts
\ No newline at end of file
+    return parts
+
+
+def create_quiz_prompt(area, no, difficulty, avoid=""):
+    return f"""You are a quiz generation bot. Generate a properly formatted JSON array of quiz questions.
+
+Constraints:
+- Topic: {area}
+- Number of Questions: {no}
+- Difficulty: {difficulty}
+
+IMPORTANT: Your response must be ONLY a JSON array in this exact format with no additional text:
+[
+  {{
+    "id": 1,
+    "question": "Question text here",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "correct": 0,
+    "difficulty": "{difficulty}"
+  }}
+]
+
+Do not include any other text, explanation, or formatting outside the JSON array.
+{avoid}Create the question based on provided context:
+"""
+
+
+def pdf_quiz_contents(context_parts, area, no, difficulty, avoid=""):
+    """Build the Gemini input for a PDF quiz from retrieved context parts"""
+    # Separate text and image parts
+    text_parts = [part for part in context_parts if isinstance(part, str)]
+    image_parts = [part for part in context_parts if isinstance(part, dict)]
+    
+    # Create proper Gemini input
+    full_prompt = create_quiz_prompt(area, no, difficulty, avoid) + "\n".join(text_parts)
+    
+    return [full_prompt] + image_parts
+
+
+async def generate_pdf_quiz(context_parts, area, no, difficulty):
+    """Generate and parse a quiz from retrieved PDF context with Gemini, or Groq if Gemini stays saturated"""
+
+    async def generate(count, avoid):
+        return await generate_quiz_text(pdf_quiz_contents(context_parts, area, count, difficulty, avoid))
+
+    return await complete_quiz(generate, no, difficulty)
+
+
+async def generate_quiz_text(contents):
+    """Gemini's answer to quiz contents, or Groq's from the text excerpts if Gemini is unavailable"""
+    async def text_only():
+        return (await groq_llm.ainvoke(contents[0])).content
+
+    return await generate_with_failover(contents, text_only)
+
+
+def stream_quiz_text(contents):
+    """Stream Gemini's answer to quiz contents, or Groq's from the text excerpts if Gemini is unavailable"""
+    return stream_with_failover(contents, lambda: groq_stream(contents[0]))
@@ -1,47 +1,151 @@
-import os
+import asyncio
+import pickle
 from langchain.chains.summarize import load_summarize_chain
-from langchain_groq import ChatGroq
-from dotenv import load_dotenv
-import google.generativeai as genai
-import fitz
-import io
-from PIL import Image
+from langchain.chains.summarize.stuff_prompt import PROMPT as STUFF_SUMMARY_PROMPT
 from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.pdf_cache import pdf_cache
+from utils.pdf_extract import extract_pdf_records, TextRecord
+from utils.llm_cache import cached_astream
+from utils.llm_gateway import groq_llm, gemini_llm, generate_with_failover, stream_with_failover
+from utils.metrics import stage, record_cache
+from utils.config import SUMMARY_MAP_CONCURRENCY, GROQ_MODEL, GEMINI_MODEL
+from utils.context_packer import (
+    choose_strategy,
+    count_tokens,
+    document_tokens,
+    group_by_budget,
+    pack_documents,
+    token_budget,
+    truncate_to_budget,
+)
 
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-google_api_key = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=google_api_key)
-
-llm = ChatGroq(model="llama-3.3-70b-versatile", api_key=groq_api_key)
-gemini_llm = genai.GenerativeModel('gemini-2.0-flash-exp')
+# Shared gateway clients: pooled, rate limited and cached
+llm = groq_llm
 
 class MultimodalSummarizeChain:
-    """Custom summarization chain for multimodal content"""
+    """Multimodal summarization sized in tokens; ``chain_type="auto"`` picks stuff, refine or map_reduce"""
     
-    def __init__(self, chain_type="stuff"):
+    def __init__(self, chain_type="stuff", max_concurrency=SUMMARY_MAP_CONCURRENCY):
         self.chain_type = chain_type
         self.model = gemini_llm
         self.fallback_llm = llm
+        self.max_concurrency = max_concurrency
+        self.budget = token_budget(GEMINI_MODEL)
+        self.fallback_budget = token_budget(GROQ_MODEL)
+
+    def _resolve_chain_type(self, groups):
+        if self.chain_type == "auto":
+            return choose_strategy(len(groups))
+        if self.chain_type == "refine" and len(groups) == 1:
+            # Nothing to refine with: the only group is the whole document
+            return "stuff"
+        return self.chain_type
     
-    def invoke(self, documents):
-        """Process documents similar to load_summarize_chain"""
-        if self.chain_type == "stuff":
-            return self._stuff_chain(documents)
-        elif self.chain_type == "map_reduce":
-            return self._map_reduce_chain(documents)
+    async def ainvoke(self, documents):
+        """Process documents similar to load_summarize_chain, without blocking the event loop"""
+        groups = self._map_groups(documents)
+        chain_type = self._resolve_chain_type(groups)
+        with stage(f"summarize_{chain_type}", groups=len(groups)):
+            if chain_type == "stuff":
+                return await self._stuff_chain(documents)
+            elif chain_type == "refine":
+                return await self._refine_chain(groups)
+            elif chain_type == "map_reduce":
+                return await self._map_reduce_chain(groups)
+            else:
+                raise ValueError(f"Unsupported chain type: {self.chain_type}")
+    
+    async def astream(self, documents):
+        """Stream ``section`` events as groups are summarized, then ``token`` events for the final summary"""
+        groups = self._map_groups(documents)
+        chain_type = self._resolve_chain_type(groups)
+        if chain_type == "stuff":
+            prompt, text_parts, image_parts = self._stuff_parts(documents)
+            text = chr(10).join(text_parts)
+            if image_parts or count_tokens(text) > self.fallback_budget:
+                tokens = self._stream_generate([prompt] + image_parts, text)
+            else:
+                tokens = self._stream_fallback(text)
+        elif chain_type == "refine":
+            summary = (await self._stuff_chain(groups[0]))["output_text"]
+            yield "section", {"index": 0, "summary": summary}
+            for index, group in enumerate(groups[1:-1], start=1):
+                summary = (await self._refine(summary, group))["output_text"]
+                yield "section", {"index": index, "summary": summary}
+            content_parts, text = self._refine_parts(summary, groups[-1])
+            tokens = self._stream_generate(content_parts, text)
+        elif chain_type == "map_reduce":
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def map_group(index, group):
+                async with semaphore:
+                    return index, (await self._stuff_chain(group))["output_text"]
+
+            tasks = [asyncio.create_task(map_group(i, group)) for i, group in enumerate(groups)]
+            chunk_summaries = [None] * len(tasks)
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    index, summary = await finished
+                    chunk_summaries[index] = summary
+                    yield "section", {"index": index, "summary": summary}
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            chunk_summaries = await self._collapse(chunk_summaries, semaphore)
+            final_prompt, combined_text = self._reduce_prompt(chunk_summaries)
+            tokens = self._stream_generate(final_prompt, combined_text)
         else:
             raise ValueError(f"Unsupported chain type: {self.chain_type}")
-    
-    def _stuff_chain(self, documents):
+
+        async for token in tokens:
+            yield "token", token
+
+    async def _stream_generate(self, content, fallback_text):
+        """Stream Gemini output, falling back to the text LLM if Gemini is saturated or unavailable up front"""
+        async for token in stream_with_failover(content, lambda: self._stream_fallback(fallback_text)):
+            yield token
+
+    async def _stream_fallback(self, text):
+        """Stream a plain-text summary from the fallback LLM"""
+        text = truncate_to_budget(text, self.fallback_budget)
+        async for token in cached_astream(self.fallback_llm, STUFF_SUMMARY_PROMPT.format(text=text)):
+            yield token
+
+    async def _stuff_chain(self, documents):
         """Stuff all documents into a single prompt"""
+        prompt, text_parts, image_parts = self._stuff_parts(documents)
+        text = chr(10).join(text_parts)
+
+        if image_parts or count_tokens(text) > self.fallback_budget:
+            # Use Gemini for multimodal content and text beyond the fallback budget
+            return await self._generate([prompt] + image_parts, text)
+        # Use fallback LLM for short text-only content
+        return await self._fallback_summary(text)
+
+    async def _generate(self, content, fallback_text):
+        """Call Gemini, falling back to a text-only summary if it is saturated or fails"""
+        text = await generate_with_failover(
+            content, lambda: self._fallback_summary_text(fallback_text)
+        )
+        return {"output_text": text}
+
+    async def _fallback_summary_text(self, text):
+        return (await self._fallback_summary(text))["output_text"]
+
+    @staticmethod
+    def _stuff_parts(documents):
+        """Build the stuff prompt. Returns (prompt, text_parts, image_parts)"""
         text_parts = []
         image_parts = []
         
         for doc in documents:
             if doc.metadata.get("type") == "image":
-                image_parts.append(doc.metadata["image_data"])
+                # Image bytes are read from the blob store only for the prompt being built
+                image = _load_image(doc)
+                if image is not None:
+                    image_parts.append({"inline_data": image})
             else:
                 page_info = f"[Page {doc.metadata.get('page', 'Unknown')}]" if doc.metadata.get('page') is not None else ""
                 text_parts.append(f"{page_info}\n{doc.page_content}")
@@ -60,118 +164,257 @@ class MultimodalSummarizeChain:
         Document Content:
         {chr(10).join(text_parts)}
         """
-        
-        try:
-            if image_parts:
-                # Use Gemini for multimodal content
-                content_parts = [prompt] + image_parts
-                response = self.model.generate_content(content_parts)
-                return {"output_text": response.text}
-            else:
-                # Use fallback LLM for text-only
-                text_doc = Document(page_content=chr(10).join(text_parts))
-                chain = load_summarize_chain(llm=self.fallback_llm, chain_type="stuff")
-                return chain.invoke([text_doc])
-                
-        except Exception as e:
-            # Fallback to text-only processing
-            text_doc = Document(page_content=chr(10).join(text_parts))
-            chain = load_summarize_chain(llm=self.fallback_llm, chain_type="stuff")
-            return chain.invoke([text_doc])
+        return prompt, text_parts, image_parts
+
+    async def _fallback_summary(self, text):
+        """Summarize plain text with the fallback LLM, cut to its token budget"""
+        text = truncate_to_budget(text, self.fallback_budget)
+        chain = load_summarize_chain(llm=self.fallback_llm, chain_type="stuff")
+        return await chain.ainvoke([Document(page_content=text)])
+
+    async def _refine_chain(self, groups):
+        """Summarize the first group, then refine the summary with each later group"""
+        summary = (await self._stuff_chain(groups[0]))["output_text"]
+        for group in groups[1:]:
+            summary = (await self._refine(summary, group))["output_text"]
+        return {"output_text": summary}
+
+    def _refine_parts(self, summary, documents):
+        """Build the refine prompt. Returns (content_parts, fallback_text)"""
+        _, text_parts, image_parts = self._stuff_parts(documents)
+        new_content = chr(10).join(text_parts)
+        prompt = f"""Here is a summary of the first part of a document:
+
+{summary}
+
+Refine this summary with the next part of the document below, including insights
+from any visual elements. Keep the same structure and return only the refined summary.
+
+Next part:
+{new_content}
+"""
+        return [prompt] + image_parts, f"{summary}\n\n{new_content}"
+
+    async def _refine(self, summary, documents):
+        content_parts, fallback_text = self._refine_parts(summary, documents)
+        return await self._generate(content_parts, fallback_text)
     
-    def _map_reduce_chain(self, documents):
+    async def _map_reduce_chain(self, groups):
         """Map-reduce approach for large documents"""
-        # First, summarize each chunk
-        chunk_summaries = []
-        
-        # Group documents by type and process in chunks
-        current_chunk = []
-        current_chunk_size = 0
-        max_chunk_size = 10000  # characters
-        
-        for doc in documents:
-            doc_size = len(doc.page_content)
-            
-            if current_chunk_size + doc_size > max_chunk_size and current_chunk:
-                # Process current chunk
-                chunk_summary = self._stuff_chain(current_chunk)
-                chunk_summaries.append(chunk_summary["output_text"])
-                current_chunk = [doc]
-                current_chunk_size = doc_size
-            else:
-                current_chunk.append(doc)
-                current_chunk_size += doc_size
-        
-        # Process remaining chunk
-        if current_chunk:
-            chunk_summary = self._stuff_chain(current_chunk)
-            chunk_summaries.append(chunk_summary["output_text"])
-        
-        # Combine chunk summaries
-        combined_text = "\n\n".join([f"Section {i+1}: {summary}" for i, summary in enumerate(chunk_summaries)])
-        
+        # Map: summarize groups concurrently, results stay in document order
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def map_group(group):
+            async with semaphore:
+                chunk_summary = await self._stuff_chain(group)
+                return chunk_summary["output_text"]
+
+        chunk_summaries = await asyncio.gather(*[map_group(group) for group in groups])
+        chunk_summaries = await self._collapse(chunk_summaries, semaphore)
+        return await self._reduce(chunk_summaries)
+
+    def _map_groups(self, documents):
+        """Group documents into prompts that fit the model's token budget"""
+        return group_by_budget(documents, self.budget, document_tokens)
+
+    async def _collapse(self, chunk_summaries, semaphore):
+        """Reduce section summaries in a tree until they fit one prompt"""
+        combined_text = self._combine(chunk_summaries)
+        while count_tokens(combined_text) > self.budget and len(chunk_summaries) > 1:
+            batches = group_by_budget(chunk_summaries, self.budget, count_tokens)
+            if len(batches) == len(chunk_summaries):
+                # Every summary is already too large to pair up; stop collapsing
+                break
+
+            async def reduce_batch(batch):
+                async with semaphore:
+                    return (await self._reduce(batch))["output_text"]
+
+            chunk_summaries = await asyncio.gather(*[reduce_batch(batch) for batch in batches])
+            combined_text = self._combine(chunk_summaries)
+        return chunk_summaries
+
+    @staticmethod
+    def _combine(summaries):
+        return "\n\n".join([f"Section {i+1}: {summary}" for i, summary in enumerate(summaries)])
+
+    def _reduce_prompt(self, summaries):
+        """Build the reduce prompt. Returns (final_prompt, combined_text)"""
+        combined_text = self._combine(summaries)
+
         final_prompt = f"""Based on these section summaries, create a comprehensive final summary:
 
 {combined_text}
 
 Provide a well-structured final summary that combines all sections."""
-        
-        try:
-            response = self.model.generate_content(final_prompt)
-            return {"output_text": response.text}
-        except Exception:
-            # Fallback
-            final_doc = Document(page_content=combined_text)
-            chain = load_summarize_chain(llm=self.fallback_llm, chain_type="stuff")
-            return chain.invoke([final_doc])
+        return final_prompt, combined_text
+
+    async def _reduce(self, summaries):
+        """Combine section summaries into one summary"""
+        final_prompt, combined_text = self._reduce_prompt(summaries)
+        return await self._generate(final_prompt, combined_text)
+
+def _load_image(doc):
+    ref = doc.metadata.get("image_ref")
+    return ref.load() if ref is not None else None
+
+
+def images_available(documents):
+    """True if every image document's bytes are still in the blob store, marking them recently used"""
+    return all(
+        doc.metadata.get("image_ref") is not None and doc.metadata["image_ref"].touch()
+        for doc in documents
+        if doc.metadata.get("type") == "image"
+    )
+
+
+def documents_from_records(records):
+    """Convert PDF extraction records into LangChain documents, images carrying a blob store ref"""
+    documents = []
+    for record in records:
+        if isinstance(record, TextRecord):
+            documents.append(Document(
+                page_content=record.text,
+                metadata={"page": record.page, "type": "text"}
+            ))
+        else:
+            # Create document with image reference
+            documents.append(Document(
+                page_content=f"[Image {record.index + 1} on page {record.page + 1}]",
+                metadata={
+                    "page": record.page,
+                    "type": "image",
+                    "image_ref": record.ref
+                }
+            ))
+    return documents
+
 
 def extract_multimodal_documents(pdf_path):
     """Extract documents in LangChain-compatible format with multimodal support"""
-    doc = fitz.open(pdf_path)
-    documents = []
-    
-    for page_num, page in enumerate(doc):
-        # Extract text
-        text = page.get_text()
-        if text.strip():
-            text_doc = Document(
-                page_content=text,
-                metadata={"page": page_num, "type": "text"}
-            )
-            documents.append(text_doc)
-        
-        # Extract images
-        for img_index, img in enumerate(page.get_images(full=True)):
-            try:
-                xref = img[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                
-                # Convert to format Gemini expects
-                pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-                buffered = io.BytesIO()
-                pil_image.save(buffered, format="PNG")
-                img_bytes = buffered.getvalue()
-                
-                # Create document with image reference
-                image_doc = Document(
-                    page_content=f"[Image {img_index + 1} on page {page_num + 1}]",
-                    metadata={
-                        "page": page_num,
-                        "type": "image", 
-                        "image_data": {
-                            "inline_data": {
-                                "mime_type": "image/png",
-                                "data": img_bytes
-                            }
-                        }
-                    }
-                )
-                documents.append(image_doc)
-                
-            except Exception as e:
-                print(f"Error processing image {img_index} on page {page_num}: {e}")
-                continue
-    
-    doc.close()
-    return documents
\ No newline at end of file
+    return documents_from_records(extract_pdf_records(pdf_path))
+
+
+# Name of the cached summary documents artefact inside a PDF cache entry
+SUMMARY_DOCUMENTS = "summary_documents.pkl"
+
+
+def prepare_summary_documents(pdf_path, progress=None):
+    """Parse and split a PDF for summarization. Returns (has_images, documents)"""
+    if progress is not None:
+        progress("parse")
+
+    with stage("pdf_parse"):
+        records = extract_pdf_records(pdf_path)
+    return summary_documents_from_records(records)
+
+
+def summary_documents_from_records(records):
+    """Split extracted records for summarization. Returns (has_images, documents)"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+
+    # Split text documents while preserving image documents
+    has_images = False
+    processed_docs = []
+    for doc in documents_from_records(records):
+        if doc.metadata.get("type") == "text":
+            processed_docs.extend(text_splitter.split_documents([doc]))
+        else:
+            has_images = True
+            processed_docs.append(doc)
+    return has_images, processed_docs
+
+
+def load_summary_documents(pdf_path, content_hash=None, progress=None):
+    """Return prepared summary documents, reusing the cached copy for known content"""
+    if content_hash is None:
+        return prepare_summary_documents(pdf_path, progress)
+
+    cached = pdf_cache.get(content_hash, SUMMARY_DOCUMENTS)
+    record_cache("pdf_summary", cached is not None)
+    if cached:
+        try:
+            with open(cached, "rb") as f:
+                prepared = pickle.load(f)
+            # Evicted image blobs mean the documents have to be extracted again
+            if images_available(prepared[1]):
+                return prepared
+        except Exception as e:
+            print(f"Error loading cached summary documents {content_hash}: {e}")
+
+    prepared = prepare_summary_documents(pdf_path, progress)
+
+    def write(path):
+        with open(path, "wb") as f:
+            pickle.dump(prepared, f)
+
+    pdf_cache.put(content_hash, SUMMARY_DOCUMENTS, write)
+    return prepared
+
+
+def pack_text_documents(documents):
+    """Split and pack plain documents into prompts that fit the Groq budget"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+    return pack_documents(text_splitter.split_documents(documents), token_budget(GROQ_MODEL))
+
+
+async def summarize_text_documents(documents):
+    """Summarize plain documents with the stuff, refine or map-reduce chain by size"""
+    packed = pack_text_documents(documents)
+    chain_type = choose_strategy(len(packed))
+    if chain_type == "map_reduce":
+        summarize_chain = load_summarize_chain(
+            llm=llm, chain_type=chain_type, token_max=token_budget(GROQ_MODEL)
+        )
+    else:
+        summarize_chain = load_summarize_chain(llm=llm, chain_type=chain_type)
+    with stage(f"summarize_{chain_type}", groups=len(packed)):
+        results = await summarize_chain.ainvoke(packed)
+    return results["output_text"]
+
+
+async def astream_text_summary(documents):
+    """Stream a summary of plain documents as (event, data) pairs, with a ``section`` per group when packed"""
+    packed = pack_text_documents(documents)
+    if len(packed) > 1:
+        semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+        chain = load_summarize_chain(llm=llm, chain_type="stuff")
+
+        async def map_group(index, doc):
+            async with semaphore:
+                return index, (await chain.ainvoke([doc]))["output_text"]
+
+        tasks = [asyncio.create_task(map_group(i, doc)) for i, doc in enumerate(packed)]
+        summaries = [None] * len(packed)
+        try:
+            for finished in asyncio.as_completed(tasks):
+                index, summary = await finished
+                summaries[index] = summary
+                yield "section", {"index": index, "summary": summary}
+        finally:
+            # The client disconnected or a section failed: stop the remaining calls
+            for task in tasks:
+                task.cancel()
+        text = truncate_to_budget("\n\n".join(summaries), token_budget(GROQ_MODEL))
+    else:
+        text = "\n\n".join(doc.page_content for doc in packed)
+
+    async for token in cached_astream(llm, STUFF_SUMMARY_PROMPT.format(text=text)):
+        yield "token", token
+
+
+async def summarize_documents(has_images, documents):
+    """Summarize prepared documents with the multimodal or text-only chain"""
+    if has_images:
+        # Use custom multimodal chain, sized to the document
+        multimodal_chain = MultimodalSummarizeChain(chain_type="auto")
+        results = await multimodal_chain.ainvoke(documents)
+        return results["output_text"]
+    # Use standard LangChain chains for text-only PDFs
+    return await summarize_text_documents(documents)
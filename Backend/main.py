@@ -1,6 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+import time
 from fastapi.middleware.cors import CORSMiddleware
-from routes import summarizeRoutes, quizRoutes
+from routes import summarizeRoutes, quizRoutes, jobRoutes, libraryRoutes
+from controllers.jobController import start_job_watcher
+from utils import executor
+from utils.models import models
+from utils.llm_cache import llm_cache, cache_bypass
+from utils.llm_gateway import gateway
+from utils.metrics import HTTP_SECONDS, QUEUE_DEPTH, span, metrics_payload, cache_hit_rates
+from utils.config import MODEL_WARMUP
 
 
 app = FastAPI()
@@ -14,10 +23,84 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def llm_cache_bypass(request: Request, call_next):
+    """``X-Cache-Bypass: 1`` forces fresh LLM responses for this request"""
+    bypass = request.headers.get("x-cache-bypass", "").lower() in ("1", "true", "yes")
+    token = cache_bypass.set(bypass)
+    try:
+        return await call_next(request)
+    finally:
+        cache_bypass.reset(token)
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """Request latency per route template, traced as the parent of stage spans"""
+    start = time.perf_counter()
+    status = 500
+    with span(f"{request.method} {request.url.path}") as current:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Label by route template so ids in paths do not create new series
+            route = request.scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            if current is not None:
+                current.set_attribute("http.route", route)
+                current.set_attribute("http.status_code", status)
+            HTTP_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - start)
+
+
+QUEUE_DEPTH.set_function(executor.queue_depth)
+
+
 app.include_router(summarizeRoutes.router, prefix="/summary")
 app.include_router(quizRoutes.router, prefix="/quiz")
+app.include_router(jobRoutes.router, prefix="/jobs")
+app.include_router(libraryRoutes.router, prefix="/library")
 
 
 @app.get("/")
 async def root():
     return {"message": "System is running"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once every model is loaded, 503 while warming up"""
+    status_code = 200 if models.ready() else 503
+    return JSONResponse(status_code=status_code, content={"ready": models.ready(), "models": models.status()})
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """LLM response cache size and hit rates since startup"""
+    return {**await executor.run_io(llm_cache.stats), "hit_rates": cache_hit_rates()}
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Per-provider LLM latency percentiles, in-flight calls, retries, hedges and failovers"""
+    return gateway.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage and request latency, document sizes, LLM usage, cache hits"""
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+
+@app.on_event("startup")
+async def startup():
+    start_job_watcher()
+    if MODEL_WARMUP:
+        models.start_warm_up()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    executor.shutdown()
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from schemas.jobSchema import JobSubmitted, JobStatus
+from controllers.jobController import job_store, job_status, submit_job
+from utils.executor import run_io
+from utils.uploads import save_upload
+from utils.config import JOB_UPLOAD_DIR
+
+router = APIRouter()
+
+
+async def save_job_upload(file):
+    """Persist an upload for a background job. Returns (path, content hash)"""
+    return await save_upload(file, dir=JOB_UPLOAD_DIR)
+
+
+def submitted(job, deduplicated):
+    return {"job_id": job["job_id"], "status": job["status"], "deduplicated": deduplicated}
+
+
+@router.post("/quiz/pdf", response_model=JobSubmitted, status_code=202)
+async def submitQuizPdfJob(
+    file: UploadFile = File(...),
+    specificArea: str = Form(...),
+    no: int = Form(...),
+    difficulty: str = Form(...)
+):
+    path, pdf_hash = await save_job_upload(file)
+    params = {"specificArea": specificArea, "no": no, "difficulty": difficulty}
+    return submitted(*await submit_job("quiz_pdf", path, pdf_hash, params))
+
+
+@router.post("/summary/pdf", response_model=JobSubmitted, status_code=202)
+async def submitSummaryPdfJob(file: UploadFile = File(...)):
+    path, pdf_hash = await save_job_upload(file)
+    return submitted(*await submit_job("summary_pdf", path, pdf_hash, {}))
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def getJobStatus(job_id: str):
+    job = await run_io(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+
+@router.get("/{job_id}/result")
+async def getJobResult(job_id: str):
+    job = await run_io(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
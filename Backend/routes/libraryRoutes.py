@@ -0,0 +1,109 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header, Response
+import os
+import validators
+from schemas.librarySchema import LibraryDocument, LibraryYoutubeRequest, LibraryQuizRequest
+from schemas.quizScehma import QuizResponse
+from controllers.libraryController import (
+    ingest_pdf,
+    ingest_youtube,
+    missing_documents,
+    library_quiz,
+    library_summary,
+)
+from utils.config import LIBRARY_MAX_QUERY_DOCS
+from utils.document_library import get_library, check_id
+from utils.executor import run_io
+from utils.uploads import save_upload
+
+router = APIRouter()
+
+
+def user_library_id(x_user_id):
+    """Library id from the X-User-Id header, trusted as set by an authenticating gateway"""
+    try:
+        return check_id(x_user_id, "user id")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("", response_model=List[LibraryDocument])
+async def listDocuments(x_user_id: str = Header(...)):
+    library = await run_io(get_library, user_library_id(x_user_id))
+    return await run_io(library.list_documents)
+
+
+@router.post("/pdf", response_model=LibraryDocument, status_code=201)
+async def addPdf(
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    x_user_id: str = Header(...)
+):
+    user_id = user_library_id(x_user_id)
+    tmp_path, pdf_hash = await save_upload(file)
+    try:
+        return await ingest_pdf(user_id, tmp_path, pdf_hash, title or file.filename)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error adding PDF: {str(e)}")
+    finally:
+        try:
+            os.remove(tmp_path)
+        except Exception:
+            pass
+
+
+@router.post("/youtube", response_model=LibraryDocument, status_code=201)
+async def addYoutube(request: LibraryYoutubeRequest, x_user_id: str = Header(...)):
+    user_id = user_library_id(x_user_id)
+    if not validators.url(request.url):
+        raise HTTPException(status_code=400, detail="Invalid URL")
+    try:
+        return await run_io(ingest_youtube, user_id, request.url, request.title)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error adding video: {str(e)}")
+
+
+@router.delete("/{doc_id}", status_code=204)
+async def deleteDocument(doc_id: str, x_user_id: str = Header(...)):
+    library = await run_io(get_library, user_library_id(x_user_id))
+    if not await run_io(library.delete_document, doc_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return Response(status_code=204)
+
+
+@router.post("/quiz", response_model=QuizResponse)
+async def quizFromLibrary(request: LibraryQuizRequest, x_user_id: str = Header(...)):
+    user_id = user_library_id(x_user_id)
+    if not request.doc_ids:
+        raise HTTPException(status_code=400, detail="At least one document id is required")
+    if len(request.doc_ids) > LIBRARY_MAX_QUERY_DOCS:
+        raise HTTPException(status_code=400, detail=f"At most {LIBRARY_MAX_QUERY_DOCS} documents per query")
+    missing = await run_io(missing_documents, user_id, request.doc_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Documents not found: {', '.join(missing)}")
+
+    try:
+        quiz = await library_quiz(user_id, request.doc_ids, request.specificArea, request.no, request.difficulty)
+        return {"quiz": quiz}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating quiz: {str(e)}")
+
+
+@router.post("/{doc_id}/summary")
+async def summarizeFromLibrary(doc_id: str, x_user_id: str = Header(...)):
+    user_id = user_library_id(x_user_id)
+    if await run_io(missing_documents, user_id, [doc_id]):
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    try:
+        return {"summary": await library_summary(user_id, doc_id)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error summarizing document: {str(e)}")
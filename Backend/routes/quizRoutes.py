@@ -1,30 +1,64 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from schemas.quizScehma import youtubeQuiz, QuizResponse
+# Module access for the youtubeQuiz schema, whose name the youtubeQuiz handler shadows
+from schemas import quizScehma
+from schemas.quizScehma import youtubeQuiz, QuizResponse, QuizSpec, youtubeQuizBatch, BatchQuizResponse
+from pydantic import ValidationError, TypeAdapter
+from typing import List
+import asyncio
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import validators
-from langchain_groq import ChatGroq
-from dotenv import load_dotenv
 import os
-import tempfile
-from utils.helpers import get_youtube_content
+from utils.helpers import get_youtube_content, extract_video_id
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from utils.embedding_service import BatchedEmbeddings
 from langchain.prompts import PromptTemplate
-import json
-from controllers.quizController import get_related_docs
-import google.generativeai as genai
-
-genai.configure(api_key = os.getenv("GOOGLE_API_KEY"))
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-load_dotenv()
+import hashlib
+from controllers.quizController import (
+    get_related_docs,
+    get_related_docs_batch,
+    pdf_quiz_contents,
+    generate_pdf_quiz,
+    generate_quiz_text,
+    stream_quiz_text,
+)
+from utils.uploads import save_upload
+from utils.vector_registry import VectorStoreRegistry, is_valid_key
+from utils.executor import run_cpu
+from utils.quiz_parser import IncrementalQuizParser, normalize_question, complete_quiz
+from utils.sse import sse_event, sse_response
+from utils.llm_cache import cached_astream, near_duplicate
+from utils.llm_gateway import groq_llm
+from utils.metrics import stage, record_document
+from utils.config import (
+    YOUTUBE_INDEX_DIR,
+    YOUTUBE_INDEX_MEMORY_ENTRIES,
+    YOUTUBE_INDEX_MAX_BYTES,
+    YOUTUBE_INDEX_TTL,
+    QUIZ_CONTEXT_TOKENS,
+    RETRIEVAL_CANDIDATES,
+    QUIZ_BATCH_MAX_TOPICS,
+    QUIZ_BATCH_CONCURRENCY,
+)
+from utils.context_packer import pack, document_tokens
+from langchain_core.runnables import RunnableLambda
+from utils.hybrid_search import HybridRetriever
+from functools import partial
+import weakref
+
+embedding_model = BatchedEmbeddings()
+video_indexes = VectorStoreRegistry(
+    os.path.join(YOUTUBE_INDEX_DIR, "all-MiniLM-L6-v2"),
+    embedding_model,
+    YOUTUBE_INDEX_MEMORY_ENTRIES,
+    name="video_index",
+    max_bytes=YOUTUBE_INDEX_MAX_BYTES,
+    ttl=YOUTUBE_INDEX_TTL,
+)
 
-groq_api_key = os.getenv("GROQ_API_KEY")
 router = APIRouter()
-llm = ChatGroq(model="llama-3.3-70b-versatile", api_key=groq_api_key)
+llm = groq_llm
 
 # llm = OllamaLLM(model="tinyllama:latest")
 
@@ -60,47 +94,85 @@ IMPORTANT: Your response must be ONLY a JSON array in this exact format with no
 ]
 
 Do not include any other text, explanation, or formatting outside the JSON array.
-""",
-    input_variables=["area", "no", "difficulty", "context"]
+{avoid}""",
+    input_variables=["area", "no", "difficulty", "context"],
+    # Follow-up generations list the questions already accepted here
+    partial_variables={"avoid": ""}
 )
 
-def create_quiz_prompt(area, no, difficulty):
-    return f"""You are a quiz generation bot. Generate a properly formatted JSON array of quiz questions.
-
-Constraints:
-- Topic: {area}
-- Number of Questions: {no}
-- Difficulty: {difficulty}
-
-IMPORTANT: Your response must be ONLY a JSON array in this exact format with no additional text:
-[
-  {{
-    "id": 1,
-    "question": "Question text here",
-    "options": ["Option A", "Option B", "Option C", "Option D"],
-    "correct": 0,
-    "difficulty": "{difficulty}"
-  }}
-]
-
-Do not include any other text, explanation, or formatting outside the JSON array.
-Create the question based on provided context:
-"""
+def youtube_quiz_query(area, no, difficulty):
+    return f"Generate {no} quiz questions about {area} at {difficulty} difficulty"
 
 
+def build_video_index(url):
+    """Fetch, split and embed a video transcript into a FAISS store"""
+    documents = get_youtube_content(url)
 
-def retrieval_chain(documents):
     # Split documents into chunks
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=100
     )
     docs = text_splitter.split_documents(documents)
+    record_document("youtube", chunks=len(docs))
 
-        
     # Create FAISS vector store with embedding model
-    faiss_db = FAISS.from_documents(docs, embedding_model)
-    retriever = faiss_db.as_retriever(search_type="mmr", search_kwargs={"k": 5})
+    with stage("index_build"):
+        return FAISS.from_documents(docs, embedding_model)
+
+
+def video_key(url):
+    """Index key for a video: its id, or a digest of the URL when the id is missing or unsafe"""
+    video_id = extract_video_id(url)
+    if is_valid_key(video_id):
+        return video_id
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def get_video_index(url):
+    """Return the FAISS store for a video, building it only on a cold miss"""
+    return video_indexes.get_or_build(video_key(url), lambda: build_video_index(url))
+
+
+def quiz_cache_scope(source, no, difficulty):
+    """Near-duplicate cache scope: quizzes are reused only within one source and shape"""
+    return f"quiz:{source}:{no}:{difficulty}"
+
+
+def pack_quiz_context(docs):
+    """Keep the retrieved chunks, in relevance order, that fit the quiz context budget"""
+    return pack(docs, QUIZ_CONTEXT_TOKENS, size=document_tokens)
+
+
+# BM25 + dense retrievers per loaded video index, dropped with the index
+_video_retrievers = weakref.WeakKeyDictionary()
+
+
+def hybrid_video_retriever(faiss_db):
+    retriever = _video_retrievers.get(faiss_db)
+    if retriever is None:
+        retriever = HybridRetriever.from_vector_store(faiss_db)
+        _video_retrievers[faiss_db] = retriever
+    return retriever
+
+
+def search_video(faiss_db, query, query_embedding=None):
+    """Transcript chunks for a query by hybrid search, packed to the token budget"""
+    if query_embedding is None:
+        with stage("embed_query"):
+            query_embedding = embedding_model.embed_query(query)
+    with stage("retrieve"):
+        docs = hybrid_video_retriever(faiss_db).search(query, query_embedding, k=RETRIEVAL_CANDIDATES)
+        return pack_quiz_context(docs)
+
+
+def video_retriever(faiss_db):
+    """Query -> transcript chunks, over-fetched then packed to the token budget"""
+    return RunnableLambda(partial(search_video, faiss_db))
+
+
+def retrieval_chain(faiss_db):
+    retriever = RunnableLambda(lambda inputs: inputs["input"]) | video_retriever(faiss_db)
 
     # Create document chain
     combine_docs_chain = create_stuff_documents_chain(llm, prompt)
@@ -123,23 +195,29 @@ async def youtubeQuiz(request: youtubeQuiz):
         noQuestions = request.no
         difficultyLevel = request.difficulty
 
-        # Get YouTube content
-        documents = get_youtube_content(request.url)
-
-        # Create retrieval chain
-        chain = retrieval_chain(documents)
-
-        # Generate quiz
-        result = chain.invoke({
-            "input": f"Generate {noQuestions} quiz questions about {specificArea} at {difficultyLevel} difficulty",
-            "area": specificArea,
-            "no": noQuestions,
-            "difficulty": difficultyLevel
-        })
-        
-        parsed_quiz = json.loads(result["answer"])
+        async def generate():
+            # Create retrieval chain from the (cached) video index
+            chain = retrieval_chain(await run_cpu(get_video_index, request.url))
+
+            # Generate quiz, then ask only for missing questions
+            async def answer(count, avoid):
+                result = await chain.ainvoke({
+                    "input": youtube_quiz_query(specificArea, noQuestions, difficultyLevel),
+                    "area": specificArea,
+                    "no": count,
+                    "difficulty": difficultyLevel,
+                    "avoid": avoid
+                })
+                return result["answer"]
+
+            return await complete_quiz(answer, noQuestions, difficultyLevel)
+
+        scope = quiz_cache_scope(f"youtube:{video_key(request.url)}", noQuestions, difficultyLevel)
+        parsed_quiz = await near_duplicate(scope, specificArea, generate)
         return {"quiz": parsed_quiz}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating quiz: {str(e)}")
     
@@ -151,49 +229,232 @@ async def pdfQuiz(
     no: int = Form(...),
     difficulty: str = Form(...)
 ):
-    # Save to a temporary file 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        contents = await file.read()
-        tmp.write(contents)
-        tmp_path = tmp.name
+    # Stream the upload to a temporary file
+    tmp_path, pdf_hash = await save_upload(file)
 
     try:
 
-        context_parts = get_related_docs(tmp_path, specificArea)
-        
-        # Separate text and image parts
-        text_parts = [part for part in context_parts if isinstance(part, str)]
-        image_parts = [part for part in context_parts if isinstance(part, dict)]
-        
-        # Create proper Gemini input
-        full_prompt = create_quiz_prompt(specificArea, no, difficulty) + "\n".join(text_parts)
-        
-        contents = [full_prompt] + image_parts
-        
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        response = model.generate_content(contents)
-
-
-        response_text = (response.text or "").strip()
-        if response_text.startswith("```"):
-            # remove code fences like ```json ... ```
-            response_text = response_text.strip("`")
-            if response_text.lower().startswith("json"):
-                response_text = response_text[4:].strip()
-        # extract the JSON array
-        start = response_text.find("[")
-        end = response_text.rfind("]")
-        if start == -1 or end == -1:
-            raise ValueError("Model did not return a JSON array.")
-        payload = response_text[start:end+1]
-        parsed_quiz = json.loads(payload)
+        async def generate():
+            context_parts = await run_cpu(get_related_docs, tmp_path, specificArea, pdf_hash)
+            return await generate_pdf_quiz(context_parts, specificArea, no, difficulty)
+
+        parsed_quiz = await near_duplicate(quiz_cache_scope(f"pdf:{pdf_hash}", no, difficulty), specificArea, generate)
 
         return {"quiz": parsed_quiz}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating quiz from PDF: {str(e)}")
     finally:
         try:
             os.remove(tmp_path)
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+
+async def stream_quiz_events(tokens, no, difficulty, follow_up=None):
+    """SSE question events from streamed model text, then the final quiz; ``follow_up`` fills any shortfall"""
+    parser = IncrementalQuizParser()
+    quiz = []
+    async for token in tokens:
+        for question in parser.feed(token):
+            # Validated as each one completes, so numeric answers are 0-based as the prompt asks
+            question = normalize_question(question, difficulty)
+            if question is None or len(quiz) >= no:
+                continue
+            question["id"] = len(quiz) + 1
+            quiz.append(question)
+            yield sse_event("question", question)
+
+    if follow_up is not None and len(quiz) < no:
+        streamed = len(quiz)
+        quiz = await complete_quiz(follow_up, no, difficulty, questions=quiz)
+        for question in quiz[streamed:]:
+            yield sse_event("question", question)
+    yield sse_event("done", {"quiz": quiz})
+
+
+@router.post("/youtube/stream")
+async def youtubeQuizStream(request: quizScehma.youtubeQuiz):
+    if not validators.url(request.url):
+        raise HTTPException(status_code=400, detail="Invalid URL")
+
+    async def events():
+        try:
+            faiss_db = await run_cpu(get_video_index, request.url)
+            query = youtube_quiz_query(request.specificArea, request.no, request.difficulty)
+            context_docs = await video_retriever(faiss_db).ainvoke(query)
+            context = "\n\n".join(doc.page_content for doc in context_docs)
+
+            def quiz_prompt(count, avoid=""):
+                return prompt.format(
+                    area=request.specificArea,
+                    no=count,
+                    difficulty=request.difficulty,
+                    context=context,
+                    avoid=avoid
+                )
+
+            async def tokens():
+                async for token in cached_astream(llm, quiz_prompt(request.no)):
+                    yield token
+
+            async def follow_up(count, avoid):
+                return (await llm.ainvoke(quiz_prompt(count, avoid))).content
+
+            async for event in stream_quiz_events(tokens(), request.no, request.difficulty, follow_up):
+                yield event
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error generating quiz: {str(e)}"})
+
+    return sse_response(events())
+
+
+@router.post("/pdf/stream")
+async def pdfQuizStream(
+    file: UploadFile = File(...),
+    specificArea: str = Form(...),
+    no: int = Form(...),
+    difficulty: str = Form(...)
+):
+    # The upload is saved before streaming starts; the request body is gone afterwards
+    tmp_path, pdf_hash = await save_upload(file)
+
+    async def events():
+        try:
+            context_parts = await run_cpu(get_related_docs, tmp_path, specificArea, pdf_hash)
+            contents = pdf_quiz_contents(context_parts, specificArea, no, difficulty)
+
+            async def follow_up(count, avoid):
+                return await generate_quiz_text(pdf_quiz_contents(context_parts, specificArea, count, difficulty, avoid))
+
+            async for event in stream_quiz_events(stream_quiz_text(contents), no, difficulty, follow_up):
+                yield event
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error generating quiz from PDF: {str(e)}"})
+        finally:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+
+    return sse_response(events())
+
+
+def check_topics(topics):
+    if not topics:
+        raise HTTPException(status_code=400, detail="At least one topic is required")
+    if len(topics) > QUIZ_BATCH_MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"At most {QUIZ_BATCH_MAX_TOPICS} topics per batch")
+    areas = [topic.specificArea for topic in topics]
+    if len(set(areas)) != len(areas):
+        raise HTTPException(status_code=400, detail="Topic specificArea values must be unique")
+
+
+async def run_topics(topics, generate):
+    """Run ``generate(index, topic)`` for every topic concurrently; a failing topic only fails its own entry"""
+    semaphore = asyncio.Semaphore(QUIZ_BATCH_CONCURRENCY)
+
+    async def run(index, topic):
+        async with semaphore:
+            try:
+                return {"quiz": await generate(index, topic)}
+            except Exception as e:
+                return {"error": f"Error generating quiz: {str(e)}"}
+
+    results = await asyncio.gather(*[run(i, topic) for i, topic in enumerate(topics)])
+    return {"results": {topic.specificArea: result for topic, result in zip(topics, results)}}
+
+
+def retrieve_video_contexts(faiss_db, queries):
+    """Packed transcript context per query, with all queries embedded in one batch"""
+    query_embeddings = embedding_model.embed_documents(queries)
+    return [
+        search_video(faiss_db, query, query_embedding)
+        for query, query_embedding in zip(queries, query_embeddings)
+    ]
+
+
+@router.post("/youtube/batch", response_model = BatchQuizResponse)
+async def youtubeBatchQuiz(request: youtubeQuizBatch):
+    if not validators.url(request.url):
+        raise HTTPException(status_code=400, detail="Invalid URL")
+    check_topics(request.topics)
+
+    try:
+        faiss_db = await run_cpu(get_video_index, request.url)
+        queries = [youtube_quiz_query(t.specificArea, t.no, t.difficulty) for t in request.topics]
+        contexts = await run_cpu(retrieve_video_contexts, faiss_db, queries)
+        quiz_chain = create_stuff_documents_chain(llm, prompt)
+
+        source = f"youtube:{video_key(request.url)}"
+
+        async def generate(index, topic):
+            async def answer(count, avoid):
+                return await quiz_chain.ainvoke({
+                    "context": contexts[index],
+                    "area": topic.specificArea,
+                    "no": count,
+                    "difficulty": topic.difficulty,
+                    "avoid": avoid
+                })
+
+            scope = quiz_cache_scope(source, topic.no, topic.difficulty)
+            return await near_duplicate(
+                scope,
+                topic.specificArea,
+                lambda: complete_quiz(answer, topic.no, topic.difficulty)
+            )
+
+        return await run_topics(request.topics, generate)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating quizzes: {str(e)}")
+
+
+@router.post("/pdf/batch", response_model = BatchQuizResponse)
+async def pdfBatchQuiz(
+    file: UploadFile = File(...),
+    # JSON array of {"specificArea", "no", "difficulty"} objects
+    topics: str = Form(...)
+):
+    try:
+        specs = TypeAdapter(List[QuizSpec]).validate_json(topics)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid topics: {str(e)}")
+    check_topics(specs)
+
+    # Stream the upload to a temporary file
+    tmp_path, pdf_hash = await save_upload(file)
+
+    try:
+        contexts = await run_cpu(
+            get_related_docs_batch, tmp_path, [spec.specificArea for spec in specs], pdf_hash
+        )
+
+        async def generate(index, spec):
+            scope = quiz_cache_scope(f"pdf:{pdf_hash}", spec.no, spec.difficulty)
+            return await near_duplicate(
+                scope,
+                spec.specificArea,
+                lambda: generate_pdf_quiz(contexts[index], spec.specificArea, spec.no, spec.difficulty)
+            )
+
+        return await run_topics(specs, generate)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating quizzes from PDF: {str(e)}")
+    finally:
+        try:
+            os.remove(tmp_path)
+        except Exception:
+            pass
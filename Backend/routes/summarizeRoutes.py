@@ -1,28 +1,20 @@
 import os
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from schemas.summarySchema import youtubeRequest
-from langchain.chains.summarize import load_summarize_chain
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import validators
-from langchain_groq import ChatGroq
-from dotenv import load_dotenv
-import tempfile
 from utils.helpers import get_youtube_content
-import google.generativeai as genai
-import fitz
-from langchain_core.documents import Document
-from controllers.summarizeController import extract_multimodal_documents, MultimodalSummarizeChain
-
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-google_api_key = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=google_api_key)
+from controllers.summarizeController import (
+    load_summary_documents,
+    summarize_documents,
+    summarize_text_documents,
+    astream_text_summary,
+    MultimodalSummarizeChain,
+)
+from utils.uploads import save_upload
+from utils.executor import run_cpu, run_io
+from utils.sse import sse_event, sse_response
 
 router = APIRouter()
-llm = ChatGroq(model="llama-3.3-70b-versatile", api_key=groq_api_key)
-gemini_llm = genai.GenerativeModel('gemini-2.0-flash-exp')
 
 
 @router.post("/youtube")
@@ -31,72 +23,28 @@ async def summarizeYoutube(request: youtubeRequest):
         raise HTTPException(status_code=400, detail="Invalid URL")
     
     try:
-        docs = get_youtube_content(request.url)
-        summarize_chain = load_summarize_chain(llm=llm, chain_type="stuff")
-        results = summarize_chain.invoke(docs)
-        return {"summary": results["output_text"]}
+        docs = await run_io(get_youtube_content, request.url)
+        return {"summary": await summarize_text_documents(docs)}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error summarizing video: {str(e)}")
 
 @router.post("/pdf")
 async def summarizePDF(file: UploadFile = File(...)):
-    # Save to a temporary file 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        contents = await file.read()
-        tmp.write(contents)
-        tmp_path = tmp.name
+    # Stream the upload to a temporary file
+    tmp_path, pdf_hash = await save_upload(file)
 
     try:
-        # Check if PDF contains images
-        doc = fitz.open(tmp_path)
-        has_images = any(page.get_images() for page in doc)
-        doc.close()
-        
-        if has_images:
-            # Use multimodal approach
-            documents = extract_multimodal_documents(tmp_path)
-            
-            # Split text documents while preserving image documents
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            
-            processed_docs = []
-            for doc in documents:
-                if doc.metadata.get("type") == "text":
-                    split_docs = text_splitter.split_documents([doc])
-                    processed_docs.extend(split_docs)
-                else:
-                    processed_docs.append(doc)
-            
-            # Use custom multimodal chain
-            multimodal_chain = MultimodalSummarizeChain(chain_type="map_reduce")
-            results = multimodal_chain.invoke(processed_docs)
-            
-            return {
-                "summary": results["output_text"]
-            }
-        
-        else:
-            # Use standard LangChain approach for text-only PDFs
-            loader = PyPDFLoader(tmp_path)
-            documents = loader.load()
-
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            docs = text_splitter.split_documents(documents)
-
-            summarize_chain = load_summarize_chain(llm=llm, chain_type="stuff")
-            results = summarize_chain.invoke(docs)
-            
-            return {
-                "summary": results["output_text"]
-            }
+        has_images, documents = await run_cpu(load_summary_documents, tmp_path, pdf_hash)
+
+        return {
+            "summary": await summarize_documents(has_images, documents)
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error summarizing PDF: {str(e)}")
     
@@ -105,4 +53,62 @@ async def summarizePDF(file: UploadFile = File(...)):
         try:
             os.remove(tmp_path)
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+
+async def summary_events(stream):
+    """Turn (event, data) pairs into SSE events plus a final summary"""
+    summary = []
+    async for event, data in stream:
+        if event == "token":
+            summary.append(data)
+            yield sse_event("token", {"text": data})
+        else:
+            yield sse_event(event, data)
+    yield sse_event("done", {"summary": "".join(summary)})
+
+
+@router.post("/youtube/stream")
+async def summarizeYoutubeStream(request: youtubeRequest):
+    if not validators.url(request.url):
+        raise HTTPException(status_code=400, detail="Invalid URL")
+
+    async def events():
+        try:
+            docs = await run_io(get_youtube_content, request.url)
+            async for event in summary_events(astream_text_summary(docs)):
+                yield event
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error summarizing video: {str(e)}"})
+
+    return sse_response(events())
+
+
+@router.post("/pdf/stream")
+async def summarizePDFStream(file: UploadFile = File(...)):
+    # The upload is saved before streaming starts; the request body is gone afterwards
+    tmp_path, pdf_hash = await save_upload(file)
+
+    async def events():
+        try:
+            has_images, documents = await run_cpu(load_summary_documents, tmp_path, pdf_hash)
+            if has_images:
+                stream = MultimodalSummarizeChain(chain_type="auto").astream(documents)
+            else:
+                stream = astream_text_summary(documents)
+
+            async for event in summary_events(stream):
+                yield event
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error summarizing PDF: {str(e)}"})
+        finally:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+
+    return sse_response(events())
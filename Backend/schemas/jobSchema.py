@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str
+    # True when an identical in-flight job was reused instead of a new one
+    deduplicated: bool
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    stage: Optional[str] = None
+    stages: List[str]
+    progress: float
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class LibraryDocument(BaseModel):
+    doc_id: str
+    kind: str
+    title: Optional[str] = None
+    source: Optional[str] = None
+    has_images: bool
+    text_chunks: int
+    images: int
+    created_at: float
+
+
+class LibraryYoutubeRequest(BaseModel):
+    url: str
+    title: Optional[str] = None
+
+
+class LibraryQuizRequest(BaseModel):
+    doc_ids: List[str]
+    specificArea: str
+    no: int
+    difficulty: str
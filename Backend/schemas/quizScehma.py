@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 
 class youtubeQuiz(BaseModel):
     url:str
@@ -16,4 +16,24 @@ class QuizQuestion(BaseModel):
     difficulty: str
 
 class QuizResponse(BaseModel):
-    quiz: List[QuizQuestion]
\ No newline at end of file
+    quiz: List[QuizQuestion]
+
+class QuizSpec(BaseModel):
+    specificArea : str
+    no : int
+    difficulty : str
+
+
+class youtubeQuizBatch(BaseModel):
+    url : str
+    topics : List[QuizSpec]
+
+
+class TopicQuizResult(BaseModel):
+    quiz: Optional[List[QuizQuestion]] = None
+    error: Optional[str] = None
+
+
+class BatchQuizResponse(BaseModel):
+    # Keyed by specificArea
+    results: Dict[str, TopicQuizResult]
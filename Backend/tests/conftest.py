@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The LLM clients are built at import time and only need some key to exist;
+# tests never call the real APIs
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("MODEL_WARMUP", "false")
+# Stores created at import time write here rather than to the user's cache
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="quizgen-tests-"))
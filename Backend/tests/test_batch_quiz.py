@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+# Everything routes.quizRoutes imports
+QUIZ_ROUTE_DEPENDENCIES = (
+    "langchain", "langchain_community", "fastapi", "multipart", "validators", "youtube_transcript_api", "yt_dlp",
+)
+for module in QUIZ_ROUTE_DEPENDENCIES:
+    pytest.importorskip(module)
+
+from fastapi import HTTPException  # noqa: E402
+from routes import quizRoutes  # noqa: E402
+from routes.quizRoutes import check_topics, run_topics  # noqa: E402
+from schemas.quizScehma import BatchQuizResponse, QuizSpec  # noqa: E402
+
+QUESTION = {"id": 1, "question": "q", "options": ["a", "b"], "correct": 1, "difficulty": "easy"}
+
+
+def specs(*areas):
+    return [QuizSpec(specificArea=area, no=1, difficulty="easy") for area in areas]
+
+
+@pytest.mark.parametrize("topics, detail", [
+    ([], "At least one topic is required"),
+    (specs("cells", "cells"), "Topic specificArea values must be unique"),
+])
+def test_invalid_batches_are_rejected(topics, detail):
+    with pytest.raises(HTTPException) as excinfo:
+        check_topics(topics)
+    assert excinfo.value.status_code == 400 and excinfo.value.detail == detail
+
+
+def test_batches_are_capped(monkeypatch):
+    monkeypatch.setattr(quizRoutes, "QUIZ_BATCH_MAX_TOPICS", 2)
+    with pytest.raises(HTTPException):
+        check_topics(specs("a", "b", "c"))
+    check_topics(specs("a", "b"))
+
+
+def test_topics_run_concurrently_and_fail_independently(monkeypatch):
+    monkeypatch.setattr(quizRoutes, "QUIZ_BATCH_CONCURRENCY", 2)
+    in_flight = []
+    peak = []
+
+    async def generate(index, topic):
+        in_flight.append(index)
+        peak.append(len(in_flight))
+        try:
+            await asyncio.sleep(0.01)
+            if topic.specificArea == "broken":
+                raise ValueError("model returned no questions")
+            return [QUESTION]
+        finally:
+            in_flight.remove(index)
+
+    result = asyncio.run(run_topics(specs("cells", "broken", "genes", "atoms"), generate))
+
+    assert max(peak) == 2
+    assert result["results"]["broken"] == {"error": "Error generating quiz: model returned no questions"}
+    assert result["results"]["cells"] == {"quiz": [QUESTION]}
+    BatchQuizResponse.model_validate(result)
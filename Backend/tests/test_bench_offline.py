@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("PIL")
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from benchmarks import stubs  # noqa: E402
+from benchmarks.bench_offline import compare, percentile  # noqa: E402
+from utils.quiz_parser import parse_quiz  # noqa: E402
+
+QUIZ_PROMPT = "Constraints:\n- Number of Questions: 3\n- Difficulty: hard\n"
+
+
+@pytest.fixture(autouse=True)
+def no_latency(monkeypatch):
+    monkeypatch.setattr(stubs, "LATENCY", {name: 0 for name in stubs.LATENCY})
+
+
+def test_responses_are_deterministic_valid_quizzes():
+    assert stubs.respond(QUIZ_PROMPT) == stubs.respond(QUIZ_PROMPT)
+    quiz = parse_quiz(stubs.respond(QUIZ_PROMPT))
+    assert len(quiz) == 3 and {q["difficulty"] for q in quiz} == {"hard"}
+    assert len(stubs.respond("Summarize this").split()) > 50
+
+
+def test_stub_chat_model_invokes_and_streams_the_same_text():
+    model = stubs.StubChatGroq(model="m")
+    message = model.invoke([HumanMessage(content=QUIZ_PROMPT)])
+    assert message.response_metadata["token_usage"]["completion_tokens"] == len(message.content) // 4
+
+    async def stream():
+        return "".join([chunk.content async for chunk in model.astream([HumanMessage(content=QUIZ_PROMPT)])])
+
+    assert asyncio.run(stream()) == message.content
+
+
+def test_stub_gemini_streams_the_same_text():
+    model = stubs.StubGenerativeModel("gemini")
+    prompt = ["Summarize", {"mime_type": "image/png", "data": b""}]
+
+    async def run():
+        response = await model.generate_content_async(prompt)
+        streamed = await model.generate_content_async(prompt, stream=True)
+        return response.text, "".join([chunk.text async for chunk in streamed])
+
+    text, streamed = asyncio.run(run())
+    assert text == streamed == model.generate_content(prompt).text
+
+
+def result(p95, stage_p95):
+    latency = {"p50": 0.1, "p95": p95, "p99": p95}
+    return {"scenarios": {"quiz_pdf": {
+        "latency": latency, "stages": {"embed_text": {"count": 1, "p50": 0.0, "p95": stage_p95, "p99": 0.0}},
+    }}}
+
+
+def test_compare_flags_only_slowdowns_beyond_the_tolerance():
+    baseline = result(1.0, 0.5)
+    assert compare(baseline, result(1.1, 0.55), 0.2) == []
+    regressions = compare(baseline, result(1.3, 0.7), 0.2)
+    assert [line.split(":")[0] for line in regressions] == [
+        "quiz_pdf requests p95", "quiz_pdf requests p99", "quiz_pdf embed_text p95",
+    ]
+    # Scenarios and stages missing from the baseline are not compared
+    assert compare({"scenarios": {}}, result(9.0, 9.0), 0.2) == []
+
+
+def test_percentile():
+    assert percentile([], 95) == 0.0
+    assert percentile([3, 1, 2, 4], 50) == 3
+    assert percentile([3, 1, 2, 4], 99) == 4
@@ -0,0 +1,60 @@
+import os
+import stat
+import time
+import pytest
+
+pytest.importorskip("dotenv")
+
+from utils.blob_store import ImageBlobStore  # noqa: E402
+
+
+def age(ref, seconds):
+    then = time.time() - seconds
+    os.utime(ref.path, (then, then))
+
+
+def test_identical_bytes_are_stored_once(tmp_path):
+    store = ImageBlobStore(str(tmp_path / "blobs"), max_bytes=10 ** 6)
+    first = store.put(b"png bytes", "image/png")
+    second = store.put(b"png bytes", "image/png")
+    assert first == second
+    assert first.path.endswith(".png")
+    assert first.load() == {"mime_type": "image/png", "data": b"png bytes"}
+
+
+def test_store_directories_are_private(tmp_path):
+    store = ImageBlobStore(str(tmp_path / "blobs"), max_bytes=10 ** 6)
+    ref = store.put(b"data", "image/jpeg")
+    for path in (store.root, os.path.dirname(ref.path)):
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+
+
+def test_eviction_spares_recently_used_blobs(tmp_path):
+    store = ImageBlobStore(str(tmp_path / "blobs"), max_bytes=10, min_age=60)
+    old = store.put(b"a" * 8, "image/png")
+    held = store.put(b"b" * 8, "image/png")
+    age(old, 600)
+    age(held, 600)
+    # A request reusing ``held`` marks it recently used
+    assert held.touch()
+
+    store._evict()
+
+    assert not old.exists()
+    assert held.exists()
+
+
+def test_eviction_never_removes_young_blobs(tmp_path):
+    store = ImageBlobStore(str(tmp_path / "blobs"), max_bytes=10, min_age=60)
+    refs = [store.put(bytes([i]) * 8, "image/png") for i in range(3)]
+    store._evict()
+    assert all(ref.exists() for ref in refs)
+    assert store.put(b"z" * 8, "image/png").read() == b"z" * 8
+
+
+def test_touch_reports_missing_files(tmp_path):
+    store = ImageBlobStore(str(tmp_path / "blobs"), max_bytes=10 ** 6)
+    ref = store.put(b"data", "image/png")
+    os.remove(ref.path)
+    assert not ref.touch()
+    assert ref.load() is None
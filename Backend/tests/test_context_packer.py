@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from langchain_core.documents import Document  # noqa: E402
+from utils import context_packer  # noqa: E402
+from utils.context_packer import (  # noqa: E402
+    choose_strategy, document_tokens, group_by_budget, pack, pack_documents, truncate_to_budget,
+)
+
+
+@pytest.fixture(autouse=True)
+def character_tokens(monkeypatch):
+    # Sizes in characters keep the tests independent of the tokenizer download
+    monkeypatch.setattr(context_packer, "count_tokens", len)
+
+
+def test_pack_skips_items_that_overflow():
+    assert pack(["aaaa", "bbbbbb", "cc", "d"], budget=7, size=len) == ["aaaa", "cc", "d"]
+
+
+def test_group_by_budget_keeps_order_and_isolates_oversized_items():
+    groups = group_by_budget(["aa", "bb", "cccccc", "d", "ee"], budget=4, size=len)
+    assert groups == [["aa", "bb"], ["cccccc"], ["d", "ee"]]
+    assert group_by_budget([], budget=4, size=len) == []
+
+
+def test_choose_strategy(monkeypatch):
+    monkeypatch.setattr(context_packer, "SUMMARY_REFINE_MAX_GROUPS", 3)
+    assert [choose_strategy(n) for n in (0, 1, 2, 3, 4)] == ["stuff", "stuff", "refine", "refine", "map_reduce"]
+
+
+def test_images_cost_a_fixed_number_of_tokens(monkeypatch):
+    monkeypatch.setattr(context_packer, "IMAGE_TOKENS", 258)
+    assert document_tokens(Document(page_content="chart", metadata={"type": "image"})) == 258
+    assert document_tokens(Document(page_content="chart", metadata={"type": "text"})) == 5
+
+
+def test_pack_documents_merges_neighbours_up_to_the_budget():
+    documents = [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(["aaa", "bbb", "ccc"])]
+    packed = pack_documents(documents, budget=6)
+    assert [doc.page_content for doc in packed] == ["aaa\n\nbbb", "ccc"]
+    assert [doc.metadata["page"] for doc in packed] == [0, 2]
+
+
+def test_truncate_to_budget():
+    assert truncate_to_budget("short", 10) == "short"
+    assert truncate_to_budget("x" * 100, 10) == "x" * 10
@@ -0,0 +1,95 @@
+import threading
+import time
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("fitz")
+pytest.importorskip("langchain_community")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("dotenv")
+
+from langchain_core.documents import Document  # noqa: E402
+from utils import document_library  # noqa: E402
+from utils.document_library import DocumentLibrary, check_id  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_rerank(monkeypatch):
+    monkeypatch.setattr(document_library, "rerank_enabled", lambda: False)
+
+
+def chunks(*texts):
+    return [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(texts)]
+
+
+def add(library, content_hash, texts, embeddings):
+    return library.add_document("pdf", content_hash, None, content_hash, chunks(*texts), np.asarray(embeddings))
+
+
+def test_ids_must_be_safe():
+    assert check_id("user_1") == "user_1"
+    for value in (None, "", "../other", "a" * 65):
+        with pytest.raises(ValueError):
+            check_id(value)
+
+
+def test_documents_are_stored_once_per_hash(tmp_path):
+    library = DocumentLibrary(str(tmp_path / "lib"))
+    first = add(library, "h1", ["photosynthesis makes sugar"], [[1.0, 0.0]])
+    again = add(library, "h1", ["photosynthesis makes sugar"], [[1.0, 0.0]])
+    assert again["doc_id"] == first["doc_id"]
+    assert [doc["doc_id"] for doc in library.list_documents()] == [first["doc_id"]]
+
+
+def test_search_fuses_keyword_and_dense_matches(tmp_path):
+    library = DocumentLibrary(str(tmp_path / "lib"))
+    doc = add(library, "h1", ["mitochondria produce energy", "the cell wall is rigid"], [[1.0, 0.0], [0.0, 1.0]])
+    results = library.search([doc["doc_id"]], "mitochondria", np.array([1.0, 0.0]))
+    assert results[0].page_content == "mitochondria produce energy"
+
+
+def test_search_survives_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_library, "LIBRARY_COMPACT_RATIO", 0.0)
+    library = DocumentLibrary(str(tmp_path / "lib"))
+    gone = add(library, "h1", ["first document"], [[1.0, 0.0]])
+    kept = add(library, "h2", ["second document"], [[0.0, 1.0]])
+    assert library.delete_document(gone["doc_id"])
+    assert not library.delete_document(gone["doc_id"])
+
+    assert library._vectors["text"].rows(2) == 1
+    results = library.search([kept["doc_id"]], "second", np.array([0.0, 1.0]))
+    assert [doc.page_content for doc in results] == ["second document"]
+
+
+def test_other_library_instances_see_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_library, "LIBRARY_COMPACT_RATIO", 0.0)
+    writer = DocumentLibrary(str(tmp_path / "lib"))
+    reader = DocumentLibrary(str(tmp_path / "lib"))
+    gone = add(writer, "h1", ["first document"], [[1.0, 0.0]])
+    kept = add(writer, "h2", ["second document"], [[0.0, 1.0]])
+    # Maps the two-row file, then the writer compacts it and appends a third document
+    assert reader.search([kept["doc_id"]], "second", np.array([0.0, 1.0]))
+    writer.delete_document(gone["doc_id"])
+    add(writer, "h3", ["third document"], [[1.0, 0.0]])
+
+    assert reader.search([kept["doc_id"]], "document", np.array([0.0, 1.0]))
+    np.testing.assert_array_equal(reader._vectors["text"].matrix(2), [[0.0, 1.0], [1.0, 0.0]])
+
+
+def test_the_library_lock_excludes_other_instances(tmp_path):
+    # Each instance has its own thread lock, as libraries in two processes would
+    first = DocumentLibrary(str(tmp_path / "lib"))
+    second = DocumentLibrary(str(tmp_path / "lib"))
+    acquired = threading.Event()
+
+    def take():
+        with second._lock:
+            acquired.set()
+
+    with first._lock:
+        thread = threading.Thread(target=take)
+        thread.start()
+        time.sleep(0.1)
+        assert not acquired.is_set()
+    thread.join(timeout=5)
+    assert acquired.is_set()
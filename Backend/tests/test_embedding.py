@@ -0,0 +1,64 @@
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from PIL import Image  # noqa: E402
+from controllers.quizController import embed_image, embed_images, embed_text, embed_texts  # noqa: E402
+from utils.models import models  # noqa: E402
+
+TEXTS = [
+    "photosynthesis",
+    "the mitochondria is the powerhouse of the cell",
+    "a much longer sentence about enzymes, catalysts and chemical equilibrium " * 3,
+]
+
+
+def random_image(rng, width, height):
+    image = Image.new("RGB", (width, height))
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(width * height)])
+    return image
+
+
+@pytest.fixture(scope="module")
+def clip():
+    return models.get("clip")
+
+
+@pytest.fixture(scope="module")
+def images():
+    rng = random.Random(0)
+    return [random_image(rng, width, height) for width, height in ((64, 64), (200, 120), (96, 300))]
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 64])
+def test_embed_texts_matches_per_item(clip, batch_size):
+    expected = np.stack([embed_text(text) for text in TEXTS])
+    batched = embed_texts(TEXTS, batch_size=batch_size, clip=clip)
+    assert batched.shape == expected.shape
+    assert np.allclose(batched, expected, atol=1e-5)
+
+
+def test_embed_texts_through_batcher_matches_per_item():
+    expected = np.stack([embed_text(text) for text in TEXTS])
+    assert np.allclose(embed_texts(TEXTS), expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 64])
+def test_embed_images_matches_per_item(clip, images, batch_size):
+    expected = np.stack([embed_image(image) for image in images])
+    batched = embed_images(images, batch_size=batch_size, clip=clip)
+    assert batched.shape == expected.shape
+    assert np.allclose(batched, expected, atol=1e-5)
+
+
+def test_embed_images_through_batcher_matches_per_item(images):
+    expected = np.stack([embed_image(image) for image in images])
+    assert np.allclose(embed_images(images), expected, atol=1e-5)
+
+
+def test_empty_batches(clip):
+    assert len(embed_texts([], clip=clip)) == 0
+    assert len(embed_images([], clip=clip)) == 0
@@ -0,0 +1,92 @@
+import threading
+import time
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from fastapi import HTTPException  # noqa: E402
+from utils.embedding_service import BatchedEmbeddings, MicroBatcher  # noqa: E402
+
+
+class Encoder:
+    """Embeds an int as [n, n]; records each batch"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        time.sleep(self.delay)
+        return np.asarray([[n, n] for n in items], dtype=np.float32).reshape(len(items), 2)
+
+
+def test_concurrent_calls_share_one_batch():
+    encode = Encoder()
+    batcher = MicroBatcher("test", encode, max_batch=8, max_wait=0.2)
+    futures = [batcher.submit([i, i + 10]) for i in range(3)]
+    results = [future.result(timeout=5) for future in futures]
+    assert len(encode.batches) == 1
+    for i, rows in enumerate(results):
+        assert rows.tolist() == [[i, i], [i + 10, i + 10]]
+
+
+def test_large_calls_are_split_and_reassembled():
+    encode = Encoder()
+    batcher = MicroBatcher("test", encode, max_batch=4, max_wait=0.0)
+    assert batcher.embed(list(range(10)))[:, 0].tolist() == list(range(10))
+    assert max(len(batch) for batch in encode.batches) <= 4
+
+
+def test_encoder_errors_reach_every_caller_in_the_batch():
+    def fail(items):
+        raise RuntimeError("model unavailable")
+
+    batcher = MicroBatcher("test", fail, max_batch=8, max_wait=0.05)
+    futures = [batcher.submit([1]), batcher.submit([2, 3])]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+
+def test_disabled_batching_encodes_in_the_caller():
+    encode = Encoder()
+    batcher = MicroBatcher("test", encode, enabled=False)
+    assert batcher.embed([1, 2]).shape == (2, 2)
+    assert batcher.embed([]).shape == (0, 2)
+    assert encode.batches == [[1, 2], []]
+
+
+def test_a_full_queue_rejects_callers_after_the_timeout():
+    encode = Encoder(delay=0.3)
+    batcher = MicroBatcher("test", encode, max_batch=2, max_wait=0.0, max_queue=2, timeout=0.05)
+    running = batcher.submit([1, 2])
+    # Wait until the worker has taken the first batch, then fill the queue
+    while not encode.batches:
+        time.sleep(0.005)
+    queued = batcher.submit([3, 4])
+    with pytest.raises(HTTPException) as error:
+        batcher.submit([5])
+    assert error.value.status_code == 503
+    assert running.result(timeout=5).shape == queued.result(timeout=5).shape == (2, 2)
+
+
+def test_batched_embeddings_from_threads():
+    batcher = MicroBatcher("test", Encoder(), max_batch=16, max_wait=0.05)
+    embeddings = BatchedEmbeddings(batcher)
+    results = {}
+
+    def call(n):
+        results[n] = embeddings.embed_query(n)
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {n: [n, n] for n in range(8)}
+    assert embeddings.embed_documents([1, 2]) == [[1, 1], [2, 2]]
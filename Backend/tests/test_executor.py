@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from fastapi import HTTPException  # noqa: E402
+from utils import executor  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools(monkeypatch):
+    monkeypatch.setattr(executor, "CPU_POOL_KIND", "thread")
+    yield
+    executor.shutdown()
+
+
+def test_blocking_work_runs_off_the_event_loop():
+    async def run():
+        loop_thread = threading.get_ident()
+        io_thread = await executor.run_io(threading.get_ident)
+        cpu_thread = await executor.run_cpu(threading.get_ident)
+        return loop_thread, io_thread, cpu_thread
+
+    loop_thread, io_thread, cpu_thread = asyncio.run(run())
+    assert loop_thread not in (io_thread, cpu_thread)
+
+
+def test_keyword_arguments_are_passed_through():
+    assert asyncio.run(executor.run_io(int, "ff", base=16)) == 255
+
+
+def test_full_queue_is_rejected_with_503(monkeypatch):
+    monkeypatch.setattr(executor, "MAX_QUEUE_DEPTH", 1)
+    release = threading.Event()
+
+    async def run():
+        busy = asyncio.ensure_future(executor.run_io(release.wait, 5))
+        while executor.queue_depth() == 0:
+            await asyncio.sleep(0.01)
+        try:
+            with pytest.raises(HTTPException) as excinfo:
+                await executor.run_io(threading.get_ident)
+        finally:
+            release.set()
+            await busy
+        return excinfo.value.status_code
+
+    assert asyncio.run(run()) == 503
+    assert executor.queue_depth() == 0
+
+
+def test_errors_are_raised_and_release_the_queue_slot():
+    def fail():
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run_cpu(fail))
+    assert executor.queue_depth() == 0
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+pytest.importorskip("dotenv")
+
+from langchain_core.documents import Document  # noqa: E402
+from utils import hybrid_search  # noqa: E402
+from utils.hybrid_search import (  # noqa: E402
+    BM25Index, HybridRetriever, reciprocal_rank_fusion, rerank, tokenize,
+)
+
+TEXTS = [
+    "Mitochondria produce ATP for the cell",
+    "The x86-64 architecture and node.js runtime",
+    "Photosynthesis happens in chloroplasts",
+]
+
+
+def vector(*values):
+    return np.asarray(values, dtype=np.float32)
+
+
+@pytest.fixture
+def retriever():
+    docs = [Document(page_content=text, metadata={"page": i, "type": "text"}) for i, text in enumerate(TEXTS)]
+    image = Document(page_content="image", metadata={"page": 0, "type": "image", "image_id": 0})
+    return HybridRetriever.from_embeddings(
+        docs, [vector(1, 0, 0), vector(0, 1, 0), vector(0, 0, 1)], [image], [vector(1, 0)],
+    )
+
+
+def test_tokenize_keeps_technical_terms_whole():
+    assert tokenize("C++ on x86-64 with Node.js") == ["c++", "on", "x86-64", "with", "node.js"]
+
+
+def test_reciprocal_rank_fusion_favours_keys_ranked_by_several_lists():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60) == ["b", "a", "c"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_bm25_ranks_matching_texts_and_survives_a_round_trip():
+    index = BM25Index(TEXTS)
+    assert [i for i, _ in index.search("chloroplasts photosynthesis", 5)] == [2]
+    assert index.search("absent", 5) == []
+    assert BM25Index.from_dict(index.to_dict()).search("node.js", 5) == index.search("node.js", 5)
+
+
+def test_search_fuses_sparse_dense_and_image_rankings(retriever):
+    docs = retriever.search("chloroplasts", vector(0, 0, 1), vector(1, 0), k=3, use_reranker=False)
+    assert docs[0].page_content == TEXTS[2]
+    assert any(doc.metadata.get("type") == "image" for doc in docs)
+    assert len(docs) == 3
+
+
+def test_saved_retrievers_load_with_the_same_results(retriever, tmp_path):
+    retriever.save(str(tmp_path))
+    loaded = HybridRetriever.load(str(tmp_path))
+    query = ("atp", vector(1, 0, 0), vector(1, 0))
+    assert [d.page_content for d in loaded.search(*query, use_reranker=False)] == [
+        d.page_content for d in retriever.search(*query, use_reranker=False)
+    ]
+
+
+def test_rerank_reorders_text_around_images(monkeypatch):
+    class Reranker:
+        def predict(self, pairs):
+            return [len(text) for _, text in pairs]
+
+    monkeypatch.setattr(hybrid_search.models, "get", lambda name: Reranker())
+    docs = [
+        Document(page_content="aa", metadata={"type": "text"}),
+        Document(page_content="img", metadata={"type": "image"}),
+        Document(page_content="aaaa", metadata={"type": "text"}),
+        Document(page_content="a", metadata={"type": "text"}),
+    ]
+    ranked = rerank("q", docs, limit=3)
+    assert [doc.page_content for doc in ranked] == ["aaaa", "img", "aa", "a"]
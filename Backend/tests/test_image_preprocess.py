@@ -0,0 +1,75 @@
+import io
+from dataclasses import dataclass
+from typing import Optional
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("dotenv")
+
+from utils.image_preprocess import ImagePreprocessor  # noqa: E402
+
+
+@dataclass
+class Record:
+    data: bytes
+    mime_type: str
+    phash: Optional[int] = None
+
+
+def encode(image, fmt):
+    buffered = io.BytesIO()
+    image.save(buffered, format=fmt)
+    return buffered.getvalue()
+
+
+def gradient(mode, size=(400, 300)):
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    return image.convert(mode)
+
+
+def preprocessor(**kwargs):
+    return ImagePreprocessor(**{"min_dim": 10, "min_bytes": 10, "max_edge": 100, "hash_distance": -1, **kwargs})
+
+
+def assert_counts_add_up(stats):
+    assert stats.seen == stats.kept + stats.dropped_small + stats.dropped_duplicate + stats.dropped_error
+
+
+def test_cmyk_image_is_resized():
+    pre = preprocessor()
+    # TIFF keeps the CMYK mode that the PNG encoder rejects
+    record = pre.process(Record(encode(gradient("CMYK"), "TIFF"), "image/tiff"))
+    assert record.mime_type == "image/png"
+    assert max(Image.open(io.BytesIO(record.data)).size) == 100
+    assert pre.stats.resized == 1 and pre.stats.dropped_error == 0
+
+
+def test_palette_image_keeps_its_transparency():
+    image = gradient("P")
+    image.info["transparency"] = 0
+    pre = preprocessor()
+    record = pre.process(Record(encode(image, "PNG"), "image/png"))
+    assert Image.open(io.BytesIO(record.data)).mode == "RGBA"
+    assert pre.stats.kept == 1
+
+
+def test_undecodable_image_is_counted_and_raised():
+    pre = preprocessor()
+    with pytest.raises(Exception):
+        pre.process(Record(b"not an image at all", "image/png"))
+    assert pre.stats.dropped_error == 1
+    assert pre.stats.bytes_out == 0
+    assert_counts_add_up(pre.stats)
+
+
+def test_stats_add_up_across_outcomes():
+    pre = preprocessor(hash_distance=0)
+    png = encode(gradient("RGB"), "PNG")
+    pre.process(Record(png, "image/png"))
+    pre.process(Record(png, "image/png"))
+    pre.process(Record(encode(gradient("RGB", (5, 5)), "PNG"), "image/png"))
+    with pytest.raises(Exception):
+        pre.process(Record(b"garbage bytes", "image/png"))
+    stats = pre.stats
+    assert (stats.kept, stats.dropped_duplicate, stats.dropped_small, stats.dropped_error) == (1, 1, 1, 1)
+    assert_counts_add_up(stats)
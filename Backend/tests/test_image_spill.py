@@ -0,0 +1,56 @@
+import pytest
+
+for module in ("fitz", "PIL", "langchain", "fastapi", "google.generativeai", "langchain_groq", "dotenv"):
+    pytest.importorskip(module)
+
+np = pytest.importorskip("numpy")
+
+from benchmarks.synthetic_pdf import make_pdf  # noqa: E402
+from controllers import quizController  # noqa: E402
+from controllers.summarizeController import documents_from_records  # noqa: E402
+from utils import pdf_extract  # noqa: E402
+from utils.blob_store import ImageBlobStore  # noqa: E402
+from utils.pdf_extract import ImageRecord, extract_records  # noqa: E402
+
+
+@pytest.fixture
+def records(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extract, "image_store", ImageBlobStore(str(tmp_path / "blobs"), max_bytes=10 ** 7))
+    path = make_pdf(str(tmp_path / "doc.pdf"), pages=3, chars_per_page=200, image_size=64, unique_images=3)
+    records, stats = extract_records(path)
+    assert stats.kept == 3
+    return records
+
+
+def test_extracted_images_are_spilled_to_the_blob_store(records):
+    images = [r for r in records if isinstance(r, ImageRecord)]
+    assert len(images) == 3
+    assert all(r.data is None and r.ref is not None for r in images)
+    assert all(r.to_pil().size == (64, 64) for r in images)
+
+
+def test_documents_carry_refs_instead_of_bytes(records):
+    documents = documents_from_records(records)
+    images = [doc for doc in documents if doc.metadata["type"] == "image"]
+    assert len(documents) == len(records) and len(images) == 3
+    assert images[0].page_content == "[Image 1 on page 1]"
+    assert images[0].metadata["image_ref"].load()["mime_type"] == "image/png"
+    assert all(set(doc.metadata) == {"page", "type", "image_ref"} for doc in images)
+
+
+def test_embedding_decodes_in_batches_and_drops_broken_images(records, monkeypatch, tmp_path):
+    batches = []
+
+    def embed_images(images, batch_size=None):
+        batches.append(len(images))
+        return np.ones((len(images), 4), dtype=np.float32)
+
+    monkeypatch.setattr(quizController, "embed_images", embed_images)
+    images = [r for r in records if isinstance(r, ImageRecord)]
+    broken = ImageBlobStore(str(tmp_path / "broken"), max_bytes=10 ** 6).put(b"not an image", "image/png")
+    images.insert(1, ImageRecord(page=0, index=9, xref=0, data=None, mime_type="image/png", ref=broken))
+
+    kept, embeddings = quizController.embed_image_records(images, batch_size=2)
+    assert [r.index for r in kept] == [images[0].index, images[2].index, images[3].index]
+    assert embeddings.shape == (3, 4)
+    assert batches == [1, 2]
@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from utils import inference  # noqa: E402
+from utils.inference import MIN_COSINE_AGREEMENT, cosine_agreement, quantize_int8  # noqa: E402
+
+
+class TinyTransformer(torch.nn.Module):
+    """Stand-in for a Hugging Face encoder: token embeddings through a small MLP"""
+
+    def __init__(self, vocab=100, width=64):
+        super().__init__()
+        self.embed = torch.nn.Embedding(vocab, width)
+        self.mlp = torch.nn.Sequential(
+            torch.nn.Linear(width, 4 * width), torch.nn.GELU(), torch.nn.Linear(4 * width, width),
+        )
+
+    def forward(self, input_ids, attention_mask):
+        hidden = self.embed(input_ids)
+        return SimpleNamespace(last_hidden_state=hidden + self.mlp(hidden))
+
+
+@pytest.fixture
+def encoder():
+    torch.manual_seed(0)
+    return inference._mean_pooled_encoder(TinyTransformer()).eval()
+
+
+@pytest.fixture
+def batch():
+    generator = torch.Generator().manual_seed(1)
+    input_ids = torch.randint(0, 100, (16, 12), generator=generator)
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[::2, 8:] = 0
+    return input_ids, attention_mask
+
+
+def baseline(encoder, batch):
+    with torch.no_grad():
+        return encoder(*batch).numpy()
+
+
+def test_cosine_agreement():
+    rows = np.array([[1.0, 0.0], [0.0, 2.0]])
+    assert cosine_agreement(rows, rows) == pytest.approx((1.0, 1.0))
+    mean_cos, min_cos = cosine_agreement(rows, np.array([[1.0, 0.0], [2.0, 0.0]]))
+    assert (mean_cos, min_cos) == pytest.approx((0.5, 0.0))
+
+
+def test_int8_embeddings_stay_close_to_fp32(encoder, batch):
+    expected = baseline(encoder, batch)
+    with torch.no_grad():
+        quantized = quantize_int8(encoder)(*batch).numpy()
+    assert cosine_agreement(expected, quantized)[1] >= MIN_COSINE_AGREEMENT
+
+
+def test_onnx_embeddings_match_fp32(encoder, batch, tmp_path, monkeypatch):
+    pytest.importorskip("onnxruntime")
+    monkeypatch.setattr(inference, "ONNX_CACHE_DIR", str(tmp_path))
+    expected = baseline(encoder, batch)
+
+    path = inference._export_onnx(
+        encoder, batch, ["input_ids", "attention_mask"], inference._onnx_path("tiny/encoder", "text")
+    )
+    input_ids, attention_mask = batch
+    candidate = inference._session(path).run(None, {
+        "input_ids": input_ids.numpy(), "attention_mask": attention_mask.numpy(),
+    })[0]
+    assert cosine_agreement(expected, candidate)[1] >= MIN_COSINE_AGREEMENT
+
+
+class TinyClip(torch.nn.Module):
+    """Stand-in for CLIPModel: pooled pixels and token embeddings projected to one space"""
+
+    config = SimpleNamespace(projection_dim=16)
+
+    def __init__(self):
+        super().__init__()
+        self.vision = torch.nn.Linear(3, 16)
+        self.text = TinyTransformer(width=16)
+
+    def get_image_features(self, pixel_values):
+        return self.vision(pixel_values.mean(dim=(2, 3)))
+
+    def get_text_features(self, input_ids, attention_mask):
+        return self.text(input_ids, attention_mask).last_hidden_state[:, 0]
+
+
+class TinyProcessor:
+    image_processor = SimpleNamespace(crop_size={"height": 8})
+
+    def __call__(self, text, return_tensors, padding):
+        input_ids = torch.arange(1, 5).repeat(len(text), 1)
+        return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+
+def test_onnx_clip_model_matches_torch(tmp_path, monkeypatch):
+    pytest.importorskip("onnxruntime")
+    monkeypatch.setattr(inference, "ONNX_CACHE_DIR", str(tmp_path))
+    torch.manual_seed(0)
+    model = TinyClip().eval()
+    onnx_model = inference.OnnxClipModel("tiny/clip", model, TinyProcessor())
+
+    pixel_values = torch.rand(3, 3, 8, 8)
+    input_ids = torch.randint(1, 100, (3, 6))
+    attention_mask = torch.ones_like(input_ids)
+    with torch.no_grad():
+        expected_images = model.get_image_features(pixel_values).numpy()
+        expected_texts = model.get_text_features(input_ids, attention_mask).numpy()
+    images = onnx_model.get_image_features(pixel_values=pixel_values)
+    texts = onnx_model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+    assert isinstance(images, torch.Tensor) and onnx_model.config is model.config
+    assert cosine_agreement(expected_images, images.numpy())[1] >= MIN_COSINE_AGREEMENT
+    assert cosine_agreement(expected_texts, texts.numpy())[1] >= MIN_COSINE_AGREEMENT
+    # Exports land under the model name, with any external weights beside them
+    models = ("tiny_clip-text.onnx", "tiny_clip-vision.onnx")
+    names = {p.name for p in tmp_path.iterdir()}
+    assert set(models) <= names
+    assert all(name.startswith(models) and ".tmp" not in name for name in names)
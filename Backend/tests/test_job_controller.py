@@ -0,0 +1,102 @@
+import asyncio
+import os
+import queue
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("fastapi")
+pytest.importorskip("fitz")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("langchain_groq")
+pytest.importorskip("dotenv")
+
+from controllers import jobController  # noqa: E402
+from controllers.jobController import JobProgress, job_status, submit_job  # noqa: E402
+from utils.job_store import InMemoryJobStore  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = InMemoryJobStore()
+    monkeypatch.setattr(jobController, "job_store", store)
+    monkeypatch.setattr(jobController, "CPU_POOL_KIND", "thread")
+    return store
+
+
+@pytest.fixture
+def upload(tmp_path):
+    def make(name):
+        path = tmp_path / name
+        path.write_bytes(b"%PDF-1.4")
+        return str(path)
+    return make
+
+
+def test_identical_submissions_share_one_job(store, upload, monkeypatch):
+    runs = []
+
+    async def worker(path, pdf_hash, params, progress):
+        runs.append(path)
+        await progress.report("parse")
+        return {"quiz": []}
+
+    monkeypatch.setitem(jobController._WORKERS, "quiz_pdf", worker)
+    params = {"specificArea": "cells", "no": 3, "difficulty": "easy"}
+
+    async def run():
+        first, second = await asyncio.gather(
+            submit_job("quiz_pdf", upload("a.pdf"), "hash", params),
+            submit_job("quiz_pdf", upload("b.pdf"), "hash", params),
+        )
+        await asyncio.gather(*jobController._tasks)
+        return first, second
+
+    (first, first_dedup), (second, second_dedup) = asyncio.run(run())
+    assert first["job_id"] == second["job_id"]
+    assert [first_dedup, second_dedup] == [False, True]
+    assert len(runs) == 1
+    job = store.get(first["job_id"])
+    assert job["status"] == "succeeded" and job["stage"] == "parse"
+
+
+def test_failures_are_recorded_and_the_upload_removed(store, upload, monkeypatch):
+    async def worker(path, pdf_hash, params, progress):
+        raise ValueError("not a PDF")
+
+    monkeypatch.setitem(jobController._WORKERS, "summary_pdf", worker)
+    path = upload("a.pdf")
+
+    async def run():
+        job, _ = await submit_job("summary_pdf", path, "hash", {})
+        await asyncio.gather(*jobController._tasks)
+        return job
+
+    job = store.get(asyncio.run(run())["job_id"])
+    assert job["status"] == "failed" and job["error"] == "not a PDF"
+    assert not os.path.exists(path)
+
+
+def test_stages_from_worker_processes_are_forwarded(store):
+    store.create(jobController._new_job("quiz_pdf", "key"))
+    job_id = store.find_active("key")["job_id"]
+    # Stands in for the Manager queue that worker processes write to
+    progress = JobProgress(job_id, queue.Queue())
+
+    async def run():
+        forwarder = asyncio.create_task(progress.forward())
+        progress("parse")
+        progress("embed")
+        progress.queue.put(None)
+        await forwarder
+
+    asyncio.run(run())
+    assert store.get(job_id)["stage"] == "embed"
+
+
+def test_job_status_progress():
+    job = jobController._new_job("quiz_pdf", "key")
+    assert job_status(job)["progress"] == 0.0
+    job["stage"] = "retrieve"
+    assert job_status(job)["progress"] == 0.5
+    job["status"] = "succeeded"
+    assert job_status(job)["progress"] == 1.0
@@ -0,0 +1,83 @@
+import sqlite3
+import time
+import pytest
+
+pytest.importorskip("dotenv")
+
+from utils.job_store import InMemoryJobStore, SQLiteJobStore  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return InMemoryJobStore(**kwargs)
+        return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), **kwargs)
+    return make
+
+
+def new_job(job_id, owner="a", status="queued", heartbeat_at=None):
+    now = time.time()
+    return {
+        "job_id": job_id, "kind": "quiz_pdf", "dedup_key": f"key-{job_id}", "status": status,
+        "stage": None, "error": None, "result": None, "created_at": now, "updated_at": now,
+        "owner": owner, "heartbeat_at": now if heartbeat_at is None else heartbeat_at,
+    }
+
+
+def test_create_update_and_find_active(make_store):
+    store = make_store()
+    store.create(new_job("1"))
+    assert store.find_active("key-1")["job_id"] == "1"
+
+    store.update("1", status="succeeded", result={"quiz": []})
+    job = store.get("1")
+    assert job["status"] == "succeeded" and job["result"] == {"quiz": []}
+    assert store.find_active("key-1") is None
+
+
+def test_update_of_unknown_job_is_ignored(make_store):
+    store = make_store()
+    store.update("missing", stage="parse")
+    assert store.get("missing") is None
+
+
+def test_finished_jobs_beyond_the_cap_are_pruned(make_store):
+    store = make_store(max_finished=2)
+    for job_id in "123":
+        store.create(new_job(job_id))
+        store.update(job_id, status="succeeded", result={})
+        time.sleep(0.001)
+    assert store.get("1") is None
+    assert store.get("3") is not None
+
+
+def test_only_jobs_without_recent_heartbeats_are_failed(make_store):
+    store = make_store()
+    old = time.time() - 600
+    store.create(new_job("mine", owner="a", heartbeat_at=old))
+    store.create(new_job("other", owner="b", heartbeat_at=old))
+    store.create(new_job("live", owner="c"))
+
+    store.heartbeat("a")
+    store.fail_stale("gone", time.time() - 60)
+
+    assert store.get("mine")["status"] == "queued"
+    assert store.get("live")["status"] == "queued"
+    other = store.get("other")
+    assert other["status"] == "failed" and other["error"] == "gone"
+
+
+def test_sqlite_store_adds_heartbeat_columns_to_old_tables(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, dedup_key TEXT NOT NULL, "
+            "status TEXT NOT NULL, stage TEXT, error TEXT, result TEXT, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO jobs VALUES ('old', 'quiz_pdf', 'k', 'running', NULL, NULL, NULL, 0, 0)")
+
+    store = SQLiteJobStore(path)
+    store.fail_stale("gone", time.time())
+    assert store.get("old")["status"] == "failed"
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+for module in ("langchain", "fastapi", "fitz", "google.generativeai", "langchain_groq",
+               "youtube_transcript_api", "yt_dlp", "dotenv"):
+    pytest.importorskip(module)
+
+from langchain_core.documents import Document  # noqa: E402
+from controllers import libraryController  # noqa: E402
+from controllers.quizController import format_context  # noqa: E402
+
+
+def test_format_context_lists_text_then_available_images():
+    results = [
+        Document(page_content="cells divide", metadata={"type": "text", "page": 2}),
+        Document(page_content="[Image: a]", metadata={"type": "image", "page": 3, "image_id": "a"}),
+        Document(page_content="no page", metadata={"type": "text"}),
+        Document(page_content="[Image: gone]", metadata={"type": "image", "page": 4, "image_id": "gone"}),
+    ]
+    image = {"mime_type": "image/png", "data": b"png"}
+    parts = format_context("mitosis", results, lambda doc: image if doc.metadata["image_id"] == "a" else None)
+    assert parts == [
+        "Question: mitosis\n\nContext:\n",
+        "Text excerpts:\n[Page 2]: cells divide\n\nno page\n",
+        "\n[Image from page 3]:\n",
+        {"inline_data": image},
+    ]
+
+
+class FakeLibrary:
+    def __init__(self):
+        self.documents = {}
+
+    def find_document(self, content_hash):
+        return self.documents.get(content_hash)
+
+    def add_document(self, kind, title, source, content_hash, *extracted, summary=None):
+        self.documents[content_hash] = {"doc_id": content_hash, "title": title}
+        return self.documents[content_hash]
+
+
+def test_concurrent_uploads_of_one_pdf_share_one_ingest(tmp_path, monkeypatch):
+    library = FakeLibrary()
+    extractions = []
+
+    def extract(path):
+        extractions.append(path)
+        return (), None
+
+    async def run_cpu(fn, *args):
+        await asyncio.sleep(0.01)
+        return fn(*args)
+
+    monkeypatch.setattr(libraryController, "get_library", lambda user_id: library)
+    monkeypatch.setattr(libraryController, "extract_library_pdf", extract)
+    monkeypatch.setattr(libraryController, "run_cpu", run_cpu)
+    uploads = [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+    for upload in uploads:
+        upload.write_bytes(b"%PDF-1.4")
+
+    async def run():
+        return await asyncio.gather(*(
+            libraryController.ingest_pdf("user", str(upload), "hash", "notes") for upload in uploads
+        ))
+
+    first, second = asyncio.run(run())
+    assert first == second == {"doc_id": "hash", "title": "notes"}
+    assert extractions == [str(uploads[0]) + ".ingest"]
+    # The ingest's own link is removed; the requests' uploads are theirs to delete
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf", "b.pdf"]
+    assert not libraryController._ingesting
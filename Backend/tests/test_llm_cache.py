@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("fastapi")
+
+from utils import llm_cache as llm_cache_module  # noqa: E402
+from utils.llm_cache import LLMResponseCache, cache_bypass, near_duplicate, prompt_key  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(db_path=str(tmp_path / "llm.sqlite3"), similarity=0, enabled=True)
+
+
+def test_prompt_key_depends_on_model_text_and_image_bytes():
+    key = prompt_key("m", ["describe", {"mime_type": "image/png", "data": b"a"}])
+    assert key == prompt_key("m", ["describe", {"mime_type": "image/png", "data": b"a"}])
+    assert key != prompt_key("m", ["describe", {"mime_type": "image/png", "data": b"b"}])
+    assert key != prompt_key("other", ["describe", {"mime_type": "image/png", "data": b"a"}])
+
+
+def test_put_then_get_survives_a_new_instance(cache, tmp_path):
+    cache.put("k", "answer")
+    assert cache.get("k") == "answer"
+    reopened = LLMResponseCache(db_path=cache.db_path, similarity=0, enabled=True)
+    assert reopened.get("k") == "answer"
+    assert reopened.get("missing") is None
+
+
+def test_expired_entries_miss(cache):
+    cache.ttl = -1
+    cache.put("k", "answer")
+    assert cache.get("k") is None
+
+
+def test_bypass_skips_lookups_but_stores(cache):
+    token = cache_bypass.set(True)
+    try:
+        cache.put("k", "answer")
+        assert cache.get("k") is None
+    finally:
+        cache_bypass.reset(token)
+    assert cache.get("k") == "answer"
+
+
+def test_prune_runs_every_n_writes(cache, monkeypatch):
+    monkeypatch.setattr(llm_cache_module, "PRUNE_EVERY", 3)
+    cache.max_entries = 1
+    for i in range(2):
+        cache.put(f"k{i}", "text")
+        time.sleep(0.001)
+    assert cache.stats()["entries"] == 2
+    cache.put("k2", "text")
+    assert cache.stats()["entries"] == 1
+
+
+def test_async_access_runs_off_the_event_loop(cache, monkeypatch):
+    threads = []
+    get, put = cache.get, cache.put
+    monkeypatch.setattr(cache, "get", lambda key: threads.append(threading.get_ident()) or get(key))
+    monkeypatch.setattr(cache, "put", lambda *a, **kw: threads.append(threading.get_ident()) or put(*a, **kw))
+
+    async def run():
+        await cache.aput("k", "answer")
+        return await cache.aget("k")
+
+    assert asyncio.run(run()) == "answer"
+    assert threads and threading.get_ident() not in threads
+
+
+VECTORS = {"photosynthesis": [1.0, 0.0], "photosynthesis basics": [0.99, 0.14], "black holes": [0.0, 1.0]}
+
+
+@pytest.fixture
+def near_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(LLMResponseCache, "_embed", staticmethod(lambda query: np.asarray(VECTORS[query], dtype=np.float32)))
+    cache = LLMResponseCache(db_path=str(tmp_path / "llm.sqlite3"), similarity=0.95, enabled=True)
+    monkeypatch.setattr(llm_cache_module, "llm_cache", cache)
+    return cache
+
+
+def test_similar_queries_in_the_same_scope_are_reused(near_cache):
+    near_cache.put("k", "cached quiz", scope="pdf:abc", query="photosynthesis")
+    assert near_cache.get_similar("pdf:abc", "photosynthesis basics") == "cached quiz"
+    assert near_cache.get_similar("pdf:abc", "black holes") is None
+    assert near_cache.get_similar("pdf:other", "photosynthesis basics") is None
+    assert near_cache.stats()["near"] == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+
+def test_near_duplicate_generates_once(near_cache):
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return [{"question": "q"}]
+
+    async def run():
+        first = await near_duplicate("pdf:abc", "photosynthesis", generate)
+        second = await near_duplicate("pdf:abc", "photosynthesis basics", generate)
+        return first, second
+
+    assert asyncio.run(run()) == ([{"question": "q"}], [{"question": "q"}])
+    assert calls == [1]
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("fastapi")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("langchain_groq")
+
+from benchmarks import mock_llm_server  # noqa: E402
+from utils import llm_gateway, retry  # noqa: E402
+from utils.llm_gateway import LLMGateway, ProviderSaturated, generate_with_failover  # noqa: E402
+
+GEMINI_PATH = "/v1beta/models/mock:generateContent"
+GROQ_PATH = "/openai/v1/chat/completions"
+
+
+@pytest.fixture(autouse=True)
+def mock_server(monkeypatch):
+    monkeypatch.setitem(mock_llm_server.SETTINGS, "groq_latency", 0.0)
+    monkeypatch.setitem(mock_llm_server.SETTINGS, "gemini_latency", 0.0)
+    monkeypatch.setitem(mock_llm_server.SETTINGS, "error_rate", 0.0)
+    # No backoff between retries
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: 0.0)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = LLMGateway()
+    monkeypatch.setattr(llm_gateway, "gateway", gateway)
+    return gateway
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_llm_server.app), base_url="http://mock")
+
+
+async def post(http, path, body, errors=False):
+    mock_llm_server.SETTINGS["error_rate"] = 1.0 if errors else 0.0
+    response = await http.post(path, json=body)
+    response.raise_for_status()
+    return response.json()
+
+
+def gemini_body(text):
+    return {"contents": [{"parts": [{"text": text}]}]}
+
+
+def groq_body(text):
+    return {"model": "mock", "messages": [{"role": "user", "content": text}]}
+
+
+def test_rate_limited_calls_are_retried(gateway):
+    attempts = []
+
+    async def run():
+        async with client() as http:
+            async def call():
+                attempts.append(1)
+                # The first attempt gets a 429
+                return await post(http, GROQ_PATH, groq_body("Summarize this."), errors=len(attempts) == 1)
+
+            return await gateway.call("groq", call)
+
+    result = asyncio.run(run())
+    assert result["choices"][0]["message"]["content"]
+    assert len(attempts) == 2
+    assert gateway.providers["groq"].stats()["retries"] == 1
+
+
+def test_slow_calls_are_hedged(gateway, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_HEDGE_MIN_DELAY", 0.05)
+    gateway.hedging = True
+    pool = gateway.providers["gemini"]
+    pool._latencies.extend([0.01] * llm_gateway.HEDGE_MIN_SAMPLES)
+    attempts = []
+
+    async def run():
+        async with client() as http:
+            async def call():
+                attempts.append(1)
+                if len(attempts) == 1:
+                    # The first attempt stalls until the hedge wins
+                    await asyncio.sleep(5)
+                return await post(http, GEMINI_PATH, gemini_body("Summarize this."))
+
+            start = time.perf_counter()
+            result = await gateway.call("gemini", call)
+            return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result["candidates"][0]["content"]["parts"][0]["text"]
+    assert elapsed < 5
+    stats = pool.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert stats["in_flight"] == 0
+
+
+class MockGemini:
+    """Gemini client that talks to the mock server through the gateway"""
+
+    def __init__(self, http, errors=False, exception=None):
+        self.http = http
+        self.errors = errors
+        self.exception = exception
+
+    async def generate_content_async(self, contents, slot_timeout=None, **kwargs):
+        async def call():
+            if self.exception is not None:
+                raise self.exception
+            payload = await post(self.http, GEMINI_PATH, gemini_body(contents), errors=self.errors)
+            return SimpleNamespace(text=payload["candidates"][0]["content"]["parts"][0]["text"])
+
+        return await llm_gateway.gateway.call("gemini", call, slot_timeout)
+
+
+def run_failover(monkeypatch, **gemini):
+    async def run():
+        async with client() as http:
+            monkeypatch.setattr(llm_gateway, "gemini_llm", MockGemini(http, **gemini))
+
+            async def fallback():
+                payload = await post(http, GROQ_PATH, groq_body("Summarize this."))
+                return "groq: " + payload["choices"][0]["message"]["content"]
+
+            return await generate_with_failover("Summarize this.", fallback)
+
+    return asyncio.run(run())
+
+
+def test_rate_limited_gemini_fails_over_to_groq(gateway, monkeypatch):
+    assert run_failover(monkeypatch, errors=True).startswith("groq: ")
+    stats = gateway.providers["gemini"].stats()
+    assert stats["failovers"] == 1
+    assert stats["retries"] == retry.LLM_RETRY_ATTEMPTS - 1
+
+
+def test_saturated_gemini_fails_over_to_groq(gateway, monkeypatch):
+    assert run_failover(monkeypatch, exception=ProviderSaturated("gemini")).startswith("groq: ")
+    assert gateway.providers["gemini"].stats()["failovers"] == 1
+
+
+def test_programming_errors_do_not_fail_over(gateway, monkeypatch):
+    with pytest.raises(TypeError):
+        run_failover(monkeypatch, exception=TypeError("bad argument"))
+    assert gateway.providers["gemini"].stats()["failovers"] == 0
+
+
+def test_gemini_answers_when_healthy(gateway, monkeypatch):
+    assert not run_failover(monkeypatch).startswith("groq: ")
+
+
+def test_pool_slots_are_limited_and_shared_across_event_loops():
+    pool = llm_gateway.ProviderPool("test", max_concurrency=1)
+
+    async def hold(entered, leave):
+        async with pool.slot():
+            entered.set()
+            await asyncio.to_thread(leave.wait)
+
+    async def run():
+        entered, leave = asyncio.Event(), threading.Event()
+        holder = asyncio.create_task(hold(entered, leave))
+        await entered.wait()
+        # Another event loop in a worker thread sees the same slot taken
+        with pytest.raises(ProviderSaturated):
+            await asyncio.to_thread(asyncio.run, pool.acquire(timeout=0.05))
+        leave.set()
+        await holder
+        await pool.acquire(timeout=0.05)
+        pool.release()
+
+    asyncio.run(run())
+    assert pool.stats()["saturated"] == 1 and pool.stats()["in_flight"] == 0
+
+
+def test_pool_rate_limit_spends_burst_tokens():
+    pool = llm_gateway.ProviderPool("test", max_concurrency=10, rate_per_minute=60, burst=2)
+    assert pool.try_acquire() and pool.try_acquire()
+    assert not pool.try_acquire()
+    pool._updated -= 1.0
+    assert pool.try_acquire()
+
+
+def test_streams_hold_their_slot_until_consumed(gateway):
+    pool = gateway.providers["groq"]
+
+    async def chunks():
+        yield "a"
+        yield "b"
+
+    async def start():
+        return chunks()
+
+    async def run():
+        stream = await gateway.stream("groq", start)
+        assert pool.in_flight == 1
+        assert [chunk async for chunk in stream] == ["a", "b"]
+
+    asyncio.run(run())
+    assert pool.in_flight == 0
@@ -0,0 +1,75 @@
+import asyncio
+import re
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("fastapi")
+
+from langchain_core.documents import Document  # noqa: E402
+from controllers import summarizeController  # noqa: E402
+from controllers.summarizeController import MultimodalSummarizeChain  # noqa: E402
+
+
+class StubModel:
+    """Stands in for generate_with_failover; later documents answer sooner, so order cannot come from completion"""
+
+    def __init__(self, documents, delay=0.01):
+        self.documents = documents
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def __call__(self, contents, fallback):
+        # Map calls answer "summary doc-N"; reduce calls list their sections' document ids in prompt order
+        prompt = contents[0] if isinstance(contents, list) else contents
+        ids = re.findall(r"doc-\d+", prompt)
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if "section summaries" in prompt:
+                await asyncio.sleep(self.delay)
+                return "merged " + " ".join(ids)
+            index = int(ids[0].split("-")[1])
+            await asyncio.sleep(self.delay * (self.documents - index))
+            return f"summary {ids[0]}"
+        finally:
+            self.in_flight -= 1
+
+
+def make_chain(monkeypatch, documents, max_concurrency, budget=10 ** 6):
+    model = StubModel(documents)
+    monkeypatch.setattr(summarizeController, "generate_with_failover", model)
+    # Sizes in characters keep the test independent of the tokenizer download
+    monkeypatch.setattr(summarizeController, "count_tokens", len)
+    chain = MultimodalSummarizeChain(chain_type="map_reduce", max_concurrency=max_concurrency)
+    chain.budget = budget
+    # Send every group to the stub model instead of the text-only fallback
+    chain.fallback_budget = -1
+    groups = [
+        [Document(page_content=f"doc-{i} text", metadata={"type": "text", "page": i})]
+        for i in range(documents)
+    ]
+    return chain, model, groups
+
+
+def test_map_reduce_runs_groups_concurrently_and_in_order(monkeypatch):
+    chain, model, groups = make_chain(monkeypatch, documents=8, max_concurrency=3)
+
+    result = asyncio.run(chain._map_reduce_chain(groups))
+
+    assert model.calls == len(groups) + 1
+    assert 1 < model.max_in_flight <= 3
+    assert result["output_text"] == "merged " + " ".join(f"doc-{i}" for i in range(8))
+
+
+def test_collapse_keeps_order_and_concurrency_limit(monkeypatch):
+    # A budget this small forces several collapse rounds before the final reduce
+    chain, model, groups = make_chain(monkeypatch, documents=12, max_concurrency=2, budget=60)
+
+    result = asyncio.run(chain._map_reduce_chain(groups))
+
+    assert model.calls > len(groups) + 1
+    assert 1 < model.max_in_flight <= 2
+    assert result["output_text"] == "merged " + " ".join(f"doc-{i}" for i in range(12))
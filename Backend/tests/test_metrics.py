@@ -0,0 +1,79 @@
+import uuid
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("prometheus_client")
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, LLMResult  # noqa: E402
+from prometheus_client.core import REGISTRY  # noqa: E402
+from utils import metrics  # noqa: E402
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stages_are_timed_and_failures_counted():
+    name = f"test-{uuid.uuid4().hex}"
+    with metrics.stage(name):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage(name):
+            raise ValueError("boom")
+    assert sample("quizgen_stage_seconds_count", stage=name) == 2
+    assert sample("quizgen_stage_errors_total", stage=name) == 1
+
+
+def test_cache_hit_rates_are_exported():
+    cache = f"test-{uuid.uuid4().hex}"
+    for hit in (True, True, False, True):
+        metrics.record_cache(cache, hit)
+    assert metrics.cache_hit_rates()[cache] == 0.75
+    assert sample("quizgen_cache_hit_ratio", cache=cache) == 0.75
+    assert sample("quizgen_cache_lookups_total", cache=cache, result="miss") == 1
+    body, content_type = metrics.metrics_payload()
+    assert cache.encode() in body and content_type.startswith("text/plain")
+
+
+def llm_result(message, llm_output=None):
+    return LLMResult(generations=[[ChatGeneration(message=message)]], llm_output=llm_output)
+
+
+def test_llm_callback_records_latency_and_tokens():
+    provider = f"test-{uuid.uuid4().hex}"
+    callback = metrics.LLMMetricsCallback(provider)
+    run_id = uuid.uuid4()
+    callback.on_chat_model_start({}, [], run_id=run_id, invocation_params={"model": "m"})
+    callback.on_llm_end(
+        llm_result(AIMessage(content="hi"), {"token_usage": {"prompt_tokens": 7, "completion_tokens": 3}}),
+        run_id=run_id,
+    )
+    assert sample("quizgen_llm_requests_total", provider=provider, model="m", outcome="ok") == 1
+    assert sample("quizgen_llm_request_seconds_count", provider=provider, model="m") == 1
+    assert sample("quizgen_llm_tokens_total", provider=provider, model="m", kind="prompt") == 7
+    assert sample("quizgen_llm_tokens_total", provider=provider, model="m", kind="completion") == 3
+
+
+def test_llm_callback_counts_cache_hits_and_errors_without_tokens():
+    provider = f"test-{uuid.uuid4().hex}"
+    callback = metrics.LLMMetricsCallback(provider)
+    cached, failed = uuid.uuid4(), uuid.uuid4()
+    callback.on_chat_model_start({}, [], run_id=cached, invocation_params={"model_name": "m"})
+    hit = AIMessage(content="hi", response_metadata={"cached": True})
+    callback.on_llm_end(llm_result(hit), run_id=cached)
+    callback.on_chat_model_start({}, [], run_id=failed, invocation_params={"model": "m"})
+    callback.on_llm_error(RuntimeError("down"), run_id=failed)
+    assert sample("quizgen_llm_requests_total", provider=provider, model="m", outcome="cached") == 1
+    assert sample("quizgen_llm_requests_total", provider=provider, model="m", outcome="error") == 1
+    # Only the failed call took time; neither reported tokens
+    assert sample("quizgen_llm_request_seconds_count", provider=provider, model="m") == 1
+    assert sample("quizgen_llm_tokens_total", provider=provider, model="m", kind="prompt") == 0
+
+
+def test_gemini_usage():
+    usage = SimpleNamespace(prompt_token_count=5, candidates_token_count=2)
+    assert metrics.gemini_usage(SimpleNamespace(usage_metadata=usage)) == (5, 2)
+    assert metrics.gemini_usage(SimpleNamespace()) == (None, None)
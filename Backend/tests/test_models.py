@@ -0,0 +1,61 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("dotenv")
+
+from utils.models import ModelRegistry  # noqa: E402
+
+
+def test_models_load_once_on_first_use():
+    registry = ModelRegistry()
+    loads = []
+    registry.register("model", lambda: loads.append(1) or object())
+    assert not registry.ready()
+
+    first = registry.get("model")
+    assert registry.get("model") is first
+    assert loads == [1]
+    assert registry.ready()
+    assert registry.status()["model"]["loaded"]
+
+
+def test_concurrent_first_uses_share_one_load():
+    registry = ModelRegistry()
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.05)
+        return object()
+
+    registry.register("model", slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [1]
+    assert len({id(result) for result in results}) == 1
+
+
+def test_load_errors_are_reported_and_retried():
+    registry = ModelRegistry()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("download failed")
+        return object()
+
+    registry.register("model", flaky)
+    # Warm-up logs the failure instead of raising
+    registry.warm_up()
+    assert registry.status()["model"] == {"loaded": False, "load_seconds": None, "error": "download failed"}
+    assert not registry.ready()
+
+    registry.get("model")
+    assert registry.status()["model"]["error"] is None
+    assert registry.ready()
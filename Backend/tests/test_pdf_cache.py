@@ -0,0 +1,74 @@
+import os
+import time
+import pytest
+
+pytest.importorskip("dotenv")
+
+from utils.pdf_cache import PDFCache, content_hash  # noqa: E402
+
+
+def write_bytes(data):
+    def write(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return write
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PDFCache(str(tmp_path / "pdf_cache"), max_bytes=10 ** 6)
+
+
+def test_content_hash_is_the_sha256_of_the_bytes():
+    assert content_hash(b"") == "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+
+
+def test_put_then_get(cache):
+    assert cache.get("doc", "index") is None
+    path = cache.put("doc", "index", write_bytes(b"index bytes"))
+    assert cache.get("doc", "index") == path
+    assert read(path) == b"index bytes"
+
+
+def test_put_replaces_an_existing_artefact(cache):
+    cache.put("doc", "index", write_bytes(b"old"))
+    assert read(cache.put("doc", "index", write_bytes(b"new"))) == b"new"
+
+
+def test_failed_writes_publish_nothing(cache):
+    def fail(path):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        cache.put("doc", "index", fail)
+    assert cache.get("doc", "index") is None
+    # No staging directories are left behind
+    assert os.listdir(cache.root) == []
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.max_bytes = 25
+    for key in ("a", "b"):
+        cache.put(key, "index", write_bytes(b"x" * 10))
+        then = time.time() - 100
+        os.utime(cache.path(key), (then, then))
+    # Reading ``a`` makes ``b`` the least recently used
+    assert cache.get("a", "index")
+
+    cache.put("c", "index", write_bytes(b"x" * 10))
+
+    assert cache.get("b", "index") is None
+    assert cache.get("a", "index") and cache.get("c", "index")
+
+
+def test_the_entry_being_written_is_never_evicted(cache):
+    cache.max_bytes = 5
+    cache.put("a", "index", write_bytes(b"x" * 10))
+    assert cache.get("a", "index")
@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("PIL")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("dotenv")
+
+from benchmarks.synthetic_pdf import make_pdf  # noqa: E402
+from utils import pdf_extract  # noqa: E402
+from utils.pdf_extract import (  # noqa: E402
+    ImageRecord, TextRecord, extract_pdf_records, iter_pdf_records, open_pdf, page_shards,
+)
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    # Four pages, each with one of two distinct images
+    return make_pdf(str(tmp_path / "doc.pdf"), pages=4, chars_per_page=300, image_size=64, unique_images=2)
+
+
+def test_text_per_page_and_each_image_once(pdf):
+    records = list(iter_pdf_records(pdf))
+    assert [r.page for r in records if isinstance(r, TextRecord)] == [0, 1, 2, 3]
+    images = [r for r in records if isinstance(r, ImageRecord)]
+    assert [r.page for r in images] == [0, 1]
+    assert len({r.xref for r in images}) == 2
+    assert all(r.mime_type == "image/png" and r.to_pil().size == (64, 64) for r in images)
+
+
+def test_open_pdf_reads_through_a_memory_map(pdf):
+    with open_pdf(pdf) as doc:
+        assert doc.page_count == 4
+        assert doc[0].get_text().strip()
+
+
+def test_open_pdf_falls_back_to_the_path_for_unmappable_files(tmp_path):
+    empty = tmp_path / "empty.pdf"
+    empty.write_bytes(b"")
+    # An empty file cannot be mapped; opening by path gives PyMuPDF's own error
+    with pytest.raises(Exception, match="empty"):
+        with open_pdf(str(empty)):
+            pass
+
+
+def test_page_ranges(pdf):
+    records = list(iter_pdf_records(pdf, start=1, stop=3))
+    assert {r.page for r in records} == {1, 2}
+    # Past the last page is clamped
+    assert {r.page for r in iter_pdf_records(pdf, start=3, stop=10)} == {3}
+
+
+def test_images_dropped_by_the_preprocessor_are_skipped(pdf):
+    class DropAll:
+        def process(self, record):
+            return None
+
+    assert all(isinstance(r, TextRecord) for r in iter_pdf_records(pdf, preprocessor=DropAll()))
+
+
+def test_preprocessor_errors_skip_only_that_image(pdf):
+    class FailFirst:
+        calls = 0
+
+        def process(self, record):
+            self.calls += 1
+            if self.calls == 1:
+                raise OSError("cannot identify image file")
+            return record
+
+    images = [r for r in iter_pdf_records(pdf, preprocessor=FailFirst()) if isinstance(r, ImageRecord)]
+    assert [r.page for r in images] == [1]
+
+
+@pytest.mark.parametrize("pages, workers, expected", [
+    (10, 4, [(0, 3), (3, 6), (6, 9), (9, 10)]),
+    (3, 8, [(0, 1), (1, 2), (2, 3)]),
+    (5, 0, [(0, 5)]),
+    (0, 4, []),
+])
+def test_page_shards(pages, workers, expected):
+    assert page_shards(pages, workers) == expected
+
+
+@pytest.fixture
+def shard_pool(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "PDF_SHARD_MIN_PAGES", 1)
+    yield
+    if pdf_extract._shard_pool is not None:
+        pdf_extract._shard_pool.shutdown()
+        pdf_extract._shard_pool = None
+
+
+def summary(records):
+    return [
+        (r.page, "text") if isinstance(r, TextRecord) else (r.page, r.xref)
+        for r in records
+    ]
+
+
+def test_sharded_extraction_matches_a_single_pass(pdf, shard_pool):
+    single = extract_pdf_records(pdf, workers=1)
+    # Each shard sees both images again; the merge keeps only the first of each
+    sharded = extract_pdf_records(pdf, workers=2)
+    assert summary(sharded) == summary(single)
+    assert sum(isinstance(r, ImageRecord) for r in sharded) == 2
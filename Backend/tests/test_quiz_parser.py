@@ -0,0 +1,137 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("dotenv")
+
+from utils.quiz_parser import (  # noqa: E402
+    IncrementalQuizParser, complete_quiz, normalize_question, one_based_answers, parse_quiz,
+)
+
+QUESTIONS = [
+    {"question": "Which brace closes {this}?", "options": ["}", "]"], "correct": "}"},
+    {"question": 'Escaped "quotes" and \\ slashes', "options": ["a", "b"], "correct": "a"},
+]
+
+
+def feed_in_pieces(text, size):
+    parser = IncrementalQuizParser()
+    found = []
+    for start in range(0, len(text), size):
+        found.extend(parser.feed(text[start:start + size]))
+    return found
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_questions_are_found_whatever_the_fragment_size(size):
+    text = "```json\n" + json.dumps(QUESTIONS, indent=2) + "\n```"
+    assert feed_in_pieces(text, size) == QUESTIONS
+
+
+def test_questions_are_returned_as_soon_as_they_close():
+    parser = IncrementalQuizParser()
+    first = json.dumps(QUESTIONS[0])
+    assert parser.feed("[" + first[:-1]) == []
+    assert parser.feed(first[-1] + ", {") == [QUESTIONS[0]]
+
+
+def test_trailing_commas_are_repaired():
+    assert feed_in_pieces('[{"question": "q", "options": ["a", "b",], "correct": "a",}]', 5) == [
+        {"question": "q", "options": ["a", "b"], "correct": "a"}
+    ]
+
+
+def test_text_after_the_array_is_ignored():
+    parser = IncrementalQuizParser()
+    assert parser.feed('[{"question": "q"}] and {"question": "not part of it"}') == [{"question": "q"}]
+    assert parser.feed('{"question": "later"}') == []
+
+
+def test_malformed_objects_are_skipped():
+    assert feed_in_pieces('[{"question": q}, {"question": "ok"}]', 4) == [{"question": "ok"}]
+
+
+def question(text, correct=0, **fields):
+    return {"question": text, "options": ["a", "b", "c"], "correct": correct, **fields}
+
+
+@pytest.mark.parametrize("correct, expected", [(1, 1), ("2", 2), ("B", 1), ("c", 2), ("a", 0), ("b ", 1)])
+def test_correct_is_repaired_to_an_index(correct, expected):
+    assert normalize_question(question("q", correct), "easy")["correct"] == expected
+
+
+def test_correct_given_as_option_text():
+    fixed = normalize_question({"question": "q", "options": ["yes", "no"], "correct": "no"}, "easy")
+    assert fixed["correct"] == 1
+
+
+def test_mapped_options_become_a_list():
+    fixed = normalize_question({"question": "q", "options": {"A": "x", "B": "y"}, "correct": "B"}, "easy")
+    assert fixed["options"] == ["x", "y"] and fixed["correct"] == 1
+
+
+@pytest.mark.parametrize("broken", [
+    question("q", 3),
+    question("q", "D"),
+    question("q", "none of these"),
+    {"question": "q", "options": ["only"], "correct": 0},
+    "not a question",
+])
+def test_unusable_questions_are_dropped(broken):
+    assert normalize_question(broken, "easy") is None
+
+
+def test_missing_difficulty_is_filled_in():
+    assert normalize_question(question("q"), "hard")["difficulty"] == "hard"
+    assert normalize_question(question("q", difficulty="easy"), "hard")["difficulty"] == "easy"
+    assert normalize_question(question("q")) is None
+
+
+def test_one_based_answers():
+    assert one_based_answers([question("q", 1), question("r", 3)])
+    assert not one_based_answers([question("q", 0), question("r", 3)])
+    assert not one_based_answers([question("q", 1), question("r", 2)])
+    assert normalize_question(question("q", 3), "easy", one_based=True)["correct"] == 2
+
+
+def test_parse_quiz_keeps_the_valid_questions_of_a_broken_array():
+    text = "Here you go:\n[" + json.dumps(question("q1")) + ', {"question": bad}, ' + json.dumps(question("q2", 9))
+    text += ", " + json.dumps(question("q3", "B")) + ', {"question": "cut off'
+    quiz = parse_quiz(text, "easy")
+    assert [(q["id"], q["question"], q["correct"]) for q in quiz] == [(1, "q1", 0), (2, "q3", 1)]
+    assert parse_quiz(None) == []
+
+
+def generator(*responses):
+    calls = []
+
+    async def generate(count, avoid):
+        calls.append((count, avoid))
+        return json.dumps(responses[len(calls) - 1])
+
+    return generate, calls
+
+
+def test_complete_quiz_asks_only_for_the_missing_questions():
+    generate, calls = generator(
+        [question("q1"), question("q2")],
+        [question("Q1 "), question("q3"), question("q4")],
+    )
+    quiz = asyncio.run(complete_quiz(generate, 3, "easy"))
+    assert [(q["id"], q["question"]) for q in quiz] == [(1, "q1"), (2, "q2"), (3, "q3")]
+    assert calls[0] == (3, "")
+    count, avoid = calls[1]
+    assert count == 1 and "- q1\n- q2" in avoid
+
+
+def test_complete_quiz_stops_after_its_attempts():
+    generate, calls = generator([question("q1")], [], [])
+    quiz = asyncio.run(complete_quiz(generate, 3, "easy", attempts=2))
+    assert len(quiz) == 1 and len(calls) == 3
+
+
+def test_complete_quiz_fails_when_nothing_is_valid():
+    generate, _ = generator("no quiz here", [], [])
+    with pytest.raises(ValueError):
+        asyncio.run(complete_quiz(generate, 2, "easy", attempts=2))
@@ -0,0 +1,24 @@
+import json
+import pytest
+
+pytest.importorskip("fastapi")
+
+from utils.sse import sse_event, sse_response  # noqa: E402
+
+
+def test_event_format():
+    event = sse_event("question", {"question": "two\nlines"})
+    name, data, end = event.split("\n", 2)
+    assert name == "event: question"
+    assert json.loads(data[len("data: "):]) == {"question": "two\nlines"}
+    assert end == "\n"
+
+
+def test_response_disables_caching_and_proxy_buffering():
+    async def events():
+        yield sse_event("done", {})
+
+    response = sse_response(events())
+    assert response.media_type == "text/event-stream"
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["x-accel-buffering"] == "no"
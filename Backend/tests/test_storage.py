@@ -0,0 +1,31 @@
+import os
+import stat
+import pytest
+
+from utils.storage import dir_size, private_dir
+
+
+def test_private_dir_is_created_for_this_user_only(tmp_path):
+    path = private_dir(str(tmp_path / "a" / "b"))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+
+
+def test_private_dir_tightens_existing_permissions(tmp_path):
+    path = tmp_path / "shared"
+    path.mkdir(mode=0o777)
+    os.chmod(path, 0o777)
+    private_dir(str(path))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+
+
+def test_private_dir_refuses_directories_of_other_users(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(tmp_path).st_uid + 1)
+    with pytest.raises(PermissionError):
+        private_dir(str(tmp_path))
+
+
+def test_dir_size_counts_nested_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a").write_bytes(b"12345")
+    (tmp_path / "sub" / "b").write_bytes(b"123")
+    assert dir_size(str(tmp_path)) == 8
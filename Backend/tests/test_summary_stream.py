@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("fastapi")
+
+from langchain_core.documents import Document  # noqa: E402
+from controllers import summarizeController  # noqa: E402
+from controllers.summarizeController import MultimodalSummarizeChain, astream_text_summary  # noqa: E402
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+def test_closing_the_text_stream_cancels_pending_sections(monkeypatch):
+    started, cancelled = [], []
+
+    class SlowChain:
+        async def ainvoke(self, docs):
+            index = int(docs[0].page_content)
+            started.append(index)
+            try:
+                # The first section finishes at once, the others never do
+                await asyncio.sleep(0 if index == 0 else 60)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+            return {"output_text": f"section {index}"}
+
+    packed = [Document(page_content=str(i)) for i in range(3)]
+    monkeypatch.setattr(summarizeController, "pack_text_documents", lambda documents: packed)
+    monkeypatch.setattr(summarizeController, "load_summarize_chain", lambda **kwargs: SlowChain())
+
+    async def run():
+        stream = astream_text_summary(packed)
+        first = await stream.__anext__()
+        # A client disconnect closes the generator
+        await stream.aclose()
+        await asyncio.sleep(0)
+        # Checked here: asyncio.run cancels whatever is left once run() returns
+        return first, sorted(cancelled)
+
+    first, cancelled_before_exit = asyncio.run(run())
+    assert first == ("section", {"index": 0, "summary": "section 0"})
+    assert sorted(started) == [0, 1, 2]
+    assert cancelled_before_exit == [1, 2]
+
+
+def test_refine_with_one_group_streams_a_single_summary(monkeypatch):
+    prompts = []
+
+    async def stream_with_failover(contents, fallback):
+        prompts.append(contents[0])
+        yield "summary"
+
+    async def generate_with_failover(contents, fallback):
+        prompts.append(contents[0])
+        return "summary"
+
+    monkeypatch.setattr(summarizeController, "stream_with_failover", stream_with_failover)
+    monkeypatch.setattr(summarizeController, "generate_with_failover", generate_with_failover)
+    chain = MultimodalSummarizeChain(chain_type="refine")
+    # Send the group to the stubbed Gemini calls instead of the text-only fallback
+    chain.fallback_budget = -1
+    documents = [Document(page_content="the only part", metadata={"type": "text", "page": 1})]
+
+    assert asyncio.run(collect(chain.astream(documents))) == [("token", "summary")]
+    assert asyncio.run(chain.ainvoke(documents)) == {"output_text": "summary"}
+    assert len(prompts) == 2
+    assert not any("Refine this summary" in prompt for prompt in prompts)
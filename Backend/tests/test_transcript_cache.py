@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("dotenv")
+
+from langchain.schema import Document  # noqa: E402
+from utils.transcript_cache import TranscriptCache  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TranscriptCache(db_path=str(tmp_path / "transcripts.sqlite3"), max_memory_entries=2)
+
+
+def documents():
+    return [Document(page_content="never gonna give you up", metadata={"source": "dQw4w9WgXcQ"})]
+
+
+def test_entries_survive_a_new_instance(cache):
+    cache.put("dQw4w9WgXcQ", documents(), "transcript_api")
+    reopened = TranscriptCache(db_path=cache.db_path)
+    entry = reopened.get("dQw4w9WgXcQ")
+    assert entry.source == "transcript_api" and entry.error is None
+    assert entry.documents == documents()
+
+
+def test_expired_entries_are_dropped(cache):
+    cache.put("video", documents(), "youtube_loader", ttl=-1)
+    assert cache.get("video") is None
+    # Dropped from disk as well
+    assert TranscriptCache(db_path=cache.db_path).get("video") is None
+
+
+def test_negative_entries_keep_the_error(cache):
+    cache.put_negative("video", "yt_dlp", "yt-dlp failed: private video")
+    entry = cache.get("video")
+    assert entry.documents is None
+    assert entry.error == "yt-dlp failed: private video"
+
+
+def test_negative_entries_use_their_own_ttl(cache):
+    cache.negative_ttl = -1
+    cache.put_negative("video", "yt_dlp", "gone")
+    assert cache.get("video") is None
+
+
+def test_memory_evictions_fall_back_to_sqlite(cache):
+    for video_id in ("a", "b", "c"):
+        cache.put(video_id, documents(), "youtube_loader")
+    assert cache.get("a").documents == documents()
+
+
+def test_invalidate(cache):
+    cache.put("video", documents(), "youtube_loader")
+    cache.invalidate("video")
+    assert cache.get("video") is None
@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import io
+import os
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from fastapi import HTTPException, UploadFile  # noqa: E402
+from utils import uploads  # noqa: E402
+from utils.uploads import save_upload  # noqa: E402
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def upload(data, size=None):
+    return UploadFile(file=CountingFile(data), size=size, filename="doc.pdf")
+
+
+def test_upload_is_copied_and_hashed_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 4)
+    file = upload(b"%PDF-1.4 body")
+    path, digest = asyncio.run(save_upload(file, dir=str(tmp_path)))
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 body"
+    assert digest == hashlib.sha256(b"%PDF-1.4 body").hexdigest()
+    assert set(file.file.reads) == {4}
+
+
+def test_declared_size_over_the_limit_is_rejected_before_reading(tmp_path):
+    file = upload(b"x" * 10, size=10)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(save_upload(file, dir=str(tmp_path), max_bytes=5))
+    assert excinfo.value.status_code == 413
+    assert file.file.reads == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_oversized_stream_is_rejected_and_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_SIZE", 4)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(save_upload(upload(b"x" * 10), dir=str(tmp_path), max_bytes=6))
+    assert excinfo.value.status_code == 413
+    assert excinfo.value.detail == "Upload exceeds the 6 byte limit"
+    assert os.listdir(tmp_path) == []
+
+
+def test_limit_is_reported_in_megabytes():
+    assert uploads._too_large(2 * 1024 ** 2).detail == "Upload exceeds the 2 MB limit"
@@ -0,0 +1,57 @@
+import os
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("dotenv")
+
+from utils.vector_registry import VectorStoreRegistry, is_valid_key  # noqa: E402
+
+
+class FakeStore:
+    def save_local(self, folder):
+        os.makedirs(folder, exist_ok=True)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return VectorStoreRegistry(str(tmp_path / "indexes"), embeddings=None, max_entries=4)
+
+
+@pytest.mark.parametrize("key", ["dQw4w9WgXcQ", "a-b_c", "0" * 64])
+def test_valid_keys(key):
+    assert is_valid_key(key)
+
+
+@pytest.mark.parametrize("key", [None, "", "../etc", "a/b", "a b", "v=1&t=2"])
+def test_invalid_keys(key):
+    assert not is_valid_key(key)
+
+
+def test_stores_are_built_once(registry):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return FakeStore()
+
+    first = registry.get_or_build("video", build)
+    assert registry.get_or_build("video", build) is first
+    assert len(builds) == 1
+    assert os.path.isdir(os.path.join(registry.root, "video"))
+
+
+def test_unsafe_keys_are_rejected(registry):
+    with pytest.raises(ValueError):
+        registry.get_or_build("../outside", FakeStore)
+
+
+def test_video_key_falls_back_to_a_digest_for_unsafe_ids():
+    # Route modules need python-multipart for their form parameters
+    for module in ("langchain", "multipart", "validators", "youtube_transcript_api", "yt_dlp"):
+        pytest.importorskip(module)
+    from routes import quizRoutes as quiz_routes
+    assert quiz_routes.video_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    for url in ("https://youtu.be/../../etc", "https://www.youtube.com/watch?v=a/b", "https://example.com/video"):
+        key = quiz_routes.video_key(url)
+        assert is_valid_key(key) and len(key) == 64
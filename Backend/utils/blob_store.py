@@ -0,0 +1,122 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, replace
+from utils.config import IMAGE_BLOB_DIR, IMAGE_BLOB_MAX_BYTES, IMAGE_BLOB_MIN_AGE
+from utils.storage import private_dir
+
+
+@dataclass(frozen=True)
+class ImageRef:
+    """Lightweight, picklable handle to image bytes in a file"""
+    path: str
+    mime_type: str
+    size: int
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def touch(self):
+        """Mark the file recently used so eviction spares it. False if it is gone"""
+        try:
+            os.utime(self.path)
+            return True
+        except OSError:
+            return False
+
+    def read(self):
+        """The image bytes, or None if the file is gone"""
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def load(self):
+        """``{"mime_type", "data"}`` for Gemini inline_data, or None if the file is gone"""
+        data = self.read()
+        if data is None:
+            return None
+        return {"mime_type": self.mime_type, "data": data}
+
+    def copy_to(self, directory, name=None):
+        """Copy the file into ``directory`` and return a ref to the copy"""
+        target = os.path.join(directory, name or os.path.basename(self.path))
+        shutil.copyfile(self.path, target)
+        return replace(self, path=target)
+
+    def moved(self, directory):
+        """The same file name in another directory, e.g. after a folder was relocated"""
+        return replace(self, path=os.path.join(directory, os.path.basename(self.path)))
+
+
+class ImageBlobStore:
+    """Content-addressed on-disk store for extracted image bytes, evicting old blobs past ``max_bytes``"""
+
+    def __init__(self, root=IMAGE_BLOB_DIR, max_bytes=IMAGE_BLOB_MAX_BYTES, min_age=IMAGE_BLOB_MIN_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self._lock = threading.Lock()
+        self._written = 0
+        private_dir(self.root)
+
+    def put(self, data, mime_type):
+        """Write ``data`` unless already stored and return its ImageRef"""
+        # Named by content, so an image seen by several shards or processes is written once
+        key = hashlib.sha256(data).hexdigest()
+        folder = os.path.join(self.root, key[:2])
+        path = os.path.join(folder, f"{key}.{mime_type.split('/')[-1]}")
+        now = time.time()
+        try:
+            # Bump recency for LRU eviction
+            os.utime(path, (now, now))
+        except OSError:
+            private_dir(folder)
+            fd, staging = tempfile.mkstemp(prefix=".staging-", dir=folder)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(staging, path)
+            self._account(len(data))
+        return ImageRef(path=path, mime_type=mime_type, size=len(data))
+
+    def _account(self, size):
+        # Walking the store is only worth it after a tenth of the budget was written
+        with self._lock:
+            self._written += size
+            if self._written < self.max_bytes // 10:
+                return
+            self._written = 0
+        self._evict()
+
+    def _evict(self):
+        recent = time.time() - self.min_age
+        blobs = []
+        total = 0
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                blobs.append((stat.st_mtime, path, stat.st_size))
+
+        # Oldest first, sparing blobs used in the last ``min_age`` seconds
+        for mtime, path, size in sorted(blobs):
+            if total <= self.max_bytes or mtime > recent:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+image_store = ImageBlobStore()
@@ -0,0 +1,191 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+## Local storage
+# Caches hold pickled and FAISS files that are deserialized on load, so they
+# live in a per-user directory rather than the shared temp directory
+CACHE_DIR = os.getenv(
+    "CACHE_DIR",
+    os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "quizgen"),
+)
+
+## Embedding
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# Merge embedding calls from concurrent requests into shared forward passes
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "true").lower() in ("1", "true", "yes")
+# Longest a request waits for others to fill its batch
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+# Items queued per encoder before callers block, then are refused with 503
+EMBED_QUEUE_MAX_ITEMS = int(os.getenv("EMBED_QUEUE_MAX_ITEMS", "4096"))
+EMBED_QUEUE_TIMEOUT = float(os.getenv("EMBED_QUEUE_TIMEOUT", "10"))
+
+## PDF artefact cache
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(CACHE_DIR, "pdf"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+## YouTube transcript cache
+TRANSCRIPT_CACHE_DB = os.getenv("TRANSCRIPT_CACHE_DB", os.path.join(CACHE_DIR, "transcripts.sqlite3"))
+TRANSCRIPT_CACHE_MEMORY_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ENTRIES", "256"))
+TRANSCRIPT_CACHE_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600)))
+# Used for videos without transcripts and for lookups that failed outright
+TRANSCRIPT_CACHE_NEGATIVE_TTL = float(os.getenv("TRANSCRIPT_CACHE_NEGATIVE_TTL", str(6 * 3600)))
+
+## YouTube FAISS index registry
+YOUTUBE_INDEX_DIR = os.getenv("YOUTUBE_INDEX_DIR", os.path.join(CACHE_DIR, "youtube-index"))
+YOUTUBE_INDEX_MEMORY_ENTRIES = int(os.getenv("YOUTUBE_INDEX_MEMORY_ENTRIES", "32"))
+# Saved indexes are evicted least recently used first past the size cap, and once unused for the TTL
+YOUTUBE_INDEX_MAX_BYTES = int(os.getenv("YOUTUBE_INDEX_MAX_BYTES", str(1024 ** 3)))
+YOUTUBE_INDEX_TTL = float(os.getenv("YOUTUBE_INDEX_TTL", str(30 * 24 * 3600)))
+
+## Execution pools
+# "thread" keeps models shared in one process; "process" isolates the GIL
+CPU_POOL_KIND = os.getenv("CPU_POOL_KIND", "thread")
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", "16"))
+# Jobs queued or running across both pools before new work is rejected with 503
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "64"))
+
+## LLM calls
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20.0"))
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+# Point the providers at local mock servers; empty uses the public APIs
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+# Calls in flight per provider
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+# Token-bucket rate limits in requests per minute (0 disables), with bursts of LLM_RATE_BURST
+GROQ_RATE_LIMIT = float(os.getenv("GROQ_RATE_LIMIT", "0"))
+GEMINI_RATE_LIMIT = float(os.getenv("GEMINI_RATE_LIMIT", "0"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "5"))
+# Longest a call waits for a provider slot before a 503
+LLM_SLOT_TIMEOUT = float(os.getenv("LLM_SLOT_TIMEOUT", "60"))
+# Longest a Gemini call with a Groq fallback waits before failing over
+LLM_FAILOVER_WAIT = float(os.getenv("LLM_FAILOVER_WAIT", "2"))
+# Send a duplicate request when a call runs past the provider's recent p95
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+# Latencies kept per provider for stats and hedge delays
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+## Summarization
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+# Documents needing at most this many budget-sized groups are refined
+# sequentially; larger ones use map-reduce
+SUMMARY_REFINE_MAX_GROUPS = int(os.getenv("SUMMARY_REFINE_MAX_GROUPS", "2"))
+
+## Background jobs
+# "memory" (default) or "sqlite" for records that survive restarts
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory")
+JOB_DB = os.getenv("JOB_DB", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", os.path.join(CACHE_DIR, "job-uploads"))
+# Finished jobs (and their results) are dropped after this many seconds,
+# and beyond this many, oldest first
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(24 * 3600)))
+JOB_MAX_FINISHED = int(os.getenv("JOB_MAX_FINISHED", "1000"))
+# Each process refreshes the heartbeat of its active jobs this often; active
+# jobs whose heartbeat is older than JOB_STALE_AFTER are failed as orphaned
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))
+
+## Model loading
+# Load models in the background at startup instead of on the first request
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() in ("1", "true", "yes")
+
+## PDF extraction
+# Worker processes for page-sharded extraction and embedding; 1 disables sharding
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "1"))
+# Shorter documents are processed in-process even when PDF_WORKERS > 1
+PDF_SHARD_MIN_PAGES = int(os.getenv("PDF_SHARD_MIN_PAGES", "32"))
+
+## Image preprocessing
+IMAGE_MIN_DIM = int(os.getenv("IMAGE_MIN_DIM", "48"))
+IMAGE_MIN_BYTES = int(os.getenv("IMAGE_MIN_BYTES", "1024"))
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+# Max differing bits of the 64-bit perceptual hash for two images to count as
+# duplicates; negative disables perceptual deduplication
+IMAGE_HASH_DISTANCE = int(os.getenv("IMAGE_HASH_DISTANCE", "4"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+## Image blob store
+# Extracted image bytes live here; documents only carry references
+IMAGE_BLOB_DIR = os.getenv("IMAGE_BLOB_DIR", os.path.join(CACHE_DIR, "images"))
+IMAGE_BLOB_MAX_BYTES = int(os.getenv("IMAGE_BLOB_MAX_BYTES", str(2 * 1024 ** 3)))
+# Blobs written or reused more recently than this are never evicted, so refs
+# held by requests still in flight stay readable
+IMAGE_BLOB_MIN_AGE = float(os.getenv("IMAGE_BLOB_MIN_AGE", "3600"))
+
+## Context packing
+# Local tokenizer used to measure prompt sizes
+TOKENIZER_NAME = os.getenv("TOKENIZER_NAME", "gpt2")
+# Input token budget per model for one prompt, excluding the instructions
+MODEL_TOKEN_BUDGETS = {
+    GEMINI_MODEL: int(os.getenv("GEMINI_TOKEN_BUDGET", "30000")),
+    GROQ_MODEL: int(os.getenv("GROQ_TOKEN_BUDGET", "5000")),
+}
+# Tokens Gemini charges for one inline image
+IMAGE_TOKENS = int(os.getenv("IMAGE_TOKENS", "258"))
+# Retrieved context budget for quiz prompts, and how many candidates to pack from
+QUIZ_CONTEXT_TOKENS = int(os.getenv("QUIZ_CONTEXT_TOKENS", "3000"))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+
+## Uploads
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 ** 2)))
+# Larger uploads are rejected with 413
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 ** 2)))
+
+## Batch quizzes
+QUIZ_BATCH_MAX_TOPICS = int(os.getenv("QUIZ_BATCH_MAX_TOPICS", "20"))
+# Per-topic generations running at once within one batch request
+QUIZ_BATCH_CONCURRENCY = int(os.getenv("QUIZ_BATCH_CONCURRENCY", "4"))
+
+## LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", os.path.join(CACHE_DIR, "llm-responses.sqlite3"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+# Cosine similarity of quiz topic embeddings above which an earlier quiz for
+# the same source, count and difficulty is reused; 0 disables
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+
+## Quiz parsing
+# Follow-up generations asking only for missing questions when a response
+# has fewer valid questions than requested
+QUIZ_FOLLOWUP_ATTEMPTS = int(os.getenv("QUIZ_FOLLOWUP_ATTEMPTS", "1"))
+
+## Hybrid retrieval
+# Reciprocal rank fusion constant; larger values flatten rank differences
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Cross-encoder used to rerank fused text chunks, e.g.
+# "cross-encoder/ms-marco-MiniLM-L-6-v2"; empty disables reranking
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+
+## Inference backends
+# "torch" (fp32), "int8" (dynamic quantization) or "onnx" (ONNX Runtime);
+# int8 and onnx run on CPU
+CLIP_BACKEND = os.getenv("CLIP_BACKEND", "torch")
+TEXT_EMBED_BACKEND = os.getenv("TEXT_EMBED_BACKEND", "torch")
+# Exported ONNX encoders are written here on first use
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(CACHE_DIR, "onnx"))
+
+## Document library
+LIBRARY_DIR = os.getenv("LIBRARY_DIR", os.path.join(CACHE_DIR, "library"))
+# Vector files are rewritten once more than this fraction of rows is deleted
+LIBRARY_COMPACT_RATIO = float(os.getenv("LIBRARY_COMPACT_RATIO", "0.3"))
+LIBRARY_OPEN_ENTRIES = int(os.getenv("LIBRARY_OPEN_ENTRIES", "64"))
+# Documents a single library query may span
+LIBRARY_MAX_QUERY_DOCS = int(os.getenv("LIBRARY_MAX_QUERY_DOCS", "20"))
+
+## Observability
+# Emit OpenTelemetry spans for requests and pipeline stages (needs
+# opentelemetry-api; exporters are configured by the OpenTelemetry SDK)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,85 @@
+from langchain_core.documents import Document
+from utils.config import MODEL_TOKEN_BUDGETS, IMAGE_TOKENS, SUMMARY_REFINE_MAX_GROUPS
+from utils.models import models
+
+
+def count_tokens(text):
+    """Token count of text with the local tokenizer"""
+    if not text:
+        return 0
+    try:
+        tokenizer = models.get("tokenizer")
+    except Exception:
+        # Rough fallback when the tokenizer cannot be loaded
+        return len(text) // 4 + 1
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def document_tokens(doc):
+    """Prompt cost of a document; images cost a fixed number of tokens"""
+    if doc.metadata.get("type") == "image":
+        return IMAGE_TOKENS
+    return count_tokens(doc.page_content)
+
+
+def token_budget(model_name):
+    return MODEL_TOKEN_BUDGETS[model_name]
+
+
+def pack(items, budget, size):
+    """Take items in relevance order while they fit, skipping ones that overflow so smaller ones can still fit"""
+    packed = []
+    used = 0
+    for item in items:
+        item_size = size(item)
+        if used + item_size > budget:
+            continue
+        packed.append(item)
+        used += item_size
+    return packed
+
+
+def group_by_budget(items, budget, size):
+    """Split items into consecutive groups of at most ``budget``; an oversized item forms its own group"""
+    groups = []
+    current = []
+    current_size = 0
+    for item in items:
+        item_size = size(item)
+        if current_size + item_size > budget and current:
+            groups.append(current)
+            current = []
+            current_size = 0
+        current.append(item)
+        current_size += item_size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def choose_strategy(groups):
+    """Pick stuff, refine or map_reduce from the number of budget-sized groups"""
+    if groups <= 1:
+        return "stuff"
+    if groups <= SUMMARY_REFINE_MAX_GROUPS:
+        return "refine"
+    return "map_reduce"
+
+
+def pack_documents(documents, budget):
+    """Merge consecutive text documents into as few budget-sized documents as possible"""
+    return [
+        Document(
+            page_content="\n\n".join(doc.page_content for doc in group),
+            metadata=dict(group[0].metadata),
+        )
+        for group in group_by_budget(documents, budget, document_tokens)
+    ]
+
+
+def truncate_to_budget(text, budget):
+    """Cut text to roughly ``budget`` tokens"""
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return text
+    return text[:int(len(text) * budget / tokens)]
@@ -0,0 +1,404 @@
+import fcntl
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+import numpy as np
+from langchain_core.documents import Document
+from utils.config import LIBRARY_DIR, LIBRARY_COMPACT_RATIO, LIBRARY_OPEN_ENTRIES, RETRIEVAL_CANDIDATES
+from utils.hybrid_search import reciprocal_rank_fusion, rerank, rerank_enabled, tokenize
+from utils.lru import LRUCache
+from utils.pdf_extract import EXTENSIONS
+from utils.storage import private_dir
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+MODALITIES = ("text", "image")
+
+
+def check_id(value, kind="id"):
+    if not _SAFE_ID.match(value or ""):
+        raise ValueError(f"Invalid {kind}: {value!r}")
+    return value
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class FileLock:
+    """A thread lock plus an exclusive ``flock`` on ``path``, so holders in other processes wait too"""
+
+    def __init__(self, path, lock=None):
+        self.path = path
+        self._lock = lock or threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._file = open(self.path, "a+b")
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        finally:
+            self._file = None
+            self._lock.release()
+
+
+class VectorFile:
+    """Append-only float32 matrix on disk, read through a memory map; ``compact`` drops unused rows"""
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+        self._map_key = None
+
+    def rows(self, dim):
+        if not dim or not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // (4 * dim)
+
+    def append(self, matrix):
+        """Append rows and return the index of the first one"""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        first = self.rows(matrix.shape[1])
+        with open(self.path, "ab") as f:
+            f.write(matrix.tobytes())
+        return first
+
+    def matrix(self, dim):
+        """Read-only (rows, dim) view, remapped when the file has grown or was compacted by any process"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return np.empty((0, dim), dtype=np.float32)
+        if stat.st_size < 4 * dim:
+            return np.empty((0, dim), dtype=np.float32)
+        key = (stat.st_ino, stat.st_size)
+        if key != self._map_key:
+            self._map = np.memmap(self.path, dtype=np.float32, mode="r", shape=(stat.st_size // (4 * dim), dim))
+            self._map_key = key
+        return self._map
+
+    def compact(self, dim, keep_rows):
+        """Rewrite the file with only ``keep_rows``, in that order"""
+        kept = np.array(self.matrix(dim)[keep_rows]) if len(keep_rows) else np.empty((0, dim), np.float32)
+        staging = f"{self.path}.tmp"
+        with open(staging, "wb") as f:
+            f.write(np.ascontiguousarray(kept, dtype=np.float32).tobytes())
+        self._map = None
+        self._map_key = None
+        os.replace(staging, self.path)
+
+
+class DocumentLibrary:
+    """A user's documents: chunks and an FTS5 index in SQLite, embeddings in memory-mapped vector files"""
+
+    def __init__(self, root, lock=None):
+        self.root = root
+        private_dir(root)
+        os.makedirs(os.path.join(root, "docs"), exist_ok=True)
+        # Guards vector appends and compaction against concurrent readers, in this and other processes
+        self._lock = FileLock(os.path.join(root, "library.lock"), lock)
+        self._vectors = {m: VectorFile(os.path.join(root, f"{m}_vectors.f32")) for m in MODALITIES}
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    title TEXT,
+                    source TEXT,
+                    content_hash TEXT,
+                    has_images INTEGER NOT NULL,
+                    text_chunks INTEGER NOT NULL,
+                    images INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS documents_hash ON documents (content_hash);
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_id TEXT NOT NULL,
+                    modality TEXT NOT NULL,
+                    vector_row INTEGER NOT NULL,
+                    page INTEGER,
+                    content TEXT NOT NULL,
+                    image_id TEXT,
+                    mime_type TEXT
+                );
+                CREATE INDEX IF NOT EXISTS chunks_doc ON chunks (doc_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5 (content);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                """
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(os.path.join(self.root, "library.sqlite3"), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _doc_dir(self, doc_id):
+        return os.path.join(self.root, "docs", check_id(doc_id, "document id"))
+
+    def _dim(self, conn, modality):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"{modality}_dim",)).fetchone()
+        return int(row["value"]) if row else 0
+
+    ## Documents
+
+    def list_documents(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM documents ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def get_document(self, doc_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_document(self, content_hash):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM documents WHERE content_hash = ? ORDER BY created_at LIMIT 1", (content_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def add_document(
+        self, kind, title, source, content_hash,
+        text_docs, text_embeddings, image_docs=(), image_embeddings=(), image_refs=None,
+        summary=None,
+    ):
+        """Store a document and copy its images and summary input; returns the existing record for a known hash"""
+        doc_id = uuid.uuid4().hex
+        folder = self._doc_dir(doc_id)
+        os.makedirs(os.path.join(folder, "images"), exist_ok=True)
+        for image_id, ref in (image_refs or {}).items():
+            ref.copy_to(os.path.join(folder, "images"), image_id + EXTENSIONS[ref.mime_type])
+        has_images = bool(image_docs)
+        if summary is not None:
+            has_images, documents = summary
+            blobs_dir = os.path.join(folder, "blobs")
+            os.makedirs(blobs_dir, exist_ok=True)
+            documents = [self._copy_image(doc, blobs_dir) for doc in documents]
+            with open(os.path.join(folder, "summary.pkl"), "wb") as f:
+                pickle.dump((has_images, documents), f)
+
+        record = {
+            "doc_id": doc_id,
+            "kind": kind,
+            "title": title,
+            "source": source,
+            "content_hash": content_hash,
+            "has_images": int(has_images),
+            "text_chunks": len(text_docs),
+            "images": len(image_docs),
+            "created_at": time.time(),
+        }
+        with self._lock, self._connect() as conn:
+            # Checked again under the lock: a concurrent ingest of the same content may have won
+            existing = conn.execute(
+                "SELECT * FROM documents WHERE content_hash = ? ORDER BY created_at LIMIT 1", (content_hash,)
+            ).fetchone()
+            if existing is not None:
+                shutil.rmtree(folder, ignore_errors=True)
+                return dict(existing)
+            conn.execute(
+                "INSERT INTO documents VALUES (:doc_id, :kind, :title, :source, :content_hash, "
+                ":has_images, :text_chunks, :images, :created_at)",
+                record,
+            )
+            for modality, docs, embeddings in (
+                ("text", text_docs, text_embeddings),
+                ("image", list(image_docs), image_embeddings),
+            ):
+                if not docs:
+                    continue
+                first = self._append_vectors(conn, modality, _normalize(embeddings))
+                for offset, doc in enumerate(docs):
+                    image_id = doc.metadata.get("image_id")
+                    cursor = conn.execute(
+                        "INSERT INTO chunks (doc_id, modality, vector_row, page, content, image_id, mime_type) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            doc_id, modality, first + offset, doc.metadata.get("page"), doc.page_content,
+                            image_id, (image_refs or {})[image_id].mime_type if image_id else None,
+                        ),
+                    )
+                    if modality == "text":
+                        conn.execute(
+                            "INSERT INTO chunks_fts (rowid, content) VALUES (?, ?)",
+                            (cursor.lastrowid, doc.page_content),
+                        )
+        return record
+
+    @staticmethod
+    def _copy_image(doc, directory):
+        ref = doc.metadata.get("image_ref")
+        if ref is None or not ref.exists():
+            return doc
+        return Document(page_content=doc.page_content, metadata={**doc.metadata, "image_ref": ref.copy_to(directory)})
+
+    def _append_vectors(self, conn, modality, matrix):
+        dim = self._dim(conn, modality)
+        if not dim:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?)", (f"{modality}_dim", str(matrix.shape[1]))
+            )
+        elif dim != matrix.shape[1]:
+            raise ValueError(f"{modality} embeddings have dimension {matrix.shape[1]}, library uses {dim}")
+        return self._vectors[modality].append(matrix)
+
+    def delete_document(self, doc_id):
+        """Remove a document; returns False if it does not exist"""
+        with self._lock, self._connect() as conn:
+            if conn.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone() is None:
+                return False
+            conn.execute(
+                "DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE doc_id = ?)", (doc_id,)
+            )
+            conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            for modality in MODALITIES:
+                self._maybe_compact(conn, modality)
+        shutil.rmtree(self._doc_dir(doc_id), ignore_errors=True)
+        return True
+
+    def _maybe_compact(self, conn, modality):
+        dim = self._dim(conn, modality)
+        total = self._vectors[modality].rows(dim)
+        live = conn.execute(
+            "SELECT id, vector_row FROM chunks WHERE modality = ? ORDER BY vector_row", (modality,)
+        ).fetchall()
+        if total == 0 or (total - len(live)) <= LIBRARY_COMPACT_RATIO * total:
+            return
+        self._vectors[modality].compact(dim, [row["vector_row"] for row in live])
+        conn.executemany(
+            "UPDATE chunks SET vector_row = ? WHERE id = ?",
+            [(new_row, row["id"]) for new_row, row in enumerate(live)],
+        )
+
+    ## Retrieval
+
+    def _chunks(self, conn, doc_ids):
+        marks = ",".join("?" * len(doc_ids))
+        rows = conn.execute(
+            f"SELECT id, doc_id, modality, vector_row, page, content, image_id, mime_type "
+            f"FROM chunks WHERE doc_id IN ({marks})",
+            list(doc_ids),
+        ).fetchall()
+        return {row["id"]: row for row in rows}
+
+    def _dense(self, conn, modality, rows, embedding, k):
+        rows = [row for row in rows.values() if row["modality"] == modality]
+        dim = self._dim(conn, modality)
+        if embedding is None or not rows or not dim:
+            return []
+        vectors = self._vectors[modality].matrix(dim)[[row["vector_row"] for row in rows]]
+        scores = vectors @ _normalize(embedding)
+        top = np.argsort(-scores)[:k]
+        return [rows[i]["id"] for i in top]
+
+    def _sparse(self, conn, doc_ids, query, k):
+        terms = [term.replace('"', "") for term in tokenize(query)]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        marks = ",".join("?" * len(doc_ids))
+        rows = conn.execute(
+            f"SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ? "
+            f"AND rowid IN (SELECT id FROM chunks WHERE doc_id IN ({marks})) "
+            f"ORDER BY bm25(chunks_fts) LIMIT ?",
+            [" OR ".join(f'"{term}"' for term in terms), *doc_ids, k],
+        ).fetchall()
+        return [row["rowid"] for row in rows]
+
+    def search(self, doc_ids, query, text_embedding, image_embedding=None, k=RETRIEVAL_CANDIDATES):
+        """BM25, dense text and CLIP image rankings fused with RRF, most relevant first"""
+        with self._lock, self._connect() as conn:
+            rows = self._chunks(conn, doc_ids)
+            if not rows:
+                return []
+            rankings = [
+                self._sparse(conn, doc_ids, query, k),
+                self._dense(conn, "text", rows, text_embedding, k),
+                self._dense(conn, "image", rows, image_embedding, k),
+            ]
+
+        docs = []
+        for chunk_id in reciprocal_rank_fusion(rankings)[:k]:
+            row = rows[chunk_id]
+            docs.append(Document(
+                page_content=row["content"],
+                metadata={
+                    "doc_id": row["doc_id"],
+                    "chunk_id": chunk_id,
+                    "page": row["page"],
+                    "type": row["modality"],
+                    "image_id": row["image_id"],
+                    "mime_type": row["mime_type"],
+                },
+            ))
+        if rerank_enabled():
+            docs = rerank(query, docs)
+        return docs
+
+    def image(self, doc):
+        """``{"mime_type", "data"}`` for an image document from ``search``"""
+        mime_type = doc.metadata.get("mime_type")
+        if not mime_type:
+            return None
+        path = os.path.join(
+            self._doc_dir(doc.metadata["doc_id"]), "images", doc.metadata["image_id"] + EXTENSIONS[mime_type]
+        )
+        try:
+            with open(path, "rb") as f:
+                return {"mime_type": mime_type, "data": f.read()}
+        except OSError:
+            return None
+
+    def summary_documents(self, doc_id):
+        """The (has_images, documents) pair stored for summarization"""
+        folder = self._doc_dir(doc_id)
+        with open(os.path.join(folder, "summary.pkl"), "rb") as f:
+            has_images, documents = pickle.load(f)
+        # Refs point at the document folder, wherever the library lives now
+        blobs_dir = os.path.join(folder, "blobs")
+        for doc in documents:
+            if doc.metadata.get("image_ref") is not None:
+                doc.metadata["image_ref"] = doc.metadata["image_ref"].moved(blobs_dir)
+        return has_images, documents
+
+
+_libraries = LRUCache(LIBRARY_OPEN_ENTRIES)
+_libraries_lock = threading.Lock()
+# Per-user locks outlive evicted library instances
+_user_locks = defaultdict(threading.Lock)
+
+
+def get_library(user_id):
+    """The library of a user, created on first use"""
+    check_id(user_id, "user id")
+    with _libraries_lock:
+        library = _libraries.get(user_id)
+        if library is None:
+            library = DocumentLibrary(os.path.join(LIBRARY_DIR, user_id), _user_locks[user_id])
+            _libraries.put(user_id, library)
+        return library
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+from fastapi import HTTPException
+from langchain_core.embeddings import Embeddings
+from utils.config import (
+    EMBED_BATCH_SIZE,
+    EMBED_BATCHING,
+    EMBED_BATCH_WAIT_MS,
+    EMBED_QUEUE_MAX_ITEMS,
+    EMBED_QUEUE_TIMEOUT,
+)
+from utils.metrics import EMBED_FILL_RATIO, EMBED_QUEUE_WAIT, EMBED_QUEUE_ITEMS, EMBED_REJECTED
+from utils.models import models
+
+_start_lock = threading.Lock()
+
+
+class _Entry:
+    __slots__ = ("items", "future", "enqueued")
+
+    def __init__(self, items):
+        self.items = items
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """Merges concurrent embedding calls into shared ``encode`` passes of up to ``max_batch`` float32 rows"""
+
+    def __init__(
+        self,
+        name,
+        encode,
+        max_batch=EMBED_BATCH_SIZE,
+        max_wait=EMBED_BATCH_WAIT_MS / 1000,
+        max_queue=EMBED_QUEUE_MAX_ITEMS,
+        timeout=EMBED_QUEUE_TIMEOUT,
+        enabled=EMBED_BATCHING,
+    ):
+        self.name = name
+        # One float32 row per item
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.enabled = enabled
+        self._pid = None
+
+    def _ensure_worker(self):
+        # Forked shard workers inherit the object but not the thread
+        if self._pid == os.getpid():
+            return
+        with _start_lock:
+            if self._pid == os.getpid():
+                return
+            self._cond = threading.Condition()
+            self._pending = deque()
+            self._pending_items = 0
+            threading.Thread(target=self._run, name=f"embed-{self.name}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _enqueue(self, items):
+        entry = _Entry(items)
+        with self._cond:
+            deadline = time.monotonic() + self.timeout
+            # A call that alone exceeds the limit is still let through on an empty queue
+            while self._pending and self._pending_items + len(items) > self.max_queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    EMBED_REJECTED.labels(self.name).inc()
+                    raise HTTPException(status_code=503, detail="Embedding queue is full, please retry shortly")
+                self._cond.wait(remaining)
+            self._pending.append(entry)
+            self._pending_items += len(items)
+            EMBED_QUEUE_ITEMS.labels(self.name).set(self._pending_items)
+            self._cond.notify_all()
+        return entry.future
+
+    def submit(self, items):
+        """Future resolving to the embeddings of ``items`` as a float32 array"""
+        items = list(items)
+        if not self.enabled or not items:
+            result = Future()
+            try:
+                result.set_result(self.encode(items))
+            except Exception as e:
+                result.set_exception(e)
+            return result
+
+        self._ensure_worker()
+        parts = [self._enqueue(items[i:i + self.max_batch]) for i in range(0, len(items), self.max_batch)]
+        if len(parts) == 1:
+            return parts[0]
+
+        result = Future()
+        lock = threading.Lock()
+        remaining = [len(parts)]
+
+        def part_done(part):
+            with lock:
+                if result.done():
+                    return
+                if part.exception() is not None:
+                    result.set_exception(part.exception())
+                    return
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            result.set_result(np.concatenate([p.result() for p in parts]))
+
+        for part in parts:
+            part.add_done_callback(part_done)
+        return result
+
+    def embed(self, items):
+        """Blocking variant of ``submit``"""
+        return self.submit(items).result()
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Wait for more callers until the batch is full or the oldest entry's window closes
+            deadline = self._pending[0].enqueued + self.max_wait
+            while self._pending_items < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            entries = []
+            count = 0
+            while self._pending and (not entries or count + len(self._pending[0].items) <= self.max_batch):
+                entry = self._pending.popleft()
+                entries.append(entry)
+                count += len(entry.items)
+            self._pending_items -= count
+            EMBED_QUEUE_ITEMS.labels(self.name).set(self._pending_items)
+            # Wake callers blocked on a full queue
+            self._cond.notify_all()
+        return entries, count
+
+    def _run(self):
+        while True:
+            entries, count = self._take_batch()
+            started = time.perf_counter()
+            for entry in entries:
+                EMBED_QUEUE_WAIT.labels(self.name).observe(started - entry.enqueued)
+            EMBED_FILL_RATIO.labels(self.name).observe(count / self.max_batch)
+
+            try:
+                vectors = self.encode([item for entry in entries for item in entry.items])
+            except Exception as e:
+                for entry in entries:
+                    entry.future.set_exception(e)
+                continue
+
+            offset = 0
+            for entry in entries:
+                entry.future.set_result(vectors[offset:offset + len(entry.items)])
+                offset += len(entry.items)
+
+
+def _encode_text(texts):
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.asarray(models.get("text_embeddings").embed_documents(texts), dtype=np.float32)
+
+
+# Sentence-transformer text embeddings, shared by every request
+text_batcher = MicroBatcher("text", _encode_text)
+
+
+class BatchedEmbeddings(Embeddings):
+    """LangChain embeddings that go through a MicroBatcher"""
+
+    def __init__(self, batcher=text_batcher):
+        self.batcher = batcher
+
+    def embed_documents(self, texts):
+        return self.batcher.embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self.batcher.embed([text])[0].tolist()
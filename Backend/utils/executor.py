@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+from utils.config import CPU_POOL_KIND, CPU_POOL_WORKERS, IO_POOL_WORKERS, MAX_QUEUE_DEPTH
+
+_cpu_pool = None
+_io_pool = None
+_pools_lock = threading.Lock()
+
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_cpu_pool():
+    global _cpu_pool
+    with _pools_lock:
+        if _cpu_pool is None:
+            if CPU_POOL_KIND == "process":
+                _cpu_pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS)
+            else:
+                _cpu_pool = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix="cpu")
+        return _cpu_pool
+
+
+def _get_io_pool():
+    global _io_pool
+    with _pools_lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix="io")
+        return _io_pool
+
+
+async def _submit(pool, fn, *args, **kwargs):
+    global _pending
+    with _pending_lock:
+        if _pending >= MAX_QUEUE_DEPTH:
+            raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run CPU-bound work (parsing, embedding) on the bounded CPU pool"""
+    return await _submit(_get_cpu_pool(), fn, *args, **kwargs)
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run blocking network or disk work on the IO thread pool"""
+    return await _submit(_get_io_pool(), fn, *args, **kwargs)
+
+
+def queue_depth():
+    """Number of submitted jobs that are queued or running"""
+    with _pending_lock:
+        return _pending
+
+
+def shutdown():
+    global _cpu_pool, _io_pool
+    with _pools_lock:
+        for pool in (_cpu_pool, _io_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
+        _io_pool = None
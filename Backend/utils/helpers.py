@@ -3,6 +3,8 @@ from langchain.schema import Document
 from langchain_community.document_loaders import YoutubeLoader
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled
 import yt_dlp
+from utils.transcript_cache import transcript_cache
+from utils.metrics import stage, record_cache, record_document
 
 api = YouTubeTranscriptApi()
 
@@ -22,22 +24,54 @@ def extract_video_id(url):
 def get_youtube_content(url: str):
     video_id = extract_video_id(url)
 
+    cached = transcript_cache.get(video_id) if video_id else None
+    record_cache("transcript", cached is not None)
+    if cached is not None:
+        if cached.error is not None:
+            raise HTTPException(status_code=500, detail=cached.error)
+        return cached.documents
+
+    with stage("youtube_fetch"):
+        documents = _fetch_youtube_content(url, video_id)
+    record_document("youtube", size=sum(len(doc.page_content.encode("utf-8")) for doc in documents))
+    return documents
+
+
+def _fetch_youtube_content(url, video_id):
+    """Walk the fallback chain and cache which fallback produced the content"""
     try:
         loader = YoutubeLoader.from_youtube_url(url, add_video_info=True)
-        return loader.load()
+        documents = loader.load()
+        _cache_put(video_id, documents, "youtube_loader")
+        return documents
     except Exception:
         try:
             transcript_list = api.list(video_id)
             transcript = transcript_list.find_transcript(['en'])
             data = transcript.fetch()
             text = " ".join([entry.text for entry in data]) 
-            return [Document(page_content=text)]
+            documents = [Document(page_content=text)]
+            _cache_put(video_id, documents, "transcript_api")
+            return documents
         except TranscriptsDisabled:
             try:
                 ydl_opts = {'quiet': True, 'noplaylist': True, 'skip_download': True}
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                     info = ydl.extract_info(url, download=False)
                     description = info.get("description", "No description available.")
-                    return [Document(page_content=description)]
+                    documents = [Document(page_content=description)]
+                    # Transcripts are disabled: keep the description only as
+                    # long as a negative entry so a re-enabled transcript is
+                    # picked up eventually
+                    _cache_put(video_id, documents, "yt_dlp", ttl=transcript_cache.negative_ttl)
+                    return documents
             except Exception as e:
-                raise HTTPException(status_code=500, detail=f"yt-dlp failed: {str(e)}")
\ No newline at end of file
+                detail = f"yt-dlp failed: {str(e)}"
+                if video_id:
+                    transcript_cache.put_negative(video_id, "yt_dlp", detail)
+                raise HTTPException(status_code=500, detail=detail)
+
+
+def _cache_put(video_id, documents, source, ttl=None):
+    if video_id:
+        transcript_cache.put(video_id, documents, source, ttl=ttl)
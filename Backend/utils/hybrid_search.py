@@ -0,0 +1,195 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from utils.config import RETRIEVAL_CANDIDATES, RRF_K, RERANK_CANDIDATES
+from utils.models import models
+
+# Words, numbers and joined technical terms such as "x86-64", "node.js" or "c++"
+_TOKEN = re.compile(r"\w+(?:[.\-+#/]\w+)*\+*")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts, kept as sparse postings"""
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        self.postings = {}
+        for index, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths[index] = sum(counts.values())
+            for term, count in counts.items():
+                self.postings.setdefault(term, []).append((index, count))
+        self.avg_length = float(self.doc_lengths.mean()) if len(texts) else 0.0
+        self.idf = {
+            term: math.log(1 + (len(texts) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, k):
+        """Top ``k`` (index, score) pairs, best first; texts without a query term are skipped"""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, count in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[index] / (self.avg_length or 1.0))
+                scores[index] = scores.get(index, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def to_dict(self):
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_lengths": self.doc_lengths.tolist(),
+            "postings": self.postings,
+            "avg_length": self.avg_length,
+            "idf": self.idf,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an index saved with ``to_dict`` without recounting the texts"""
+        index = cls([], data["k1"], data["b"])
+        index.doc_lengths = np.asarray(data["doc_lengths"], dtype=np.float32)
+        index.postings = {term: [tuple(posting) for posting in postings] for term, postings in data["postings"].items()}
+        index.avg_length = data["avg_length"]
+        index.idf = data["idf"]
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of keys: each key scores the sum of 1 / (k + rank)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def rerank_enabled():
+    return "reranker" in models.status()
+
+
+def rerank(query, docs, limit=RERANK_CANDIDATES):
+    """Reorder the first ``limit`` text documents with the cross-encoder; images keep their fused positions"""
+    head, tail = docs[:limit], docs[limit:]
+    text_slots = [i for i, doc in enumerate(head) if doc.metadata.get("type") != "image"]
+    if len(text_slots) < 2:
+        return docs
+
+    texts = [head[i] for i in text_slots]
+    scores = models.get("reranker").predict([(query, doc.page_content) for doc in texts])
+    ranked = [texts[i] for i in np.argsort(-np.asarray(scores), kind="stable")]
+    head = list(head)
+    for slot, doc in zip(text_slots, ranked):
+        head[slot] = doc
+    return head + tail
+
+
+def _store_from_embeddings(docs, embeddings):
+    if not docs:
+        return None
+    return FAISS.from_embeddings(
+        text_embeddings=[(doc.page_content, emb) for doc, emb in zip(docs, embeddings)],
+        embedding=None,
+        metadatas=[doc.metadata for doc in docs]
+    )
+
+
+class HybridRetriever:
+    """Text chunks found by BM25 and dense embeddings, images by CLIP, fused with reciprocal rank fusion"""
+
+    def __init__(self, text_docs, text_store, image_store=None, bm25=None):
+        self.text_docs = text_docs
+        self.text_store = text_store
+        self.image_store = image_store
+        self.bm25 = bm25 if bm25 is not None else BM25Index([doc.page_content for doc in text_docs])
+
+    @classmethod
+    def from_embeddings(cls, text_docs, text_embeddings, image_docs=(), image_embeddings=()):
+        for chunk_id, doc in enumerate(text_docs):
+            doc.metadata["chunk_id"] = chunk_id
+        return cls(
+            text_docs,
+            _store_from_embeddings(text_docs, text_embeddings),
+            _store_from_embeddings(list(image_docs), image_embeddings),
+        )
+
+    @classmethod
+    def from_vector_store(cls, text_store):
+        """Wrap an existing text FAISS store, adding chunk ids in index order"""
+        text_docs = [
+            text_store.docstore.search(text_store.index_to_docstore_id[i])
+            for i in range(len(text_store.index_to_docstore_id))
+        ]
+        for chunk_id, doc in enumerate(text_docs):
+            doc.metadata["chunk_id"] = chunk_id
+        return cls(text_docs, text_store)
+
+    @staticmethod
+    def _key(doc):
+        if doc.metadata.get("type") == "image":
+            return ("image", doc.metadata["image_id"])
+        return ("text", doc.metadata["chunk_id"])
+
+    def search(self, query, text_embedding, image_embedding=None, k=RETRIEVAL_CANDIDATES, use_reranker=None):
+        """Up to ``k`` documents for a query, most relevant first; reranked by default when a reranker is configured"""
+        docs = {}
+        rankings = []
+
+        sparse = [self.text_docs[index] for index, _ in self.bm25.search(query, k)]
+        dense = []
+        if self.text_store is not None:
+            dense = self.text_store.similarity_search_by_vector(text_embedding, k=k)
+        images = []
+        if self.image_store is not None and image_embedding is not None:
+            images = self.image_store.similarity_search_by_vector(image_embedding, k=k)
+
+        for ranking in (sparse, dense, images):
+            for doc in ranking:
+                docs[self._key(doc)] = doc
+            rankings.append([self._key(doc) for doc in ranking])
+
+        fused = [docs[key] for key in reciprocal_rank_fusion(rankings)][:k]
+        if use_reranker is None:
+            use_reranker = rerank_enabled()
+        if use_reranker:
+            fused = rerank(query, fused)
+        return fused
+
+    def save(self, folder):
+        if self.text_store is not None:
+            self.text_store.save_local(os.path.join(folder, "text_index"))
+        if self.image_store is not None:
+            self.image_store.save_local(os.path.join(folder, "image_index"))
+        # Plain JSON, so loading the sparse index never unpickles anything
+        with open(os.path.join(folder, "bm25.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "text_docs": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.text_docs],
+                "bm25": self.bm25.to_dict(),
+            }, f)
+
+    @classmethod
+    def load(cls, folder):
+        def load_store(name):
+            path = os.path.join(folder, name)
+            if not os.path.isdir(path):
+                return None
+            return FAISS.load_local(path, embeddings=None, allow_dangerous_deserialization=True)
+
+        with open(os.path.join(folder, "bm25.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        text_docs = [Document(**doc) for doc in data["text_docs"]]
+        return cls(text_docs, load_store("text_index"), load_store("image_index"), BM25Index.from_dict(data["bm25"]))
@@ -0,0 +1,131 @@
+import io
+from dataclasses import dataclass, replace
+from PIL import Image
+from utils.config import (
+    IMAGE_MIN_DIM,
+    IMAGE_MIN_BYTES,
+    IMAGE_MAX_EDGE,
+    IMAGE_HASH_DISTANCE,
+    IMAGE_JPEG_QUALITY,
+)
+
+
+@dataclass
+class ImageStats:
+    """Counters for one document's image preprocessing"""
+    seen: int = 0
+    kept: int = 0
+    dropped_small: int = 0
+    dropped_duplicate: int = 0
+    dropped_error: int = 0
+    resized: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_in - self.bytes_out
+
+    def merge(self, other):
+        for field in (
+            "seen", "kept", "dropped_small", "dropped_duplicate", "dropped_error", "resized", "bytes_in", "bytes_out",
+        ):
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+    def __str__(self):
+        return (
+            f"{self.seen} images: kept {self.kept}, dropped {self.dropped_small} small, "
+            f"{self.dropped_duplicate} duplicate and {self.dropped_error} unreadable, resized {self.resized}, "
+            f"saved {self.bytes_saved} payload bytes"
+        )
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+
+def dhash(image, size=8):
+    """64-bit difference hash; near-identical images differ in only a few bits"""
+    pixels = list(image.convert("L").resize((size + 1, size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+class ImagePreprocessor:
+    """Drop tiny and near-duplicate images and downscale large ones; ``stats`` counts what happened"""
+
+    def __init__(
+        self,
+        min_dim=IMAGE_MIN_DIM,
+        min_bytes=IMAGE_MIN_BYTES,
+        max_edge=IMAGE_MAX_EDGE,
+        hash_distance=IMAGE_HASH_DISTANCE,
+        jpeg_quality=IMAGE_JPEG_QUALITY,
+    ):
+        self.min_dim = min_dim
+        self.min_bytes = min_bytes
+        self.max_edge = max_edge
+        self.hash_distance = hash_distance
+        self.jpeg_quality = jpeg_quality
+        self.stats = ImageStats()
+        self._hashes = []
+
+    def is_duplicate(self, record):
+        """Check a record's hash against kept images, remembering it if new"""
+        if self.hash_distance < 0 or record.phash is None:
+            return False
+        for seen in self._hashes:
+            if bin(seen ^ record.phash).count("1") <= self.hash_distance:
+                return True
+        self._hashes.append(record.phash)
+        return False
+
+    def process(self, record):
+        """Return the preprocessed record, or None when it is dropped; errors are counted and re-raised"""
+        self.stats.seen += 1
+        self.stats.bytes_in += len(record.data)
+        try:
+            record = self._process(record)
+        except Exception:
+            self.stats.dropped_error += 1
+            raise
+        if record is not None:
+            self.stats.kept += 1
+            self.stats.bytes_out += len(record.data)
+        return record
+
+    def _process(self, record):
+        if len(record.data) < self.min_bytes:
+            self.stats.dropped_small += 1
+            return None
+
+        image = Image.open(io.BytesIO(record.data))
+        if min(image.size) < self.min_dim:
+            self.stats.dropped_small += 1
+            return None
+
+        record = replace(record, phash=dhash(image))
+        if self.is_duplicate(record):
+            self.stats.dropped_duplicate += 1
+            return None
+
+        if max(image.size) > self.max_edge:
+            # Convert first: CMYK, palette and other modes cannot be resized or saved as is
+            if record.mime_type == "image/jpeg":
+                image = image.convert("RGB")
+                mime_type, options = "image/jpeg", {"format": "JPEG", "quality": self.jpeg_quality}
+            else:
+                image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+                mime_type, options = "image/png", {"format": "PNG", "optimize": True}
+            image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+            buffered = io.BytesIO()
+            image.save(buffered, **options)
+            record = replace(record, data=buffered.getvalue(), mime_type=mime_type)
+            self.stats.resized += 1
+        return record
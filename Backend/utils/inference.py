@@ -0,0 +1,223 @@
+import os
+import re
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from utils.config import EMBED_BATCH_SIZE, ONNX_CACHE_DIR
+
+# Encoder backends selectable with CLIP_BACKEND / TEXT_EMBED_BACKEND
+BACKENDS = ("torch", "int8", "onnx")
+
+# Maximum sequence length of the sentence-transformer text model
+TEXT_MAX_LENGTH = 256
+
+# Lowest cosine similarity to the fp32 torch embeddings that the int8 and onnx backends may reach
+MIN_COSINE_AGREEMENT = 0.98
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def quantize_int8(module):
+    """Dynamic int8 quantization of the Linear layers, for CPU inference"""
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _onnx_path(model_name, part):
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    return os.path.join(ONNX_CACHE_DIR, f"{safe_name}-{part}.onnx")
+
+
+def _export_onnx(module, args, input_names, path):
+    """Export ``module`` once; later loads reuse the file"""
+    import torch
+
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dynamic_axes = {"embeddings": {0: "batch"}}
+    for name in input_names:
+        dynamic_axes[name] = {0: "batch"} if name == "pixel_values" else {0: "batch", 1: "sequence"}
+    # Staged under the final name: newer exporters write weights to a "<name>.data" file the model refers to
+    staging = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(staging, exist_ok=True)
+    staged = os.path.join(staging, os.path.basename(path))
+    with torch.no_grad():
+        torch.onnx.export(
+            module.eval(),
+            args,
+            staged,
+            input_names=list(input_names),
+            output_names=["embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    for name in os.listdir(staging):
+        if name != os.path.basename(path):
+            os.replace(os.path.join(staging, name), os.path.join(os.path.dirname(path), name))
+    # The model file goes last, so its existence means the export is complete
+    os.replace(staged, path)
+    os.rmdir(staging)
+    return path
+
+
+def _session(path):
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise RuntimeError("The onnx inference backend requires the onnxruntime package") from e
+    return onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+
+def _clip_modules(model):
+    import torch
+
+    class ClipVision(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model.get_image_features(pixel_values=pixel_values)
+
+    class ClipText(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+    return ClipVision(), ClipText()
+
+
+class OnnxClipModel:
+    """ONNX Runtime stand-in for CLIPModel's get_image/text_features, returning torch tensors"""
+
+    def __init__(self, model_name, model, processor):
+        import torch
+
+        self.config = model.config
+        vision, text = _clip_modules(model)
+        size = processor.image_processor.crop_size["height"]
+        vision_path = _export_onnx(
+            vision, (torch.zeros(1, 3, size, size),), ["pixel_values"], _onnx_path(model_name, "vision")
+        )
+        sample = processor(text=["a photo"], return_tensors="pt", padding=True)
+        text_path = _export_onnx(
+            text, (sample["input_ids"], sample["attention_mask"]), ["input_ids", "attention_mask"],
+            _onnx_path(model_name, "text")
+        )
+        self._vision = _session(vision_path)
+        self._text = _session(text_path)
+
+    def get_image_features(self, pixel_values, **kwargs):
+        import torch
+
+        outputs = self._vision.run(None, {"pixel_values": pixel_values.cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+    def get_text_features(self, input_ids, attention_mask, **kwargs):
+        import torch
+
+        outputs = self._text.run(None, {
+            "input_ids": input_ids.cpu().numpy().astype(np.int64),
+            "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+        })
+        return torch.from_numpy(outputs[0])
+
+
+def _mean_pooled_encoder(model):
+    import torch
+
+    class MeanPooledEncoder(torch.nn.Module):
+        """Transformer + mean pooling + L2 normalisation, as in all-MiniLM-L6-v2"""
+
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            hidden = self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            return torch.nn.functional.normalize(pooled, dim=-1)
+
+    return MeanPooledEncoder()
+
+
+class OnnxTextEmbeddings(Embeddings):
+    """LangChain embeddings running a mean-pooled sentence transformer in ONNX Runtime"""
+
+    def __init__(self, model_name, batch_size=EMBED_BATCH_SIZE):
+        from transformers import AutoModel, AutoTokenizer
+
+        self.batch_size = batch_size
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        path = _onnx_path(model_name, "text")
+        if not os.path.exists(path):
+            encoder = _mean_pooled_encoder(AutoModel.from_pretrained(model_name))
+            sample = self.tokenizer(["a sentence"], return_tensors="pt")
+            _export_onnx(encoder, (sample["input_ids"], sample["attention_mask"]), ["input_ids", "attention_mask"], path)
+        self._session = _session(path)
+
+    def embed_documents(self, texts):
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=TEXT_MAX_LENGTH,
+                return_tensors="np",
+            )
+            batches.append(self._session.run(None, {
+                "input_ids": inputs["input_ids"].astype(np.int64),
+                "attention_mask": inputs["attention_mask"].astype(np.int64),
+            })[0])
+        return [row.tolist() for batch in batches for row in batch]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def load_clip_model(model_name, backend, device):
+    """CLIP model for the backend. Returns (model, processor, device)"""
+    from transformers import CLIPProcessor, CLIPModel
+
+    processor = CLIPProcessor.from_pretrained(model_name)
+    if backend == "torch":
+        return CLIPModel.from_pretrained(model_name).to(device).eval(), processor, device
+
+    # int8 and ONNX backends run on CPU
+    model = CLIPModel.from_pretrained(model_name).eval()
+    if backend == "int8":
+        return quantize_int8(model), processor, "cpu"
+    return OnnxClipModel(model_name, model, processor), processor, "cpu"
+
+
+def load_text_embeddings(model_name, backend):
+    """LangChain embeddings for the sentence-transformer model and backend"""
+    if backend == "onnx":
+        return OnnxTextEmbeddings(model_name)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    if backend == "int8":
+        embeddings.client = quantize_int8(embeddings.client.to("cpu"))
+    return embeddings
+
+
+def cosine_agreement(baseline, candidate):
+    """Row-wise cosine similarity between two embedding matrices: (mean, min)"""
+    baseline = np.asarray(baseline, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    baseline = baseline / np.linalg.norm(baseline, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    similarity = (baseline * candidate).sum(axis=1)
+    return float(similarity.mean()), float(similarity.min())
@@ -0,0 +1,199 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from utils.config import JOB_BACKEND, JOB_DB, JOB_RETENTION, JOB_MAX_FINISHED
+
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Identifies the jobs this server process runs, for heartbeats
+OWNER = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class InMemoryJobStore:
+    """Job records in a process-local dict, lost on restart; finished jobs expire after ``retention`` seconds"""
+
+    def __init__(self, retention=JOB_RETENTION, max_finished=JOB_MAX_FINISHED):
+        self.retention = retention
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["job_id"]] = dict(job)
+            self._prune()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                # Pruned, or created by another process
+                print(f"Ignoring update for unknown job {job_id}")
+                return
+            job.update(fields)
+            if fields.get("status") not in (None, *ACTIVE_STATUSES):
+                self._prune()
+
+    def _prune(self):
+        finished = sorted(
+            (job["updated_at"], job_id)
+            for job_id, job in self._jobs.items()
+            if job["status"] not in ACTIVE_STATUSES
+        )
+        cutoff = time.time() - self.retention
+        excess = len(finished) - self.max_finished
+        for index, (updated_at, job_id) in enumerate(finished):
+            if updated_at > cutoff and index >= excess:
+                break
+            del self._jobs[job_id]
+
+    def find_active(self, dedup_key):
+        with self._lock:
+            for job in self._jobs.values():
+                if job["dedup_key"] == dedup_key and job["status"] in ACTIVE_STATUSES:
+                    return dict(job)
+        return None
+
+    def heartbeat(self, owner):
+        now = time.time()
+        with self._lock:
+            for job in self._jobs.values():
+                if job.get("owner") == owner and job["status"] in ACTIVE_STATUSES:
+                    job["heartbeat_at"] = now
+
+    def fail_stale(self, error, before):
+        """Fail active jobs whose owner has not sent a heartbeat since ``before``"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] in ACTIVE_STATUSES and (job.get("heartbeat_at") or job["updated_at"]) < before:
+                    job.update(status="failed", error=error, updated_at=time.time())
+
+
+class SQLiteJobStore:
+    """Durable job records in a SQLite table, pruned like InMemoryJobStore"""
+
+    _columns = (
+        "job_id", "kind", "dedup_key", "status", "stage", "error", "result", "created_at", "updated_at",
+        "owner", "heartbeat_at",
+    )
+
+    def __init__(self, db_path=JOB_DB, retention=JOB_RETENTION, max_finished=JOB_MAX_FINISHED):
+        self.db_path = db_path
+        self.retention = retention
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    error TEXT,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner TEXT,
+                    heartbeat_at REAL
+                )"""
+            )
+            # Tables created before heartbeats were added
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _row_to_job(self, row):
+        if row is None:
+            return None
+        job = dict(zip(self._columns, row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def create(self, job):
+        values = [job.get(column) for column in self._columns]
+        values[self._columns.index("result")] = json.dumps(job.get("result")) if job.get("result") is not None else None
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self._columns)}) VALUES ({', '.join('?' * len(self._columns))})",
+                values,
+            )
+            self._prune(conn)
+
+    def get(self, job_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(self._columns)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row)
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", [*fields.values(), job_id])
+            if fields.get("status") not in (None, *ACTIVE_STATUSES):
+                self._prune(conn)
+
+    def _prune(self, conn):
+        conn.execute(
+            "DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated_at <= ?",
+            (*ACTIVE_STATUSES, time.time() - self.retention),
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE job_id IN (SELECT job_id FROM jobs WHERE status NOT IN (?, ?) "
+            "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (*ACTIVE_STATUSES, self.max_finished),
+        )
+
+    def find_active(self, dedup_key):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(self._columns)} FROM jobs WHERE dedup_key = ? AND status IN (?, ?) "
+                "ORDER BY created_at LIMIT 1",
+                (dedup_key, *ACTIVE_STATUSES),
+            ).fetchone()
+        return self._row_to_job(row)
+
+    def heartbeat(self, owner):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time(), owner, *ACTIVE_STATUSES),
+            )
+
+    def fail_stale(self, error, before):
+        """Fail active jobs whose owner has not sent a heartbeat since ``before``"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+                "WHERE status IN (?, ?) AND COALESCE(heartbeat_at, updated_at) < ?",
+                (error, time.time(), *ACTIVE_STATUSES, before),
+            )
+
+
+def create_job_store(backend=JOB_BACKEND):
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"Unsupported job backend: {backend}")
@@ -0,0 +1,371 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar, copy_context
+import numpy as np
+from langchain_core.caches import BaseCache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+from utils.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_DB,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL,
+    LLM_CACHE_SIMILARITY,
+)
+from utils.lru import LRUCache
+from utils.metrics import record_cache, record_llm, gemini_usage
+from utils.embedding_service import text_batcher
+from utils.executor import run_io
+
+# Set per request from the X-Cache-Bypass header. Bypassed calls skip
+# lookups but still store their fresh responses.
+cache_bypass = ContextVar("llm_cache_bypass", default=False)
+
+# Seconds a scope's embedding matrix is reused before it is read again, so
+# entries written by other worker processes show up
+SCOPE_REFRESH = 60
+# Expired and excess rows are deleted once every this many writes
+PRUNE_EVERY = 100
+
+
+def _digest(part, digest):
+    if isinstance(part, str):
+        digest.update(b"s")
+        digest.update(part.encode("utf-8"))
+    elif isinstance(part, (bytes, bytearray, memoryview)):
+        # Image parts are keyed by the hash of their bytes
+        digest.update(b"b")
+        digest.update(hashlib.sha256(part).digest())
+    elif isinstance(part, dict):
+        digest.update(b"d")
+        for key in sorted(part):
+            digest.update(str(key).encode("utf-8"))
+            _digest(part[key], digest)
+    elif isinstance(part, (list, tuple)):
+        digest.update(b"l%d" % len(part))
+        for item in part:
+            _digest(item, digest)
+    else:
+        digest.update(repr(part).encode("utf-8"))
+
+
+def prompt_key(model_name, contents):
+    """Exact-match key for a model call: model name, prompt text and image hashes"""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    _digest(contents, digest)
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """LLM response texts in an LRU over SQLite, by prompt key or by the most similar query in a scope"""
+
+    def __init__(
+        self,
+        db_path=LLM_CACHE_DB,
+        max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        ttl=LLM_CACHE_TTL,
+        similarity=LLM_CACHE_SIMILARITY,
+        enabled=LLM_CACHE_ENABLED,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.enabled = enabled
+        self._memory = LRUCache(max_memory_entries)
+        # scope -> (loaded_at, texts, expiry times, normalized embeddings)
+        self._scopes = LRUCache(max_memory_entries)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counts = {"hits": 0, "misses": 0, "near_hits": 0, "near_misses": 0, "bypassed": 0}
+        if not enabled:
+            return
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    scope TEXT,
+                    embedding BLOB,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+        if name != "bypassed":
+            record_cache("llm_near" if name.startswith("near") else "llm", name.endswith("hits"))
+
+    def _skip_lookup(self):
+        if not self.enabled:
+            return True
+        if cache_bypass.get():
+            self._count("bypassed")
+            return True
+        return False
+
+    def get(self, key):
+        """Cached text for an exact prompt key, or None"""
+        if self._skip_lookup():
+            return None
+
+        entry = self._memory.get(key)
+        if entry is None:
+            with self._lock, self._connect() as conn:
+                entry = conn.execute(
+                    "SELECT text, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if entry is not None:
+                self._memory.put(key, entry)
+
+        if entry is None or entry[1] <= time.time():
+            self._count("misses")
+            return None
+        self._count("hits")
+        return entry[0]
+
+    def get_similar(self, scope, query):
+        """Cached text for the most similar earlier query in ``scope``, or None"""
+        if self.similarity <= 0 or self._skip_lookup():
+            return None
+
+        texts, expires, embeddings = self._scope_entries(scope)
+        live = expires > time.time()
+        if live.any():
+            scores = np.where(live, embeddings @ self._embed(query), -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity:
+                self._count("near_hits")
+                return texts[best]
+        self._count("near_misses")
+        return None
+
+    def _scope_entries(self, scope):
+        """(texts, expiry times, embeddings) of a scope, read from SQLite at most every SCOPE_REFRESH seconds"""
+        entry = self._scopes.get(scope)
+        if entry is not None and time.monotonic() - entry[0] < SCOPE_REFRESH:
+            return entry[1:]
+
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT text, expires_at, embedding FROM responses "
+                "WHERE scope = ? AND embedding IS NOT NULL AND expires_at > ?",
+                (scope, time.time()),
+            ).fetchall()
+        texts = [row[0] for row in rows]
+        expires = np.array([row[1] for row in rows], dtype=np.float64)
+        if rows:
+            embeddings = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        else:
+            embeddings = np.empty((0, 0), dtype=np.float32)
+        self._scopes.put(scope, (time.monotonic(), texts, expires, embeddings))
+        return texts, expires, embeddings
+
+    def put(self, key, text, scope=None, query=None):
+        if not self.enabled:
+            return
+        now = time.time()
+        embedding = None
+        if scope is not None and query is not None and self.similarity > 0:
+            embedding = self._embed(query).tobytes()
+        self._memory.put(key, (text, now + self.ttl))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, scope, embedding, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, text, scope, embedding, now, now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(conn, now)
+        if scope is not None:
+            self._scopes.pop(scope)
+
+    async def aget(self, key):
+        """``get`` on the IO pool; the copied context carries the cache bypass flag"""
+        return await run_io(copy_context().run, self.get, key)
+
+    async def aput(self, key, text, scope=None, query=None):
+        await run_io(self.put, key, text, scope=scope, query=query)
+
+    def _prune(self, conn, now):
+        """Drop expired entries, then the oldest ones beyond ``max_entries``"""
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    @staticmethod
+    def _embed(query):
+        embedding = text_batcher.embed([query])[0]
+        return embedding / (np.linalg.norm(embedding) or 1.0)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        entries = 0
+        if self.enabled:
+            with self._lock, self._connect() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        def rate(hits, misses):
+            total = hits + misses
+            return hits / total if total else 0.0
+
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "exact": {
+                "hits": counts["hits"],
+                "misses": counts["misses"],
+                "hit_rate": rate(counts["hits"], counts["misses"]),
+            },
+            "near": {
+                "hits": counts["near_hits"],
+                "misses": counts["near_misses"],
+                "hit_rate": rate(counts["near_hits"], counts["near_misses"]),
+            },
+            "bypassed": counts["bypassed"],
+        }
+
+
+llm_cache = LLMResponseCache()
+
+
+async def near_duplicate(scope, query, generate):
+    """Reuse the JSON result of a near-identical earlier query; ``scope`` pins everything else that shapes it"""
+    if not llm_cache.enabled or llm_cache.similarity <= 0:
+        return await generate()
+    # Embedding the query and SQLite block, so they run off the event loop;
+    # the copied context carries the request's cache bypass flag
+    cached = await run_io(copy_context().run, llm_cache.get_similar, scope, query)
+    if cached is not None:
+        return json.loads(cached)
+    result = await generate()
+    await llm_cache.aput(prompt_key("near", [scope, query]), json.dumps(result), scope=scope, query=query)
+    return result
+
+
+class GroqResponseCache(BaseCache):
+    """LangChain cache adapter so ChatGroq calls inside chains are cached"""
+
+    @staticmethod
+    def _key(prompt, llm_string):
+        return prompt_key(llm_string, prompt)
+
+    def lookup(self, prompt, llm_string):
+        text = llm_cache.get(self._key(prompt, llm_string))
+        if text is None:
+            return None
+        # Marked so the metrics callback can tell cache hits from API calls
+        return [ChatGeneration(message=AIMessage(content=text, response_metadata={"cached": True}))]
+
+    def update(self, prompt, llm_string, return_val):
+        if return_val:
+            llm_cache.put(self._key(prompt, llm_string), return_val[0].text)
+
+    async def alookup(self, prompt, llm_string):
+        return await run_io(copy_context().run, self.lookup, prompt, llm_string)
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        await run_io(self.update, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs):
+        pass
+
+
+groq_cache = GroqResponseCache()
+
+
+async def cached_astream(chat_model, prompt):
+    """Stream text from a LangChain chat model, replaying cached responses whole"""
+    key = prompt_key(chat_model.model_name, prompt)
+    cached = await llm_cache.aget(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    async for chunk in chat_model.astream(prompt):
+        chunks.append(chunk.content)
+        yield chunk.content
+    await llm_cache.aput(key, "".join(chunks))
+
+
+class _CachedText:
+    def __init__(self, text):
+        self.text = text
+
+
+class _CachedStream:
+    """Async-iterable stand-in for a streamed Gemini response"""
+
+    def __init__(self, key, chunks=None, response=None, model_name=None, start=None):
+        self._key = key
+        self._chunks = chunks
+        self._response = response
+        self._model_name = model_name
+        self._start = start
+
+    async def __aiter__(self):
+        if self._chunks is not None:
+            for chunk in self._chunks:
+                yield _CachedText(chunk)
+            return
+
+        texts = []
+        async for chunk in self._response:
+            texts.append(chunk.text)
+            yield chunk
+        # Usage is reported once the stream is complete
+        record_llm("gemini", self._model_name, time.perf_counter() - self._start, *gemini_usage(self._response))
+        await llm_cache.aput(self._key, "".join(texts))
+
+
+class CachedGenerativeModel:
+    """genai.GenerativeModel wrapper that caches response texts by prompt key, calling ``model`` on a miss"""
+
+    def __init__(self, model_name, model=None):
+        if model is None:
+            import google.generativeai as genai
+
+            model = genai.GenerativeModel(model_name)
+        self.model_name = model_name
+        self._model = model
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        key = prompt_key(self.model_name, contents)
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            record_llm("gemini", self.model_name, outcome="cached")
+            if stream:
+                return _CachedStream(key, chunks=[cached])
+            return _CachedText(cached)
+
+        start = time.perf_counter()
+        try:
+            response = await self._model.generate_content_async(contents, stream=stream, **kwargs)
+        except Exception:
+            record_llm("gemini", self.model_name, time.perf_counter() - start, outcome="error")
+            raise
+        if stream:
+            return _CachedStream(key, response=response, model_name=self.model_name, start=start)
+
+        record_llm("gemini", self.model_name, time.perf_counter() - start, *gemini_usage(response))
+        await llm_cache.aput(key, response.text)
+        return response
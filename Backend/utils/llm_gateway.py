@@ -0,0 +1,365 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+import httpx
+import google.generativeai as genai
+from fastapi import HTTPException
+from langchain_groq import ChatGroq
+from utils.config import (
+    GROQ_MODEL,
+    GEMINI_MODEL,
+    GROQ_BASE_URL,
+    GEMINI_BASE_URL,
+    LLM_REQUEST_TIMEOUT,
+    GROQ_MAX_CONCURRENCY,
+    GEMINI_MAX_CONCURRENCY,
+    GROQ_RATE_LIMIT,
+    GEMINI_RATE_LIMIT,
+    LLM_RATE_BURST,
+    LLM_SLOT_TIMEOUT,
+    LLM_FAILOVER_WAIT,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_LATENCY_WINDOW,
+)
+from utils.llm_cache import CachedGenerativeModel, groq_cache, cached_astream
+from utils.metrics import groq_metrics, record_failover
+from utils.retry import retry_async, is_transient
+
+# Hedge only once this many latencies are known, so the p95 means something
+HEDGE_MIN_SAMPLES = 20
+
+
+class ProviderSaturated(HTTPException):
+    """No provider slot or rate-limit token became free in time"""
+
+    def __init__(self, provider):
+        super().__init__(status_code=503, detail=f"{provider} is at capacity, please retry shortly")
+        self.provider = provider
+
+
+def should_fail_over(exc):
+    """True if another provider could answer: saturation, rate limits, outages, transport errors"""
+    return isinstance(exc, ProviderSaturated) or is_transient(exc)
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ProviderPool:
+    """Concurrency slots, token-bucket rate limit and latency window for one provider, shared by every loop"""
+
+    def __init__(self, name, max_concurrency, rate_per_minute=0, burst=LLM_RATE_BURST):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.rate = rate_per_minute / 60
+        self.burst = max(1, burst)
+        # Counted under a thread lock, not an asyncio semaphore, so asyncio.run in threads shares the slots
+        self.in_flight = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LLM_LATENCY_WINDOW)
+        self._counts = {
+            "requests": 0, "errors": 0, "retries": 0, "saturated": 0,
+            "hedges": 0, "hedge_wins": 0, "failovers": 0,
+        }
+
+    def count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def try_acquire(self):
+        """Take a slot (and a rate token) if one is free right now"""
+        with self._lock:
+            if self.in_flight >= self.max_concurrency:
+                return False
+            if self.rate:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens < 1:
+                    return False
+                self._tokens -= 1
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def acquire(self, timeout=LLM_SLOT_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        delay = 0.005
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                self.count("saturated")
+                raise ProviderSaturated(self.name)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    @asynccontextmanager
+    async def slot(self, timeout=LLM_SLOT_TIMEOUT):
+        await self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def observe(self, seconds, failed=False):
+        with self._lock:
+            self._counts["requests"] += 1
+            if failed:
+                self._counts["errors"] += 1
+            else:
+                self._latencies.append(seconds)
+
+    def hedge_delay(self):
+        """Seconds before a duplicate request is sent, or None while too few calls are known"""
+        with self._lock:
+            latencies = list(self._latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(LLM_HEDGE_MIN_DELAY, _percentile(latencies, 0.95))
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            counts = dict(self._counts)
+            in_flight = self.in_flight
+        return {
+            "in_flight": in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rate_per_minute": self.rate * 60,
+            "latency": {
+                "samples": len(latencies),
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "p99": _percentile(latencies, 0.99),
+            },
+            **counts,
+        }
+
+
+class _SlotStream:
+    """Streamed response that gives its provider slot back once consumed"""
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    @property
+    def usage_metadata(self):
+        return getattr(self._response, "usage_metadata", None)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._response:
+                yield chunk
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+    def __del__(self):
+        # A stream that is never iterated must not hold its slot forever
+        self._close()
+
+
+class LLMGateway:
+    """Shared LLM clients behind per-provider limits, retries, hedging and failover"""
+
+    def __init__(self):
+        self.providers = {
+            "groq": ProviderPool("groq", GROQ_MAX_CONCURRENCY, GROQ_RATE_LIMIT),
+            "gemini": ProviderPool("gemini", GEMINI_MAX_CONCURRENCY, GEMINI_RATE_LIMIT),
+        }
+        self.hedging = LLM_HEDGE_ENABLED
+
+    async def _timed(self, pool, call):
+        start = time.perf_counter()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pool.observe(time.perf_counter() - start, failed=True)
+            raise
+        pool.observe(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, pool, call):
+        """Run ``call()``; past the hedge delay, race a duplicate if a slot is free"""
+        delay = pool.hedge_delay() if self.hedging else None
+        if delay is None:
+            return await self._timed(pool, call)
+
+        first = asyncio.ensure_future(self._timed(pool, call))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if done or not pool.try_acquire():
+            return await first
+
+        pool.count("hedges")
+        second = asyncio.ensure_future(self._timed(pool, call))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            pool.count("hedge_wins")
+                        return task.result()
+            # Both attempts failed
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            pool.release()
+
+    async def call(self, provider, call, slot_timeout=LLM_SLOT_TIMEOUT):
+        """Await ``call()`` in a provider slot, retrying rate limits; ProviderSaturated if none frees up in time"""
+        pool = self.providers[provider]
+        async with pool.slot(slot_timeout):
+            attempt = 0
+
+            async def attempt_call():
+                nonlocal attempt
+                if attempt:
+                    pool.count("retries")
+                attempt += 1
+                return await self._hedged(pool, call)
+
+            return await retry_async(attempt_call)
+
+    async def stream(self, provider, call, slot_timeout=LLM_SLOT_TIMEOUT):
+        """Start a streamed call; the slot is held until the stream is consumed"""
+        pool = self.providers[provider]
+        await pool.acquire(slot_timeout)
+        try:
+            response = await retry_async(call)
+        except BaseException:
+            pool.release()
+            raise
+        return _SlotStream(response, pool.release)
+
+    def failover(self, provider, error):
+        """Count a call that went to the fallback provider instead"""
+        self.providers[provider].count("failovers")
+        record_failover(provider, error)
+
+    def stats(self):
+        return {name: pool.stats() for name, pool in self.providers.items()}
+
+
+gateway = LLMGateway()
+
+
+class PooledChatGroq(ChatGroq):
+    """ChatGroq whose API calls go through the gateway's Groq pool; cache hits never take a slot"""
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        generate = super()._agenerate
+        return await gateway.call(
+            "groq", lambda: generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        )
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async with gateway.providers["groq"].slot():
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+
+
+class PooledGenerativeModel:
+    """genai.GenerativeModel whose calls go through the gateway's Gemini pool"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    async def generate_content_async(self, contents, stream=False, slot_timeout=LLM_SLOT_TIMEOUT, **kwargs):
+        if stream:
+            return await gateway.stream(
+                "gemini", lambda: self._model.generate_content_async(contents, stream=True, **kwargs), slot_timeout
+            )
+        return await gateway.call(
+            "gemini", lambda: self._model.generate_content_async(contents, **kwargs), slot_timeout
+        )
+
+
+def _configure_gemini():
+    options = {"api_key": os.getenv("GOOGLE_API_KEY")}
+    if GEMINI_BASE_URL:
+        # Mock servers speak the REST API
+        options["transport"] = "rest"
+        options["client_options"] = {"api_endpoint": GEMINI_BASE_URL}
+    genai.configure(**options)
+
+
+_configure_gemini()
+
+# One pooled HTTP client per process for every Groq call
+_groq_limits = httpx.Limits(max_connections=GROQ_MAX_CONCURRENCY * 2, max_keepalive_connections=GROQ_MAX_CONCURRENCY)
+
+groq_llm = PooledChatGroq(
+    model=GROQ_MODEL,
+    api_key=os.getenv("GROQ_API_KEY"),
+    base_url=GROQ_BASE_URL or None,
+    timeout=LLM_REQUEST_TIMEOUT,
+    # Retries happen in the gateway, with jitter and under the slot
+    max_retries=0,
+    http_client=httpx.Client(limits=_groq_limits, timeout=LLM_REQUEST_TIMEOUT),
+    http_async_client=httpx.AsyncClient(limits=_groq_limits, timeout=LLM_REQUEST_TIMEOUT),
+    cache=groq_cache,
+    callbacks=[groq_metrics],
+)
+gemini_llm = CachedGenerativeModel(GEMINI_MODEL, model=PooledGenerativeModel(GEMINI_MODEL))
+
+
+async def generate_with_failover(contents, fallback):
+    """Gemini text for ``contents``, or ``fallback()`` if Gemini is saturated or unavailable"""
+    try:
+        response = await gemini_llm.generate_content_async(contents, slot_timeout=LLM_FAILOVER_WAIT)
+        return response.text
+    except Exception as e:
+        if not should_fail_over(e):
+            raise
+        gateway.failover("gemini", e)
+    return await fallback()
+
+
+async def stream_with_failover(contents, fallback):
+    """Stream Gemini text for ``contents``, or the tokens of ``fallback()`` if Gemini is unavailable before the first token"""
+    emitted = False
+    try:
+        response = await gemini_llm.generate_content_async(contents, stream=True, slot_timeout=LLM_FAILOVER_WAIT)
+        async for chunk in response:
+            emitted = True
+            yield chunk.text
+        return
+    except Exception as e:
+        # Tokens already sent cannot be taken back
+        if emitted or not should_fail_over(e):
+            raise
+        gateway.failover("gemini", e)
+    async for token in fallback():
+        yield token
+
+
+def groq_stream(prompt):
+    """Stream Groq's answer to a text prompt, through the response cache"""
+    return cached_astream(groq_llm, prompt)
@@ -0,0 +1,197 @@
+import threading
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from langchain_core.callbacks import BaseCallbackHandler
+from utils.config import TRACING_ENABLED
+
+# Stages run from milliseconds (retrieval) to minutes (large PDF parsing)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "quizgen_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_ERRORS = Counter("quizgen_stage_errors", "Pipeline stages that raised", ["stage"])
+HTTP_SECONDS = Histogram(
+    "quizgen_http_request_seconds", "Request latency per route", ["method", "route", "status"],
+    buckets=STAGE_BUCKETS,
+)
+
+DOCUMENT_PAGES = Counter("quizgen_document_pages", "Pages parsed", ["source"])
+DOCUMENT_CHUNKS = Counter("quizgen_document_chunks", "Text chunks indexed", ["source"])
+DOCUMENT_IMAGES = Counter("quizgen_document_images", "Images indexed", ["source"])
+DOCUMENT_BYTES = Counter("quizgen_document_bytes", "Source bytes processed", ["source"])
+IMAGES_PREPROCESSED = Counter("quizgen_images_preprocessed", "Extracted images by preprocessing outcome", ["outcome"])
+IMAGE_BYTES = Counter("quizgen_image_bytes", "Image payload bytes before and after preprocessing", ["stage"])
+
+LLM_SECONDS = Histogram(
+    "quizgen_llm_request_seconds", "LLM call latency, cache hits excluded", ["provider", "model"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_REQUESTS = Counter("quizgen_llm_requests", "LLM calls by outcome", ["provider", "model", "outcome"])
+LLM_TOKENS = Counter("quizgen_llm_tokens", "LLM tokens reported by the provider", ["provider", "model", "kind"])
+LLM_FAILOVERS = Counter("quizgen_llm_failovers", "Calls sent to the fallback provider, by error type", ["provider", "error"])
+
+CACHE_LOOKUPS = Counter("quizgen_cache_lookups", "Cache lookups by result", ["cache", "result"])
+
+QUEUE_DEPTH = Gauge("quizgen_executor_queue_depth", "Jobs queued or running on the worker pools")
+
+EMBED_FILL_RATIO = Histogram(
+    "quizgen_embed_batch_fill_ratio", "Items per encoder forward pass over the batch size", ["encoder"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+EMBED_QUEUE_WAIT = Histogram(
+    "quizgen_embed_queue_wait_seconds", "Time embedding requests wait for a batch", ["encoder"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+EMBED_QUEUE_ITEMS = Gauge("quizgen_embed_queue_items", "Items waiting for an encoder", ["encoder"])
+EMBED_REJECTED = Counter("quizgen_embed_rejected", "Embedding requests refused because the queue was full", ["encoder"])
+
+_tracer = None
+if TRACING_ENABLED:
+    try:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer("quizgen")
+    except ImportError:
+        print("TRACING_ENABLED is set but opentelemetry-api is not installed; spans are disabled")
+
+
+@contextmanager
+def span(name, **attributes):
+    """OpenTelemetry span when tracing is enabled, otherwise nothing"""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+@contextmanager
+def stage(name, **attributes):
+    """Time a pipeline stage into ``quizgen_stage_seconds`` and trace it; shard workers record it locally"""
+    start = time.perf_counter()
+    with span(name, **attributes):
+        try:
+            yield
+        except BaseException:
+            STAGE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            STAGE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+def record_document(source, pages=0, chunks=0, images=0, size=0):
+    """Count the size of a processed document: pages, chunks, images and bytes"""
+    DOCUMENT_PAGES.labels(source).inc(pages)
+    DOCUMENT_CHUNKS.labels(source).inc(chunks)
+    DOCUMENT_IMAGES.labels(source).inc(images)
+    DOCUMENT_BYTES.labels(source).inc(size)
+
+
+def record_images(stats):
+    """Count one document's image preprocessing outcomes from its ImageStats"""
+    for outcome in ("kept", "dropped_small", "dropped_duplicate", "dropped_error", "resized"):
+        IMAGES_PREPROCESSED.labels(outcome).inc(getattr(stats, outcome))
+    IMAGE_BYTES.labels("in").inc(stats.bytes_in)
+    IMAGE_BYTES.labels("out").inc(stats.bytes_out)
+
+
+def record_llm(provider, model, seconds=None, prompt_tokens=None, completion_tokens=None, outcome="ok"):
+    """Record one LLM call. Cache hits pass ``outcome="cached"`` and no latency"""
+    LLM_REQUESTS.labels(provider, model, outcome).inc()
+    if seconds is not None:
+        LLM_SECONDS.labels(provider, model).observe(seconds)
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider, model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider, model, "completion").inc(completion_tokens)
+
+
+def record_failover(provider, error):
+    LLM_FAILOVERS.labels(provider, type(error).__name__).inc()
+
+
+_cache_counts = {}
+_cache_lock = threading.Lock()
+
+
+def record_cache(cache, hit):
+    result = "hit" if hit else "miss"
+    CACHE_LOOKUPS.labels(cache, result).inc()
+    with _cache_lock:
+        counts = _cache_counts.setdefault(cache, {"hit": 0, "miss": 0})
+        counts[result] += 1
+
+
+def cache_hit_rates():
+    """Hit rate of every cache since startup"""
+    with _cache_lock:
+        return {
+            cache: counts["hit"] / (counts["hit"] + counts["miss"])
+            for cache, counts in _cache_counts.items()
+            if counts["hit"] + counts["miss"]
+        }
+
+
+class _CacheHitRateCollector:
+    def collect(self):
+        family = GaugeMetricFamily("quizgen_cache_hit_ratio", "Cache hit rate since startup", labels=["cache"])
+        for cache, rate in cache_hit_rates().items():
+            family.add_metric([cache], rate)
+        yield family
+
+
+REGISTRY.register(_CacheHitRateCollector())
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """LangChain callback recording latency and token usage of chat model calls"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self._starts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        self._starts[run_id] = (time.perf_counter(), model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start, model = self._starts.pop(run_id, (None, "unknown"))
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        metadata = getattr(message, "response_metadata", None) or {}
+        if metadata.get("cached"):
+            record_llm(self.provider, model, outcome="cached")
+            return
+
+        usage = (response.llm_output or {}).get("token_usage") or metadata.get("token_usage") or {}
+        usage_metadata = getattr(message, "usage_metadata", None) or {}
+        record_llm(
+            self.provider,
+            model,
+            None if start is None else time.perf_counter() - start,
+            usage.get("prompt_tokens") or usage_metadata.get("input_tokens"),
+            usage.get("completion_tokens") or usage_metadata.get("output_tokens"),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start, model = self._starts.pop(run_id, (None, "unknown"))
+        record_llm(self.provider, model, None if start is None else time.perf_counter() - start, outcome="error")
+
+
+groq_metrics = LLMMetricsCallback("groq")
+
+
+def gemini_usage(response):
+    """(prompt_tokens, completion_tokens) from a Gemini response, if reported"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+def metrics_payload():
+    """Prometheus text exposition of every metric. Returns (body, content_type)"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
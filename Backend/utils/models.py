@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import namedtuple
+from utils.config import TOKENIZER_NAME, RERANK_MODEL, CLIP_BACKEND, TEXT_EMBED_BACKEND
+
+ClipBundle = namedtuple("ClipBundle", ["model", "processor", "device"])
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+TEXT_EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _load_clip(backend=CLIP_BACKEND):
+    # Heavy imports stay inside the loader so importing the app stays cheap
+    import torch
+    from utils.inference import check_backend, load_clip_model
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return ClipBundle(*load_clip_model(CLIP_MODEL_NAME, check_backend(backend), device))
+
+
+def _load_text_embeddings(backend=TEXT_EMBED_BACKEND):
+    from utils.inference import check_backend, load_text_embeddings
+
+    return load_text_embeddings(TEXT_EMBEDDING_MODEL_NAME, check_backend(backend))
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+    # Only used for counting, so silence the max-length warning
+    tokenizer.model_max_length = int(1e30)
+    return tokenizer
+
+
+def _load_reranker():
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(RERANK_MODEL)
+
+
+class ModelRegistry:
+    """Loads each model on first use, or ahead of time through warm-up"""
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._errors = {}
+        self._load_seconds = {}
+        self._locks = {}
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._locks[name]:
+            if name not in self._models:
+                start = time.perf_counter()
+                try:
+                    self._models[name] = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._errors.pop(name, None)
+                self._load_seconds[name] = time.perf_counter() - start
+            return self._models[name]
+
+    def ready(self):
+        return all(name in self._models for name in self._loaders)
+
+    def status(self):
+        return {
+            name: {
+                "loaded": name in self._models,
+                "load_seconds": self._load_seconds.get(name),
+                "error": self._errors.get(name),
+            }
+            for name in self._loaders
+        }
+
+    def warm_up(self):
+        """Load every registered model, logging failures instead of raising"""
+        for name in self._loaders:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Error loading model {name}: {e}")
+
+    def start_warm_up(self):
+        """Load models on a background thread so startup is not blocked"""
+        thread = threading.Thread(target=self.warm_up, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+models = ModelRegistry()
+models.register("clip", _load_clip)
+models.register("text_embeddings", _load_text_embeddings)
+models.register("tokenizer", _load_tokenizer)
+if RERANK_MODEL:
+    models.register("reranker", _load_reranker)
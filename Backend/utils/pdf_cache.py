@@ -0,0 +1,80 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from utils.config import PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES
+from utils.storage import dir_size, private_dir
+
+
+def content_hash(data):
+    """SHA-256 hex digest of the uploaded bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class PDFCache:
+    """Per-document artefacts on disk keyed by the PDF's SHA-256; writes are atomic, eviction is LRU"""
+
+    def __init__(self, root=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        private_dir(self.root)
+
+    def path(self, key, name=""):
+        return os.path.join(self.root, key, name)
+
+    def get(self, key, name):
+        """Return the path of a cached artefact, or None on a miss"""
+        path = self.path(key, name)
+        if not os.path.exists(path):
+            return None
+        # Bump recency for LRU eviction
+        now = time.time()
+        try:
+            os.utime(self.path(key), (now, now))
+        except OSError:
+            pass
+        return path
+
+    def put(self, key, name, writer):
+        """Write an artefact with ``writer(staging_path)`` and publish it"""
+        staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+        try:
+            staging_path = os.path.join(staging_dir, name)
+            writer(staging_path)
+            with self._lock:
+                entry_dir = self.path(key)
+                os.makedirs(entry_dir, exist_ok=True)
+                target = os.path.join(entry_dir, name)
+                if os.path.isdir(target):
+                    shutil.rmtree(target, ignore_errors=True)
+                os.replace(staging_path, target)
+                os.utime(entry_dir)
+                self._evict(keep=key)
+            return target
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _evict(self, keep=None):
+        entries = []
+        total = 0
+        for key in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, key)
+            if key.startswith(".") or not os.path.isdir(entry_dir):
+                continue
+            size = dir_size(entry_dir)
+            total += size
+            entries.append((os.path.getmtime(entry_dir), key, size))
+
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            total -= size
+
+
+pdf_cache = PDFCache()
@@ -0,0 +1,224 @@
+import io
+import math
+import mmap
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Optional
+import fitz  # PyMuPDF
+from PIL import Image
+from utils.config import PDF_WORKERS, PDF_SHARD_MIN_PAGES
+from utils.blob_store import image_store
+from utils.image_preprocess import ImagePreprocessor, ImageStats
+from utils.metrics import record_images
+
+# Image formats Gemini accepts as inline_data without conversion
+MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+}
+EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+
+
+@dataclass
+class TextRecord:
+    page: int
+    text: str
+
+
+@dataclass
+class ImageRecord:
+    page: int
+    index: int
+    xref: int
+    # None once the bytes were spilled to a blob store
+    data: Optional[bytes]
+    mime_type: str
+    # Perceptual hash, set by ImagePreprocessor
+    phash: Optional[int] = None
+    # blob_store.ImageRef of the spilled bytes
+    ref: Optional[object] = None
+
+    @property
+    def image_id(self):
+        return f"page_{self.page}_img_{self.index}"
+
+    @property
+    def size(self):
+        return len(self.data) if self.data is not None else self.ref.size
+
+    def to_pil(self):
+        data = self.data if self.data is not None else self.ref.read()
+        return Image.open(io.BytesIO(data)).convert("RGB")
+
+    def spill(self, store):
+        """Copy of the record with its bytes moved to ``store``, keeping only a ref"""
+        if self.data is None:
+            return self
+        return replace(self, data=None, ref=store.put(self.data, self.mime_type))
+
+
+def _image_payload(base_image):
+    """Original image bytes when Gemini accepts the format, PNG otherwise"""
+    mime_type = MIME_TYPES.get(base_image["ext"].lower())
+    if mime_type is not None:
+        return base_image["image"], mime_type
+
+    buffered = io.BytesIO()
+    Image.open(io.BytesIO(base_image["image"])).convert("RGB").save(buffered, format="PNG")
+    return buffered.getvalue(), "image/png"
+
+
+@contextmanager
+def open_pdf(path):
+    """Open a PDF from a read-only memory map of the file, or by path when it cannot be mapped"""
+    with open(path, "rb") as handle:
+        try:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            buffer = None
+
+        doc = None
+        if buffer is not None:
+            try:
+                doc = fitz.open(stream=buffer, filetype="pdf")
+            except Exception:
+                # A corrupt file fails again below with PyMuPDF's own error
+                buffer.close()
+                buffer = None
+        if doc is None:
+            doc = fitz.open(path)
+
+        try:
+            yield doc
+        finally:
+            # The document must be closed before the buffer it reads from
+            doc.close()
+            if buffer is not None:
+                buffer.close()
+
+
+def iter_pdf_records(path, start=0, stop=None, preprocessor=None):
+    """Walk a page range once, yielding text and every image xref once, through ``preprocessor`` if given"""
+    seen_xrefs = set()
+    with open_pdf(path) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_num in range(start, stop):
+            page = doc[page_num]
+            text = page.get_text()
+            if text.strip():
+                yield TextRecord(page=page_num, text=text)
+
+            for img_index, img in enumerate(page.get_images(full=True)):
+                xref = img[0]
+                if xref in seen_xrefs:
+                    continue
+                seen_xrefs.add(xref)
+                try:
+                    data, mime_type = _image_payload(doc.extract_image(xref))
+                    record = ImageRecord(page=page_num, index=img_index, xref=xref, data=data, mime_type=mime_type)
+                    if preprocessor is not None:
+                        record = preprocessor.process(record)
+                except Exception as e:
+                    print(f"Error processing image {img_index} on page {page_num}: {e}")
+                    continue
+                if record is not None:
+                    yield record
+
+
+def page_count(path):
+    with open_pdf(path) as doc:
+        return doc.page_count
+
+
+def page_shards(pages, workers):
+    """Split ``pages`` into at most ``workers`` contiguous (start, stop) ranges"""
+    size = max(1, math.ceil(pages / max(1, workers)))
+    return [(start, min(start + size, pages)) for start in range(0, pages, size)]
+
+
+_shard_pool = None
+_shard_pool_lock = threading.Lock()
+
+
+def _init_shard_worker(threads):
+    # Runs in a fresh (spawned) interpreter before torch is imported, so each
+    # worker takes its share of the cores instead of all of them
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+
+
+def _get_shard_pool():
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            threads = max(1, (os.cpu_count() or 1) // PDF_WORKERS)
+            _shard_pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_shard_worker,
+                initargs=(threads,),
+            )
+        return _shard_pool
+
+
+def map_page_shards(path, fn, workers=PDF_WORKERS):
+    """Run a module-level ``fn(path, start, stop)`` over page ranges in shard processes, results in page order"""
+    pages = page_count(path)
+    if workers <= 1 or pages < PDF_SHARD_MIN_PAGES:
+        return [fn(path, 0, pages)]
+
+    shards = page_shards(pages, workers)
+    futures = [_get_shard_pool().submit(fn, path, start, stop) for start, stop in shards]
+    return [future.result() for future in futures]
+
+
+def extract_records(path, start=0, stop=None):
+    """(records, image stats) of a page range, each image spilled to the blob store as it is extracted"""
+    preprocessor = ImagePreprocessor()
+    records = [
+        record if isinstance(record, TextRecord) else record.spill(image_store)
+        for record in iter_pdf_records(path, start, stop, preprocessor)
+    ]
+    return records, preprocessor.stats
+
+
+class ShardMerger:
+    """Merge shard results: drop images repeated across shards and sum stats"""
+
+    def __init__(self):
+        self.stats = ImageStats()
+        self._seen_xrefs = set()
+        self._preprocessor = ImagePreprocessor()
+
+    def add_stats(self, stats):
+        self.stats.merge(stats)
+
+    def keep(self, record):
+        """True if an image kept by its shard is also new across shards"""
+        if record.xref in self._seen_xrefs or self._preprocessor.is_duplicate(record):
+            self.stats.kept -= 1
+            self.stats.dropped_duplicate += 1
+            self.stats.bytes_out -= record.size
+            return False
+        self._seen_xrefs.add(record.xref)
+        return True
+
+
+def extract_pdf_records(path, workers=PDF_WORKERS):
+    """All records of a PDF, extracted across shard workers for large documents"""
+    merger = ShardMerger()
+    records = []
+    for shard_records, stats in map_page_shards(path, extract_records, workers):
+        merger.add_stats(stats)
+        records.extend(
+            record for record in shard_records
+            if isinstance(record, TextRecord) or merger.keep(record)
+        )
+    record_images(merger.stats)
+    return records
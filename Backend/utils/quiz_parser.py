@@ -0,0 +1,200 @@
+import json
+import re
+from pydantic import ValidationError
+from schemas.quizScehma import QuizQuestion
+from utils.config import QUIZ_FOLLOWUP_ATTEMPTS
+
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+def repair_json(text):
+    """Remove trailing commas before closing brackets, outside string literals"""
+    # Even-indexed pieces lie outside strings
+    pieces = re.split(r'("(?:[^"\\]|\\.)*")', text)
+    return "".join(
+        _TRAILING_COMMA.sub(r"\1", piece) if i % 2 == 0 else piece
+        for i, piece in enumerate(pieces)
+    )
+
+
+def loads_lenient(text):
+    """json.loads, retried once on the repaired text"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(text))
+
+
+def _answer_number(correct):
+    """``correct`` as an int if it is given as a number, otherwise None"""
+    if isinstance(correct, str) and correct.strip().isdigit():
+        return int(correct.strip())
+    if isinstance(correct, int) and not isinstance(correct, bool):
+        return correct
+    return None
+
+
+def one_based_answers(questions):
+    """Whether a response numbers its answers from 1: none is 0 and one equals its option count"""
+    numbered = [
+        (_answer_number(question.get("correct")), question.get("options"))
+        for question in questions if isinstance(question, dict)
+    ]
+    numbered = [(number, options) for number, options in numbered if number is not None]
+    return (
+        all(number != 0 for number, _ in numbered)
+        and any(isinstance(options, (list, dict)) and number == len(options) for number, options in numbered)
+    )
+
+
+def _correct_index(correct, options, one_based=False):
+    """Index of the right option from an index, a letter or the option text"""
+    number = _answer_number(correct)
+    if number is not None:
+        correct = number - 1 if one_based else number
+    elif isinstance(correct, str):
+        value = correct.strip()
+        if len(value) == 1 and value.isalpha():
+            correct = ord(value.upper()) - ord("A")
+        elif value in options:
+            return options.index(value)
+        else:
+            return None
+    else:
+        return None
+    if 0 <= correct < len(options):
+        return correct
+    return None
+
+
+def normalize_question(question, difficulty=None, one_based=False):
+    """Repair the ``correct`` index, mapped options and a missing difficulty, then validate; None if invalid"""
+    if not isinstance(question, dict):
+        return None
+    question = dict(question)
+    options = question.get("options")
+    if isinstance(options, dict):
+        options = list(options.values())
+    if not isinstance(options, list) or len(options) < 2:
+        return None
+    question["options"] = [str(option) for option in options]
+
+    correct = _correct_index(question.get("correct"), question["options"], one_based)
+    if correct is None:
+        return None
+    question["correct"] = correct
+    if difficulty is not None and not question.get("difficulty"):
+        question["difficulty"] = difficulty
+    # Placeholder; renumber assigns the real ids
+    question["id"] = 0
+
+    try:
+        return QuizQuestion(**question).model_dump()
+    except ValidationError:
+        return None
+
+
+def renumber(questions):
+    """Give questions consecutive ids starting at 1"""
+    for index, question in enumerate(questions, start=1):
+        question["id"] = index
+    return questions
+
+
+def parse_quiz(response_text, difficulty=None):
+    """Every valid question in a model response; a malformed or truncated object loses only itself"""
+    raw = IncrementalQuizParser().feed(response_text or "")
+    one_based = one_based_answers(raw)
+    questions = []
+    for question in raw:
+        question = normalize_question(question, difficulty, one_based)
+        if question is not None:
+            questions.append(question)
+    return renumber(questions)
+
+
+def avoid_instruction(questions):
+    """Prompt text telling the model not to repeat questions it already gave"""
+    if not questions:
+        return ""
+    listed = "\n".join(f"- {question['question']}" for question in questions)
+    return f"Do not repeat any of these existing questions:\n{listed}\n"
+
+
+def merge_questions(questions, more, limit):
+    """Append new questions not already present (by text) up to ``limit``"""
+    seen = {question["question"].strip().lower() for question in questions}
+    for question in more:
+        if len(questions) >= limit:
+            break
+        key = question["question"].strip().lower()
+        if key not in seen:
+            seen.add(key)
+            questions.append(question)
+    return renumber(questions)
+
+
+async def complete_quiz(generate, no, difficulty=None, questions=None, attempts=QUIZ_FOLLOWUP_ATTEMPTS):
+    """Generate ``no`` questions, asking ``generate(count, avoid)`` again only for the ones still missing"""
+    if questions is None:
+        questions = parse_quiz(await generate(no, ""), difficulty)
+    for _ in range(attempts):
+        if len(questions) >= no:
+            break
+        missing = no - len(questions)
+        more = parse_quiz(await generate(missing, avoid_instruction(questions)), difficulty)
+        questions = merge_questions(questions, more, no)
+    if not questions:
+        raise ValueError("Model did not return any valid quiz questions.")
+    return renumber(questions[:no])
+
+
+class IncrementalQuizParser:
+    """Pull complete question objects out of a JSON array as it streams in, skipping text before the ``[``"""
+
+    def __init__(self):
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer = []
+
+    def feed(self, text):
+        completed = []
+        for ch in text:
+            if self._finished:
+                break
+            if not self._in_array:
+                self._in_array = ch == "["
+                continue
+
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buffer = [ch]
+                elif ch == "]":
+                    self._finished = True
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(loads_lenient("".join(self._buffer)))
+                    except json.JSONDecodeError:
+                        pass
+                    self._buffer = []
+        return completed
@@ -0,0 +1,41 @@
+import asyncio
+import random
+from utils.config import LLM_RETRY_ATTEMPTS, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY
+
+
+def is_rate_limited(exc):
+    """True for provider errors that mean "slow down" rather than "failed\""""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if status in (429, 503):
+        return True
+    name = type(exc).__name__
+    if name in ("ResourceExhausted", "TooManyRequests", "RateLimitError", "ServiceUnavailable"):
+        return True
+    message = str(exc).lower()
+    return "429" in message or "rate limit" in message or "quota" in message
+
+
+def is_transient(exc):
+    """True for rate limits, provider-side 5xx and transport failures, which another provider may not hit"""
+    if is_rate_limited(exc) or isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int) and 500 <= status < 600:
+        return True
+    # httpx transport errors and google.api_core's timeouts and outages
+    return type(exc).__name__ in (
+        "ConnectError", "ReadError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "APIConnectionError",
+        "APITimeoutError", "DeadlineExceeded", "InternalServerError",
+    )
+
+
+async def retry_async(call, attempts=LLM_RETRY_ATTEMPTS, base_delay=LLM_RETRY_BASE_DELAY, max_delay=LLM_RETRY_MAX_DELAY):
+    """Await ``call()``, retrying rate-limit errors with exponential backoff and jitter"""
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_rate_limited(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
@@ -0,0 +1,23 @@
+import os
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def private_dir(path):
+    """Create ``path`` for this user only; PermissionError if another user owns it, as its contents get unpickled"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    status = os.stat(path)
+    if status.st_uid != os.getuid():
+        raise PermissionError(f"Cache directory {path} is owned by another user")
+    if status.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
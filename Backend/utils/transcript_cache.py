@@ -0,0 +1,131 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from langchain.schema import Document
+from utils.config import (
+    TRANSCRIPT_CACHE_DB,
+    TRANSCRIPT_CACHE_MEMORY_ENTRIES,
+    TRANSCRIPT_CACHE_TTL,
+    TRANSCRIPT_CACHE_NEGATIVE_TTL,
+)
+from utils.lru import LRUCache
+
+
+@dataclass
+class CachedTranscript:
+    """A cached YouTube lookup; negative entries have no documents and carry the ``error`` instead"""
+    documents: Optional[List[Document]]
+    # Fallback that produced the content: youtube_loader, transcript_api or yt_dlp
+    source: str
+    expires_at: float
+    error: Optional[str] = None
+
+    @property
+    def expired(self):
+        return time.time() >= self.expires_at
+
+
+class TranscriptCache:
+    """Two-tier transcript cache: in-memory LRU in front of a SQLite table"""
+
+    def __init__(
+        self,
+        db_path=TRANSCRIPT_CACHE_DB,
+        max_memory_entries=TRANSCRIPT_CACHE_MEMORY_ENTRIES,
+        ttl=TRANSCRIPT_CACHE_TTL,
+        negative_ttl=TRANSCRIPT_CACHE_NEGATIVE_TTL,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = LRUCache(max_memory_entries)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS transcripts (
+                    video_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    documents TEXT,
+                    error TEXT,
+                    expires_at REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, video_id):
+        """Return the live entry for a video, or None"""
+        entry = self._memory.get(video_id)
+        if entry is None:
+            entry = self._load(video_id)
+            if entry is not None:
+                self._memory.put(video_id, entry)
+
+        if entry is None:
+            return None
+        if entry.expired:
+            self.invalidate(video_id)
+            return None
+        return entry
+
+    def put(self, video_id, documents, source, ttl=None):
+        entry = CachedTranscript(
+            documents=documents,
+            source=source,
+            expires_at=time.time() + (self.ttl if ttl is None else ttl),
+        )
+        self._store(video_id, entry)
+        return entry
+
+    def put_negative(self, video_id, source, error):
+        entry = CachedTranscript(
+            documents=None,
+            source=source,
+            expires_at=time.time() + self.negative_ttl,
+            error=error,
+        )
+        self._store(video_id, entry)
+        return entry
+
+    def invalidate(self, video_id):
+        self._memory.pop(video_id)
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM transcripts WHERE video_id = ?", (video_id,))
+
+    def _store(self, video_id, entry):
+        self._memory.put(video_id, entry)
+        documents = None
+        if entry.documents is not None:
+            documents = json.dumps(
+                [{"page_content": d.page_content, "metadata": d.metadata} for d in entry.documents],
+                default=str,
+            )
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts (video_id, source, documents, error, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (video_id, entry.source, documents, entry.error, entry.expires_at),
+            )
+
+    def _load(self, video_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT source, documents, error, expires_at FROM transcripts WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        source, documents, error, expires_at = row
+        if documents is not None:
+            documents = [Document(**d) for d in json.loads(documents)]
+        return CachedTranscript(documents=documents, source=source, expires_at=expires_at, error=error)
+
+
+transcript_cache = TranscriptCache()
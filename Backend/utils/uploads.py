@@ -0,0 +1,44 @@
+import hashlib
+import os
+import tempfile
+from fastapi import HTTPException
+from utils.config import UPLOAD_CHUNK_SIZE, UPLOAD_MAX_BYTES
+
+
+def _too_large(max_bytes):
+    if max_bytes % (1024 ** 2) == 0:
+        limit = f"{max_bytes // (1024 ** 2)} MB"
+    else:
+        limit = f"{max_bytes} byte"
+    return HTTPException(
+        status_code=413,
+        detail=f"Upload exceeds the {limit} limit"
+    )
+
+
+async def save_upload(file, suffix=".pdf", dir=None, max_bytes=UPLOAD_MAX_BYTES):
+    """Copy and hash an UploadFile in chunks, raising 413 past ``max_bytes``. Returns (path, content hash)"""
+    # Multipart parsing already knows the size of the spooled upload
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    if dir is not None:
+        os.makedirs(dir, exist_ok=True)
+    digest = hashlib.sha256()
+    written = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=dir) as tmp:
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise _too_large(max_bytes)
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name, digest.hexdigest()
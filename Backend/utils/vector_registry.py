@@ -0,0 +1,129 @@
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from langchain_community.vectorstores import FAISS
+from utils.lru import LRUCache
+from utils.metrics import record_cache
+from utils.storage import dir_size, private_dir
+
+_SAFE_KEY = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def is_valid_key(key):
+    """Whether ``key`` can name an index folder"""
+    return bool(key) and _SAFE_KEY.match(key) is not None
+
+
+class VectorStoreRegistry:
+    """FAISS stores by source id, kept in a memory LRU and saved to disk with TTL and size-bounded eviction"""
+
+    def __init__(self, root, embeddings, max_entries, name="vector_index", max_bytes=None, ttl=None):
+        self.root = root
+        self.name = name
+        self.embeddings = embeddings
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory = LRUCache(max_entries)
+        # key -> [lock, users]; an entry lives only while some thread holds or waits for it
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        private_dir(self.root)
+
+    def _folder(self, key):
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid index key: {key!r}")
+        return os.path.join(self.root, key)
+
+    @contextmanager
+    def _key_lock(self, key):
+        with self._locks_lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def _expired(self, folder):
+        try:
+            return self.ttl is not None and time.time() - os.path.getmtime(folder) > self.ttl
+        except OSError:
+            return True
+
+    def _touch(self, folder):
+        # Bump recency for disk eviction
+        try:
+            os.utime(folder)
+        except OSError:
+            pass
+
+    def get(self, key):
+        """Return a cached store, or None when it has never been built"""
+        folder = self._folder(key)
+        store = self._memory.get(key)
+        if store is not None:
+            self._touch(folder)
+            return store
+
+        with self._key_lock(key):
+            store = self._memory.get(key)
+            if store is None and os.path.isdir(folder) and not self._expired(folder):
+                try:
+                    store = FAISS.load_local(folder, self.embeddings, allow_dangerous_deserialization=True)
+                    self._memory.put(key, store)
+                except Exception as e:
+                    print(f"Error loading index {key}: {e}")
+                    store = None
+            if store is not None:
+                self._touch(folder)
+        return store
+
+    def get_or_build(self, key, build):
+        """Return the store for ``key``, calling ``build()`` only on a full miss"""
+        store = self.get(key)
+        if store is not None:
+            record_cache(self.name, True)
+            return store
+
+        with self._key_lock(key):
+            store = self._memory.get(key)
+            record_cache(self.name, store is not None)
+            if store is None:
+                store = build()
+                store.save_local(self._folder(key))
+                self._memory.put(key, store)
+                self._evict(keep=key)
+        return store
+
+    def _evict(self, keep=None):
+        """Remove expired saved stores, then the oldest ones past ``max_bytes``"""
+        with self._disk_lock:
+            entries = []
+            total = 0
+            for key in os.listdir(self.root):
+                folder = os.path.join(self.root, key)
+                if key == keep or not os.path.isdir(folder):
+                    continue
+                if self._expired(folder):
+                    shutil.rmtree(folder, ignore_errors=True)
+                    continue
+                size = dir_size(folder)
+                total += size
+                entries.append((os.path.getmtime(folder), key, size))
+
+            if self.max_bytes is None:
+                return
+            total += dir_size(os.path.join(self.root, keep)) if keep else 0
+            for _, key, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+                total -= size